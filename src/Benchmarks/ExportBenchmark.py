@@ -0,0 +1,45 @@
+"""
+Measures how fast a case is exported to CSV, JSON Lines and HTML, and how much memory exporting takes.
+Run from the source folder: python -m Benchmarks.ExportBenchmark [events,events,...]
+"""
+from Benchmarks.SyntheticCase import synthetic_case
+
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+
+def main():
+    sizes = [int(size) for size in sys.argv[1].split(",")] if len(sys.argv) > 1 else [10000, 100000, 1000000]
+
+    with tempfile.TemporaryDirectory() as folder:
+        print("%-6s %10s %10s %14s %12s %12s" % ("format", "events", "seconds", "records/second", "size (MiB)",
+                                                 "peak (MiB)"))
+        for size in sizes:
+            case = synthetic_case(size, event_store=True)
+
+            for name, export in (("csv", lambda location: case.export_events(location)),
+                                 ("jsonl", lambda location: case.export_events(location)),
+                                 ("html", lambda location: case.export_html(location))):
+                location = os.path.join(folder, "export." + name)
+
+                start = time.perf_counter()
+                export(location)
+                seconds = time.perf_counter() - start
+
+                # Peak memory only for the smallest case, tracing makes it take too long otherwise.
+                peak = ""
+                if size == sizes[0]:
+                    tracemalloc.start()
+                    export(location)
+                    peak = "%12.1f" % (tracemalloc.get_traced_memory()[1] / 2 ** 20)
+                    tracemalloc.stop()
+
+                print("%-6s %10d %10.2f %14.0f %12.1f %12s" % (name, size, seconds, size / seconds,
+                                                               os.path.getsize(location) / 2 ** 20, peak))
+
+
+if __name__ == "__main__":
+    main()
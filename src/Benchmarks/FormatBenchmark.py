@@ -0,0 +1,84 @@
+"""
+Compares saving and opening cases in the case file format (see `Models.CaseJournal`) and in a database (see
+    `Models.CaseDatabase`) with pickling them, the way older versions saved cases, along with the size on disk.
+Opening is timed twice: just opening, which only reads the header for case files, and opening and then reading
+    every record, to compare with pickles which can only be read whole.
+Run from the source folder: python -m Benchmarks.FormatBenchmark [events,events,...]
+"""
+from Benchmarks.SyntheticCase import synthetic_case
+
+from Models.Case import Case, _CaseUnpickler
+from Models.CaseDatabase import CaseDatabase
+from Models.CaseJournal import CaseJournal
+from Models.LazyRecords import MappedFile, zstandard
+
+import os
+import pickle
+import sys
+import tempfile
+import time
+
+
+def save_pickle(case: Case, location: str):
+    with open(location, "wb") as file:
+        pickle.dump(case, file, pickle.HIGHEST_PROTOCOL)
+
+
+def open_pickle(location: str) -> Case:
+    with open(location, "rb") as file:
+        return _CaseUnpickler(file).load()
+
+
+def save_case(case: Case, location: str, compression: int):
+    if compression == "sqlite":
+        CaseDatabase(location).rewrite(case)
+    else:
+        CaseJournal(location, compression).rewrite(case)
+
+
+def read_everything(case: Case):
+    for _ in case.events:
+        pass
+    for _ in case.physical_evidence:
+        pass
+
+
+def main():
+    sizes = [int(size) for size in sys.argv[1].split(",")] if len(sys.argv) > 1 else [10000, 100000]
+
+    formats = [("pickle", None), ("none", MappedFile.NONE), ("zlib", MappedFile.ZLIB)]
+    if zstandard is not None:
+        formats.append(("zstd", MappedFile.ZSTD))
+    formats.append(("sqlite", "sqlite"))
+
+    with tempfile.TemporaryDirectory() as folder:
+        print("%-8s %10s %10s %10s %10s %12s" % ("format", "events", "save", "open", "open+read", "size (MiB)"))
+        for size in sizes:
+            case = synthetic_case(size)
+
+            for name, compression in formats:
+                location = os.path.join(folder, "%s-%d.digicase" % (name, size))
+
+                start = time.perf_counter()
+                if compression is None:
+                    save_pickle(case, location)
+                else:
+                    save_case(case, location, compression)
+                save = time.perf_counter() - start
+
+                start = time.perf_counter()
+                opened = open_pickle(location) if compression is None else Case.open_from_disk(location)
+                opening = time.perf_counter() - start
+                assert len(opened.events) == size
+
+                start = time.perf_counter()
+                opened = open_pickle(location) if compression is None else Case.open_from_disk(location)
+                read_everything(opened)
+                reading = time.perf_counter() - start
+
+                print("%-8s %10d %10.3f %10.3f %10.3f %12.2f" % (name, size, save, opening, reading,
+                                                                 os.path.getsize(location) / 2 ** 20))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+"""
+Measures how fast events are imported from CSV and JSON Lines files, and how much memory importing takes on top of
+    what the imported events themselves need. That extra should stay the same whatever the size of the file.
+Run from the source folder: python -m Benchmarks.ImportBenchmark [rows,rows,...]
+"""
+from Models.Case import Case
+from Models.CaseImporter import CaseImporter
+from Models.Evidence import Evidence
+from Models.Timestamp import format_time, parse_time
+
+import csv
+import json
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+DEVICES = 10
+
+
+def write_rows(location: str, rows: int, file_format: str):
+    start = parse_time("01/01/2017 00:00")
+
+    with open(location, "w", encoding="utf-8", newline="") as file:
+        if file_format == "csv":
+            writer = csv.writer(file)
+            writer.writerow(CaseImporter.EVENT_FIELDS)
+            write = writer.writerow
+        else:
+            write = lambda row: file.write(json.dumps(dict(zip(CaseImporter.EVENT_FIELDS, row))) + "\n")
+
+        for number in range(rows):
+            time_of_event = start + number * 60
+            write((format_time(time_of_event), format_time(time_of_event + 3600),
+                   "Imaged partition %d, verified hashes" % number, "DEV%06d" % (number % DEVICES)))
+
+
+def case_with_devices() -> Case:
+    case = Case(event_store=True)
+    for number in range(DEVICES):
+        case.add_evidence(Evidence("DEV%06d" % number, "Info", "01/01/2017 00:00", "Device"))
+
+    return case
+
+
+def main():
+    sizes = [int(size) for size in sys.argv[1].split(",")] if len(sys.argv) > 1 else [10000, 100000, 1000000]
+
+    with tempfile.TemporaryDirectory() as folder:
+        print("%-6s %10s %10s %12s %14s %14s" % ("format", "rows", "seconds", "rows/second", "kept (MiB)",
+                                                 "overhead (MiB)"))
+        for file_format in ("csv", "jsonl"):
+            for size in sizes:
+                location = os.path.join(folder, "events." + file_format)
+                write_rows(location, size, file_format)
+
+                importer = CaseImporter(case_with_devices())
+                start = time.perf_counter()
+                importer.import_events(location)
+                seconds = time.perf_counter() - start
+                assert importer.imported == size, importer.errors
+
+                # Again for memory, tracing slows everything down too much to time it at the same time.
+                importer = CaseImporter(case_with_devices())
+                tracemalloc.start()
+                importer.import_events(location)
+                kept, peak = tracemalloc.get_traced_memory()
+                tracemalloc.stop()
+                print("%-6s %10d %10.2f %12.0f %14.1f %14.1f" % (file_format, size, seconds, size / seconds,
+                                                                 kept / 2 ** 20, (peak - kept) / 2 ** 20))
+
+
+if __name__ == "__main__":
+    main()
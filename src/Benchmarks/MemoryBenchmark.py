@@ -0,0 +1,54 @@
+"""
+Measures memory and pickle size of a big case with plain, slotted and column-oriented events.
+Run from the source folder: python -m Benchmarks.MemoryBenchmark [events]
+"""
+from Benchmarks.SyntheticCase import synthetic_case
+
+from Models.Event import Event
+from Models.EventStore import EventStore
+
+import pickle
+import sys
+import tracemalloc
+
+
+class DictEvent(object):
+    """
+    Events as they were before they had slots: a `__dict__` per event and times kept as strings.
+    """
+    def __init__(self, start_time: str, stop_time: str, comments: str, device: str):
+        self.start_time = start_time
+        self.stop_time = stop_time
+        self.comments = comments
+        self.device = device
+
+
+def loaded_fields(event: Event) -> tuple:
+    """
+    Fresh copies of an event's fields, like reading them from a file gives.
+    """
+    return tuple(field.encode().decode() for field in (event.start_time, event.stop_time, event.comments,
+                                                         event.device))
+
+
+def measure(name: str, build, events: list):
+    tracemalloc.start()
+    records = build(events)
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+
+    pickled = len(pickle.dumps(records, pickle.HIGHEST_PROTOCOL))
+    print("%-10s %8.1f MB in memory %8.1f MB pickled" % (name, size / 2 ** 20, pickled / 2 ** 20))
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 1000000
+    events = synthetic_case(count).events
+
+    measure("__dict__", lambda source: [DictEvent(*loaded_fields(event)) for event in source], events)
+    measure("__slots__", lambda source: [Event(*loaded_fields(event)) for event in source], events)
+    measure("EventStore", lambda source: EventStore(Event(*loaded_fields(event)) for event in source), events)
+
+
+if __name__ == "__main__":
+    main()
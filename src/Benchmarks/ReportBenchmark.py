@@ -0,0 +1,61 @@
+"""
+Measures how PDF reports scale with the number of worker processes laying them out, see `Reports.ParallelReport`.
+Laying out and putting the chunks together are timed separately, the second only happens when pikepdf or pypdf is installed.
+Run from the source folder: python -m Benchmarks.ReportBenchmark [records] [workers,workers,...]
+"""
+from Benchmarks.SyntheticCase import synthetic_case
+
+from Reports.CaseReport import CaseReport, headless_application
+from Reports import ParallelReport as parallel
+
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+
+def main():
+    records = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    cpus = os.cpu_count() or 1
+    workers = [int(count) for count in sys.argv[2].split(",")] if len(sys.argv) > 2 else \
+        sorted({1, 2, 4, 8, 16, 32, cpus} & set(range(1, cpus + 1)) | {cpus})
+
+    headless_application()
+    case = synthetic_case(records)
+    case.case_reference = "Benchmark"
+
+    folder = tempfile.mkdtemp(prefix="digidence-benchmark-")
+    try:
+        start = time.perf_counter()
+        CaseReport(case).write_pdf(os.path.join(folder, "serial.pdf"))
+        serial = time.perf_counter() - start
+
+        merger = parallel.ParallelReport.merger() or "nothing"
+        print("%d records on %d CPUs, merging with %s" % (len(case.events), cpus, merger))
+        print("%-8s %10s %10s %10s %9s" % ("workers", "layout", "merge", "total", "speedup"))
+        print("%-8s %10.2f %10s %10.2f %8.2fx" % ("serial", serial, "", serial, 1))
+
+        for count in workers:
+            report = parallel.ParallelReport(case, workers=count)
+            chunk_folder = os.path.join(folder, str(count))
+            os.mkdir(chunk_folder)
+
+            start = time.perf_counter()
+            chunks = report.render_chunks(chunk_folder)
+            layout = time.perf_counter() - start
+
+            merge = 0
+            if report.can_merge():
+                start = time.perf_counter()
+                report.merge(chunks, os.path.join(folder, "%d.pdf" % count))
+                merge = time.perf_counter() - start
+
+            print("%-8d %10.2f %10.2f %10.2f %8.2fx" % (count, layout, merge, layout + merge,
+                                                        serial / (layout + merge)))
+    finally:
+        shutil.rmtree(folder, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
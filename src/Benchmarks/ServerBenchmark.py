@@ -0,0 +1,241 @@
+"""
+Load test for sharing a case (see `CaseServer`): dozens of examiners logging events to the same case at once.
+
+Starts `digidence serve` on a synthetic case, connects `--clients` clients that each log `--events` events at `--rate`
+    events a second, far quicker than anyone types, and measures:
+    - join: how long connecting and copying the case over takes
+    - ack: from sending an event to the server saying it was added
+    - fan-out: from sending an event to every other client having it
+    - throughput: events added a second, over all clients
+Then checks that nothing went missing: every client got every event, a `CaseClient` following along has the same
+    ledger as the case saved to disk, and the saved case verifies. Exits with status 1 if anything is off, or if the
+    99th percentile ack takes longer than `--budget` milliseconds. `--rate 0` logs as fast as the server takes events
+    instead, for throughput, acks then mostly measure how long the queue of everyone's events is.
+The load comes from plain asyncio connections on this process, so dozens of clients don't need dozens of threads.
+
+Run from the source folder:
+    python -m Benchmarks.ServerBenchmark [--clients 30] [--events 100] [--rate 10] [--case-events 10000]
+        [--storage sqlite]
+"""
+from Benchmarks.SyntheticCase import synthetic_case
+from Models.Case import Case
+from Models.CaseClient import CaseClient
+from Models.CaseServer import LINE_LIMIT, decode, encode
+
+import argparse
+import asyncio
+import os
+import signal
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+SOURCE = os.path.dirname(os.path.dirname(os.path.realpath(__file__)))
+
+STORAGE_EXTENSIONS = {"journal": ".digicase", "sqlite": ".digidb"}
+
+SECRET = "benchmark"  # Handed to the server through DIGIDENCE_SECRET
+
+
+class LoadClient(object):
+    """
+    An examiner logging events, on a connection of its own.
+    """
+
+    def __init__(self, number: int, events: int, rate: float, device: str, sent: dict):
+        """
+        :param number: Number of the client, goes into the comments of its events
+        :param events: Events to log
+        :param rate: Events a second to log, 0 for as fast as the server takes them
+        :param device: Evidence to log the events on
+        :param sent: `time.perf_counter` every event was sent at by comment, shared by all clients
+        """
+        self.number = number
+        self.events = events
+        self.rate = rate
+        self.device = device
+        self.sent = sent
+
+        self.join_seconds = None  # type: float
+        self.acks = []  # Seconds from sending to hearing back, for every event
+        self.fan_out = []  # Seconds from another client sending an event to this one having it
+        self.received = 0  # Events received from the server after joining
+        self.expected = 0  # Events to receive before done, set by `run_all`
+        self.all_received = None  # type: asyncio.Event
+        self.errors = []
+
+    async def run(self, host: str, port: int, start: asyncio.Event):
+        self.all_received = asyncio.Event()
+
+        joined = time.perf_counter()
+        reader, writer = await asyncio.open_connection(host, port, limit=LINE_LIMIT)
+        writer.write(encode({"op": "hello", "secret": SECRET}))
+        while decode(await reader.readline())["op"] != "synced":
+            pass
+        self.join_seconds = time.perf_counter() - joined
+
+        pending = {}  # Sent time by request number
+        answered = asyncio.Event()
+        listening = asyncio.ensure_future(self.listen(reader, pending, answered))
+
+        await start.wait()
+        interval = 1 / self.rate if self.rate else 0
+        for number in range(self.events):
+            comments = "client %d event %d" % (self.number, number)
+            pending[number] = self.sent[comments] = time.perf_counter()
+            writer.write(encode({"op": "add_event", "id": number,
+                                 "fields": ["01/01/2020 10:00", "01/01/2020 11:00", comments, self.device]}))
+
+            if interval:
+                await asyncio.sleep(interval)
+            else:
+                await writer.drain()
+
+        await answered.wait()
+        await self.all_received.wait()
+
+        listening.cancel()
+        writer.close()
+
+    async def listen(self, reader: asyncio.StreamReader, pending: dict, answered: asyncio.Event):
+        while True:
+            line = await reader.readline()
+            if not line:
+                self.errors.append("Client %d was disconnected." % self.number)
+                answered.set()
+                self.all_received.set()
+                return
+
+            message = decode(line)
+            now = time.perf_counter()
+            if message["op"] == "records" and message["kind"] == "event":
+                for fields in message["records"]:
+                    sent = self.sent.get(fields[2])
+                    if sent is not None and not fields[2].startswith("client %d " % self.number):
+                        self.fan_out.append(now - sent)
+                self.received += len(message["records"])
+                if self.received >= self.expected:
+                    self.all_received.set()
+            elif message["op"] in ("added", "error"):
+                if message["op"] == "error":
+                    self.errors.append(message["message"])
+                self.acks.append(now - pending.pop(message["id"]))
+                if len(self.acks) == self.events:
+                    answered.set()
+
+
+def percentile(values: [float], fraction: float) -> float:
+    values = sorted(values)
+    return values[min(int(len(values) * fraction), len(values) - 1)] if values else float("nan")
+
+
+async def run_all(clients: [LoadClient], host: str, port: int) -> float:
+    """
+    Connects every client, then lets them all log at once.
+    :return: Seconds from the first event sent to the last one received everywhere
+    """
+    for client in clients:
+        client.expected = sum(other.events for other in clients)
+
+    start = asyncio.Event()
+    runs = [asyncio.ensure_future(client.run(host, port, start)) for client in clients]
+    while any(client.join_seconds is None for client in clients):
+        await asyncio.sleep(0.01)
+
+    started = time.perf_counter()
+    start.set()
+    await asyncio.gather(*runs)
+    return time.perf_counter() - started
+
+
+def serve(location: str, folder: str) -> (subprocess.Popen, int):
+    """
+    Starts `digidence serve` on a case.
+    :return: Server process and the port it listens on
+    """
+    environment = dict(os.environ, DIGIDENCE_CATALOG=os.path.join(folder, "catalog.sqlite"), DIGIDENCE_SECRET=SECRET)
+    server = subprocess.Popen([sys.executable, os.path.join(SOURCE, "Cli.py"), "serve", location, "--port", "0"],
+                              stdout=subprocess.PIPE, env=environment, universal_newlines=True)
+    line = server.stdout.readline()
+    if not line:
+        raise SystemExit("The case server didn't start.")
+
+    return server, int(line.split(" on ")[1].split(",")[0].rsplit(":", 1)[1])
+
+
+def main():
+    parser = argparse.ArgumentParser(prog="python -m Benchmarks.ServerBenchmark", description=__doc__.split("\n\n")[0])
+    parser.add_argument("--clients", type=int, default=30, help="examiners logging at once")
+    parser.add_argument("--events", type=int, default=100, help="events every examiner logs")
+    parser.add_argument("--rate", type=float, default=10, help="events a second every examiner logs, 0 for as fast "
+                                                             "as the server takes them")
+    parser.add_argument("--case-events", type=int, default=10000, help="events in the case before logging starts")
+    parser.add_argument("--storage", choices=sorted(STORAGE_EXTENSIONS), default="journal",
+                        help="storage of the shared case")
+    parser.add_argument("--budget", type=float, default=100, help="milliseconds the 99th percentile ack may take")
+    arguments = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as folder:
+        case = synthetic_case(arguments.case_events)
+        case.save_location = os.path.join(folder, "shared" + STORAGE_EXTENSIONS[arguments.storage])
+        case.save_to_disk()
+        device = case.physical_evidence[0].unique_identifier
+
+        server, port = serve(case.save_location, folder)
+        try:
+            follower = CaseClient("127.0.0.1", port, SECRET)
+            follower.connect()
+
+            sent = {}
+            clients = [LoadClient(number, arguments.events, arguments.rate, device, sent)
+                       for number in range(arguments.clients)]
+            seconds = asyncio.run(run_all(clients, "127.0.0.1", port))
+
+            # Wait for the server to say everything is on disk.
+            total = arguments.case_events + arguments.clients * arguments.events
+            deadline = time.time() + 30
+            while follower.saved[0] < total and time.time() < deadline:
+                time.sleep(0.05)
+            follower.close()
+        finally:
+            server.send_signal(signal.SIGINT)
+            server.wait(30)
+
+        saved = Case.open_from_disk(case.save_location)
+        problems = [error for client in clients for error in client.errors]
+        if follower.saved[0] != total:
+            problems.append("The server said %d events were saved, not %d." % (follower.saved[0], total))
+        if len(follower.case.events) != total:
+            problems.append("The following client has %d events, not %d." % (len(follower.case.events), total))
+        if len(saved.events) != total:
+            problems.append("The saved case has %d events, not %d." % (len(saved.events), total))
+        if follower.case.ledger.head_hex() != saved.ledger.head_hex():
+            problems.append("The following client's ledger doesn't match the saved case's.")
+        problems += saved.verify(True)
+
+    acks = [ack for client in clients for ack in client.acks]
+    fan_out = [delay for client in clients for delay in client.fan_out]
+    joins = [client.join_seconds for client in clients]
+
+    print("%d clients logging %d events each to a case of %d events, %s storage"
+          % (arguments.clients, arguments.events, arguments.case_events, arguments.storage))
+    print("%-10s %10s %10s %10s %10s" % ("ms", "p50", "p95", "p99", "max"))
+    for name, values in (("join", joins), ("ack", acks), ("fan-out", fan_out)):
+        print("%-10s %10.2f %10.2f %10.2f %10.2f" % (name, percentile(values, 0.5) * 1000,
+                                                     percentile(values, 0.95) * 1000,
+                                                     percentile(values, 0.99) * 1000, max(values) * 1000))
+    print("throughput %.0f events/second, mean ack %.2f ms" % (len(acks) / seconds, statistics.mean(acks) * 1000))
+
+    if percentile(acks, 0.99) * 1000 > arguments.budget:
+        problems.append("99th percentile ack took longer than %.0f ms." % arguments.budget)
+
+    for problem in problems[:10]:
+        print("FAIL " + problem)
+    if problems:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
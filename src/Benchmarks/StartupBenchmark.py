@@ -0,0 +1,60 @@
+"""
+Measures how long the command-line interface takes to start and answer, and checks it stays within budget.
+Also checks Qt isn't imported along the way, that's what makes the windows slow to start.
+Run from the source folder: python -m Benchmarks.StartupBenchmark [budget in milliseconds]
+Exits with status 1 if the median run is over budget.
+"""
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+RUNS = 10
+BUDGET = 300  # Milliseconds for `digidence info` on a small case, interpreter start included
+
+SOURCE = os.path.dirname(os.path.dirname(os.path.realpath(__file__)))
+
+
+def run(*arguments: str) -> float:
+    start = time.perf_counter()
+    subprocess.run([sys.executable, os.path.join(SOURCE, "Cli.py")] + list(arguments), check=True,
+                   stdout=subprocess.DEVNULL)
+    return time.perf_counter() - start
+
+
+def main():
+    budget = float(sys.argv[1]) if len(sys.argv) > 1 else BUDGET
+
+    with tempfile.TemporaryDirectory() as folder:
+        case = os.path.join(folder, "startup.digicase")
+        subprocess.run([sys.executable, os.path.join(SOURCE, "Cli.py"), "new", case, "--case-reference", "C1",
+                        "--lab-reference", "L1", "--investigator", "Benchmark"], check=True)
+
+        check = subprocess.run([sys.executable, "-c", "import sys, Cli; Cli.main(['info', sys.argv[1]]); "
+                                "print(any(name.startswith('PyQt5') for name in sys.modules))", case],
+                               cwd=SOURCE, check=True, stdout=subprocess.PIPE, universal_newlines=True)
+        qt_imported = check.stdout.strip().endswith("True")
+
+        bare = statistics.median(timed_interpreter() for _ in range(RUNS)) * 1000
+        times = [run("info", case) * 1000 for _ in range(RUNS)]
+
+    median = statistics.median(times)
+    print("interpreter alone  %8.1f ms" % bare)
+    print("digidence info     %8.1f ms median, %.1f ms best, budget %.0f ms" % (median, min(times), budget))
+    print("imports Qt         %8s" % ("yes" if qt_imported else "no"))
+
+    if median > budget or qt_imported:
+        print("FAILED")
+        sys.exit(1)
+
+
+def timed_interpreter() -> float:
+    start = time.perf_counter()
+    subprocess.run([sys.executable, "-c", "pass"], check=True)
+    return time.perf_counter() - start
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,361 @@
+"""
+Times the things that get slow as cases grow, on synthetic cases of several sizes, and writes the results as JSON so
+    runs on different commits can be compared.
+
+Each benchmark runs on its own process, so one doesn't leave memory or caches behind for the next. It's run `--repeat`
+    times for the wall time, then once more while tracing memory for the peak memory Python allocated. The results
+    also hold the largest the process got (max_rss, which includes the case being set up) and the size of any file
+    written.
+Qt runs on the offscreen platform unless QT_QPA_PLATFORM says otherwise, so this runs without a display.
+
+Run from the source folder:
+    python -m Benchmarks.Suite [--events 1000,10000] [--output results.json] [--compare earlier.json]
+With `--compare`, prints how every result changed and exits with status 1 if anything got slower than `--tolerance`
+    allows.
+"""
+from Benchmarks.SyntheticCase import synthetic_case
+
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+try:
+    import resource  # Not on Windows
+except ImportError:
+    resource = None
+
+SOURCE = os.path.dirname(os.path.dirname(os.path.realpath(__file__)))
+
+STORAGE_EXTENSIONS = {"journal": ".digicase", "sqlite": ".digidb"}
+
+
+class Benchmark(object):
+    """
+    One thing to time. `setup` makes whatever `run` needs, `run` is what's timed.
+    """
+    name = None  # type: str
+    uses_storage = False  # Whether the results depend on how the case is stored
+
+    def __init__(self, case, folder: str, storage: str):
+        self.case = case
+        self.folder = folder
+        self.storage = storage
+        self.runs = 0
+
+    def setup(self):
+        pass
+
+    def run(self):
+        raise NotImplementedError
+
+    def file_size(self) -> int:
+        """
+        Bytes written by the last run, if it writes a file.
+        """
+        return None
+
+    def records(self) -> int:
+        return len(self.case.events) + len(self.case.physical_evidence)
+
+    def _location(self, name: str) -> str:
+        return os.path.join(self.folder, name + STORAGE_EXTENSIONS[self.storage])
+
+
+class SaveToDisk(Benchmark):
+    """
+    Saving a case to a new file, which writes all of it.
+    """
+    name = "save_to_disk"
+    uses_storage = True
+
+    def run(self):
+        self.runs += 1
+        self.case.save_location = self._location("save-%d" % self.runs)
+        self.case.save_to_disk()
+
+    def file_size(self) -> int:
+        return _file_size(self.case.save_location)
+
+
+class OpenFromDisk(Benchmark):
+    """
+    Opening a saved case. Records are read as they're needed, so this is mostly the header.
+    """
+    name = "open_from_disk"
+    uses_storage = True
+
+    def setup(self):
+        self.case.save_location = self._location("open")
+        self.case.save_to_disk()
+
+    def run(self):
+        from Models.Case import Case
+        Case.open_from_disk(self.case.save_location)
+
+    def file_size(self) -> int:
+        return _file_size(self.case.save_location)
+
+
+class EventToHtml(Benchmark):
+    """
+    Rendering every event, like reports do.
+    """
+    name = "event_to_html"
+
+    def run(self):
+        for event in self.case.events:
+            self.case.event_to_html(event)
+
+    def records(self) -> int:
+        return len(self.case.events)
+
+
+class EvidenceToHtml(Benchmark):
+    """
+    Rendering every piece of evidence, like reports do.
+    """
+    name = "evidence_to_html"
+
+    def run(self):
+        for evidence in self.case.physical_evidence:
+            self.case.evidence_to_html(evidence)
+
+    def records(self) -> int:
+        return len(self.case.physical_evidence)
+
+
+class LoadCaseIntoTables(Benchmark):
+    """
+    Filling the lists of the case window, up to the lists having drawn.
+    """
+    name = "load_case_into_tables"
+
+    def setup(self):
+        from PyQt5.QtWidgets import QApplication
+        from Controllers.CaseController import CaseController
+
+        self.application = QApplication.instance() or QApplication([sys.argv[0]])
+        self.controller = CaseController(self.case)
+        self.controller.show()
+        self.application.processEvents()
+
+    def run(self):
+        self.controller.load_case_into_tables()
+        self.application.processEvents()
+
+
+class PrintAll(Benchmark):
+    """
+    What printing the whole case does once the print dialog is closed, printing to a PDF instead of a printer.
+    """
+    name = "print_all"
+
+    def setup(self):
+        from PyQt5.QtWidgets import QApplication
+
+        self.application = QApplication.instance() or QApplication([sys.argv[0]])
+
+    def run(self):
+        from PyQt5.QtPrintSupport import QPrinter
+        from Reports.CaseReport import CaseReport
+
+        self.runs += 1
+        printer = QPrinter(QPrinter.HighResolution)
+        printer.setOutputFormat(QPrinter.PdfFormat)
+        printer.setOutputFileName(os.path.join(self.folder, "print-%d.pdf" % self.runs))
+        CaseReport(self.case).print(printer)
+
+    def file_size(self) -> int:
+        return _file_size(os.path.join(self.folder, "print-%d.pdf" % self.runs))
+
+
+BENCHMARKS = [SaveToDisk, OpenFromDisk, EventToHtml, EvidenceToHtml, LoadCaseIntoTables, PrintAll]
+
+
+def measure(name: str, events: int, evidence: int, comment_length: int, seed: int, storage: str,
+            repeat: int) -> dict:
+    """
+    Runs a benchmark in this process.
+    :return: Result, see `main`
+    """
+    benchmark_type = next(benchmark for benchmark in BENCHMARKS if benchmark.name == name)
+
+    with tempfile.TemporaryDirectory() as folder:
+        os.environ["DIGIDENCE_CATALOG"] = os.path.join(folder, "catalog.sqlite")  # Keep the user's catalog out of it
+
+        case = synthetic_case(events, evidence, seed, comment_length=comment_length)
+        benchmark = benchmark_type(case, folder, storage)
+        benchmark.setup()
+
+        times = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            benchmark.run()
+            times.append(time.perf_counter() - start)
+
+        # Tracing slows everything down a lot, so it gets a run of its own.
+        tracemalloc.start()
+        benchmark.run()
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+
+        return {"name": name, "storage": storage if benchmark_type.uses_storage else None, "events": events,
+                "evidence": evidence, "records": benchmark.records(), "seconds": statistics.median(times),
+                "best_seconds": min(times), "peak_memory": peak, "max_rss": _max_rss(),
+                "file_size": benchmark.file_size()}
+
+
+def run(name: str, events: int, arguments, storage: str) -> dict:
+    """
+    Runs a benchmark on a process of its own.
+    :return: Result, see `main`
+    """
+    environment = dict(os.environ)
+    environment.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+    result = subprocess.run([sys.executable, "-m", "Benchmarks.Suite", "--measure", name, "--events", str(events),
+                             "--evidence", str(arguments.evidence), "--comment-length", str(arguments.comment_length),
+                             "--seed", str(arguments.seed), "--storage", storage, "--repeat", str(arguments.repeat)],
+                            cwd=SOURCE, env=environment, check=True, stdout=subprocess.PIPE, universal_newlines=True)
+
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def compare(earlier: dict, later: dict, tolerance: float) -> bool:
+    """
+    Prints how every result changed between two runs of the suite.
+    :param tolerance: How much slower a result may get, 0.1 is 10%
+    :return: Whether nothing got slower than that
+    """
+    def key(result: dict) -> tuple:
+        return result["name"], result["storage"], result["events"]
+
+    earlier_results = {key(result): result for result in earlier["results"]}
+
+    print("Compared with %s from %s" % (earlier.get("commit") or "an unknown commit", earlier.get("date")),
+          file=sys.stderr)
+    print("%-22s %-8s %8s %10s %10s %8s %8s" % ("benchmark", "storage", "events", "before", "after", "time",
+                                                "memory"), file=sys.stderr)
+
+    within = True
+    for result in later["results"]:
+        before = earlier_results.get(key(result))
+        if before is None:
+            continue
+
+        time_change = result["seconds"] / before["seconds"] - 1 if before["seconds"] else 0
+        memory_change = result["peak_memory"] / before["peak_memory"] - 1 if before["peak_memory"] else 0
+        slower = time_change > tolerance
+        within = within and not slower
+
+        print("%-22s %-8s %8d %10.4f %10.4f %+7.1f%% %+7.1f%%%s"
+              % (result["name"], result["storage"] or "", result["events"], before["seconds"], result["seconds"],
+                 time_change * 100, memory_change * 100, "  SLOWER" if slower else ""), file=sys.stderr)
+
+    return within
+
+
+def main():
+    parser = argparse.ArgumentParser(prog="python -m Benchmarks.Suite", description=__doc__.split("\n\n")[0])
+    parser.add_argument("--events", default="1000,10000", help="case sizes to run at, comma separated")
+    parser.add_argument("--evidence", type=int, default=10, help="evidence in every case")
+    parser.add_argument("--comment-length", type=int, default=200, help="characters in the comments of every event")
+    parser.add_argument("--seed", type=int, default=0, help="seed for making up the cases")
+    parser.add_argument("--storage", default="journal", help="storage to save with, journal and/or sqlite, comma "
+                                                             "separated")
+    parser.add_argument("--repeat", type=int, default=3, help="timed runs of every benchmark, the median is reported")
+    parser.add_argument("--only", help="benchmarks to run, comma separated, all of them by default")
+    parser.add_argument("--output", help="where to write the results, standard output by default")
+    parser.add_argument("--compare", metavar="RESULTS", help="results of an earlier run to compare with")
+    parser.add_argument("--tolerance", type=float, default=0.1, help="how much slower a result may get when "
+                                                                     "comparing, 0.1 is 10%%")
+    parser.add_argument("--measure", help=argparse.SUPPRESS)  # Runs one benchmark on this process, see `run`
+    arguments = parser.parse_args()
+
+    sizes = [int(size) for size in arguments.events.split(",")]
+    storages = arguments.storage.split(",")
+    if any(storage not in STORAGE_EXTENSIONS for storage in storages):
+        parser.error("storage has to be journal or sqlite")
+
+    if arguments.measure is not None:
+        print(json.dumps(measure(arguments.measure, sizes[0], arguments.evidence, arguments.comment_length,
+                                 arguments.seed, storages[0], arguments.repeat)))
+        return
+
+    names = arguments.only.split(",") if arguments.only else [benchmark.name for benchmark in BENCHMARKS]
+    unknown = set(names) - {benchmark.name for benchmark in BENCHMARKS}
+    if unknown:
+        parser.error("unknown benchmarks: " + ", ".join(sorted(unknown)))
+
+    results = []
+    for benchmark in BENCHMARKS:
+        if benchmark.name not in names:
+            continue
+        for events in sizes:
+            for storage in (storages if benchmark.uses_storage else storages[:1]):
+                result = run(benchmark.name, events, arguments, storage)
+                results.append(result)
+                print("%-22s %-8s %8d %10.4f s %10.1f MiB" % (result["name"], result["storage"] or "", events,
+                                                             result["seconds"], result["peak_memory"] / 2 ** 20),
+                      file=sys.stderr)
+
+    output = {"commit": _commit(), "date": time.strftime("%Y-%m-%dT%H:%M:%S%z"), "python": platform.python_version(),
+              "platform": platform.platform(), "qt_platform": os.environ.get("QT_QPA_PLATFORM", "offscreen"),
+              "parameters": {"events": sizes, "evidence": arguments.evidence,
+                             "comment_length": arguments.comment_length, "seed": arguments.seed,
+                             "repeat": arguments.repeat},
+              "results": results}
+
+    if arguments.output:
+        with open(arguments.output, "w") as file:
+            json.dump(output, file, indent=2)
+    else:
+        print(json.dumps(output, indent=2))
+
+    if arguments.compare:
+        with open(arguments.compare, "r") as file:
+            if not compare(json.load(file), output, arguments.tolerance):
+                sys.exit(1)
+
+
+# Helpers ------------------------------------------------------------------------------------------------------------
+
+def _file_size(location: str) -> int:
+    return os.path.getsize(location) if os.path.exists(location) else None
+
+
+def _max_rss() -> int:
+    """
+    Most memory this process has had, in bytes, or None where that can't be told.
+    """
+    if resource is None:
+        return None
+
+    maximum = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return maximum if sys.platform == "darwin" else maximum * 1024  # Bytes on macOS, kilobytes elsewhere
+
+
+def _commit() -> str:
+    """
+    The commit the source folder is on, with a + when it has changes that aren't committed, or None outside git.
+    """
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=SOURCE, check=True,
+                                stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, universal_newlines=True)
+        changes = subprocess.run(["git", "status", "--porcelain", "--untracked-files=no"], cwd=SOURCE, check=True,
+                                 stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, universal_newlines=True)
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+    return commit.stdout.strip() + ("+" if changes.stdout.strip() else "")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+from Models.Case import Case
+from Models.Event import Event
+from Models.Evidence import Evidence
+
+import random
+
+
+WORDS = ("imaged", "partition", "verified", "checksum", "seized", "bagged", "labelled", "photographed", "the", "a",
+         "drive", "phone", "encrypted", "volume", "recovered", "deleted", "files", "from", "and", "exported", "logs")
+
+
+def synthetic_case(events: int, evidence: int = 10, seed: int = 0, event_store: bool = False,
+                   comment_length: int = None) -> Case:
+    """
+    Builds a case filled with made up, but deterministic, events and evidence.
+    :param events: Number of events to log
+    :param evidence: Number of evidence items the events are spread over
+    :param seed: Seed for the random generator, same seed gives the same case
+    :param event_store: Keep the events in an `EventStore`
+    :param comment_length: Characters in the comments of every event, leave out for short one-line comments
+    :return: Case
+    """
+    generator = random.Random(seed)
+
+    case = Case(event_store)
+    case.case_reference = "BENCH%d" % seed
+    case.lab_reference = "LAB%d" % seed
+    case.investigator = "Benchmark Investigator"
+
+    for index in range(max(evidence, 1)):
+        item = Evidence()
+        item.unique_identifier = "DEV%06d" % index
+        item.description = "Synthetic device number %d" % index
+        item.additional_information = "Seized in good condition, no visible damage."
+        item.seized_date = "%02d/%02d/2016 %02d:%02d" % (generator.randint(1, 28), generator.randint(1, 12),
+                                                         generator.randint(0, 23), generator.randint(0, 59))
+        case.add_evidence(item)
+
+    for index in range(events):
+        day, month, hour, minute = generator.randint(1, 28), generator.randint(1, 12), generator.randint(0, 22), \
+                                   generator.randint(0, 59)
+
+        event = Event()
+        event.start_time = "%02d/%02d/2017 %02d:%02d" % (day, month, hour, minute)
+        event.stop_time = "%02d/%02d/2017 %02d:%02d" % (day, month, hour + 1, minute)
+        event.comments = "Event %d: imaged partition %d and verified the checksum." % (index, generator.randint(0, 9))
+        if comment_length is not None:
+            event.comments = _padded(event.comments, comment_length, generator)
+        event.device = case.physical_evidence[generator.randrange(len(case.physical_evidence))].unique_identifier
+        case.add_event(event)
+
+    return case
+
+
+def _padded(text: str, length: int, generator: random.Random) -> str:
+    """
+    Makes text exactly `length` characters long, cutting it short or going on with random words.
+    """
+    words = [text]
+    total = len(text)
+    while total < length:
+        word = generator.choice(WORDS)
+        words.append(word)
+        total += len(word) + 1
+
+    return " ".join(words)[:length]
@@ -0,0 +1,47 @@
+"""
+Measures how many records per second the HTML renderers manage.
+Run from the source folder: python -m Benchmarks.TemplateBenchmark [events]
+"""
+from Benchmarks.SyntheticCase import synthetic_case
+
+import sys
+import time
+
+
+def render_with_replace(case, event) -> str:
+    """
+    The renderer as it was before templates were cached: read the file and do one replace per placeholder.
+    """
+    template_file = open(case.EVENT_TEMPLATE, "r")
+    template = template_file.read()
+    template_file.close()
+
+    template = template.replace("${CaseRef}", case.case_reference)
+    template = template.replace("${ItemUUID}", event.device)
+    template = template.replace("${StartDate}", event.start_time)
+    template = template.replace("${Comments}", event.comments)
+    template = template.replace("${StopDate}", event.stop_time)
+    template = template.replace("${InvestigatorName}", case.investigator)
+
+    return template
+
+
+def measure(name: str, count: int, function):
+    start = time.perf_counter()
+    function()
+    elapsed = time.perf_counter() - start
+    print("%-28s %10.0f records/s" % (name, count / elapsed))
+
+
+def main():
+    events = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    case = synthetic_case(events)
+    records = len(case.events) + len(case.physical_evidence)
+
+    measure("before (replace)", len(case.events), lambda: [render_with_replace(case, event) for event in case.events])
+    measure("event_to_html", len(case.events), lambda: [case.event_to_html(event) for event in case.events])
+    measure("records_to_html", records, lambda: list(case.records_to_html()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+"""
+Measures the time index against parsing and sorting every event for each question.
+Run from the source folder: python -m Benchmarks.TimeIndexBenchmark [events,events,...]
+"""
+from Benchmarks.SyntheticCase import synthetic_case
+
+from Models.Event import Event
+from Models.Timestamp import parse_time
+
+import random
+import sys
+import time
+
+QUERIES = 200
+
+
+def timed(function) -> float:
+    start = time.perf_counter()
+    function()
+    return time.perf_counter() - start
+
+
+def scan_between(case, start: int, stop: int) -> [int]:
+    """
+    Answers a range query the way it had to be done without an index: parse every event and sort the hits.
+    """
+    hits = []
+    for index, event in enumerate(case.events):
+        event_start, event_stop = parse_time(event.start_time), parse_time(event.stop_time)
+        if event_start.__class__ is int and event_start <= stop and max(event_stop, event_start) >= start:
+            hits.append((event_start, index))
+
+    return [index for _, index in sorted(hits)]
+
+
+def main():
+    sizes = [int(size) for size in sys.argv[1].split(",")] if len(sys.argv) > 1 else [10000, 100000, 1000000]
+    generator = random.Random(0)
+    year_start = parse_time("01/01/2017 00:00")
+
+    for size in sizes:
+        case = synthetic_case(size, event_store=True)
+        ranges = []
+        for _ in range(QUERIES):
+            start = year_start + generator.randrange(365 * 86400)
+            ranges.append((start, start + 3600 * generator.randint(1, 24)))
+
+        build = timed(lambda: case.event_indexes_between(0, 0))
+        query = timed(lambda: [case.event_indexes_between(start, stop) for start, stop in ranges]) / QUERIES
+        scan = timed(lambda: [scan_between(case, start, stop) for start, stop in ranges[:3]]) / 3
+
+        chronological = timed(lambda: sum(1 for _ in case.chronological_events()))
+        overlaps = timed(lambda: case.overlapping_events("DEV000000"))
+
+        events = [Event("01/06/2017 12:00", "01/06/2017 13:00", "Added", "DEV000000") for _ in range(1000)]
+        add = timed(lambda: [case.add_event(event) for event in events]) / len(events)
+
+        print("%8d events: build %7.3fs  query %8.3fms (scan %8.1fms)  add %6.1fus  chronological %7.1fms  "
+              "overlaps on one device %7.1fms" % (size, build, query * 1000, scan * 1000, add * 10 ** 6,
+                                                  chronological * 1000, overlaps * 1000))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+"""
+Measures how long the windows take to start: from starting the program until the welcome window is showing, and
+    opening the case window on a case, with the compiled forms (see `ViewForms`) and with the UI-files parsed instead.
+Every run is a new process, so imports and first use are counted like they are for the user.
+Run from the source folder: python -m Benchmarks.WindowBenchmark [budget in milliseconds for starting]
+Exits with status 1 if the median start with compiled forms is over budget.
+"""
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+RUNS = 5
+BUDGET = 400  # Milliseconds until the welcome window shows, interpreter start included
+EVENTS = 10000  # Events in the case opened in the case window
+
+SOURCE = os.path.dirname(os.path.dirname(os.path.realpath(__file__)))
+
+
+def measure():
+    """
+    Starts the windows in this process and prints the moment the welcome window showed and how long the case window
+        took to open, as measured from in here.
+    """
+    from PyQt5.QtWidgets import QApplication
+
+    from Controllers.WelcomeController import WelcomeController
+    from Controllers.CaseController import CaseController
+
+    app = QApplication(sys.argv)
+    welcome = WelcomeController()
+    welcome.show()
+    app.processEvents()
+    shown = time.time()
+
+    from Benchmarks.SyntheticCase import synthetic_case
+    case = synthetic_case(EVENTS)
+
+    start = time.perf_counter()
+    window = CaseController(case)
+    window.show()
+    app.processEvents()
+    opening = time.perf_counter() - start
+
+    print(shown, opening)
+
+
+def run(runtime_ui: bool) -> (float, float):
+    """
+    Starts the windows in a new process.
+    :param runtime_ui: Parse the UI-files rather than use the compiled forms
+    :return: Seconds until the welcome window showed, and seconds to open the case window
+    """
+    environment = dict(os.environ)
+    environment.setdefault("QT_QPA_PLATFORM", "offscreen")
+    environment.pop("DIGIDENCE_RUNTIME_UI", None)
+    if runtime_ui:
+        environment["DIGIDENCE_RUNTIME_UI"] = "1"
+
+    start = time.time()
+    result = subprocess.run([sys.executable, "-m", "Benchmarks.WindowBenchmark", "--measure"], cwd=SOURCE,
+                            env=environment, check=True, stdout=subprocess.PIPE, universal_newlines=True)
+    shown, opening = (float(value) for value in result.stdout.split()[-2:])
+
+    return shown - start, opening
+
+
+def main():
+    if "--measure" in sys.argv:
+        measure()
+        return
+
+    budget = float(sys.argv[1]) if len(sys.argv) > 1 else BUDGET
+
+    with tempfile.TemporaryDirectory() as folder:
+        os.environ["DIGIDENCE_CATALOG"] = os.path.join(folder, "catalog.sqlite")  # Keep the user's catalog out of it
+
+        results = {}
+        for name, runtime_ui in (("compiled", False), ("parsed", True)):
+            runs = [run(runtime_ui) for _ in range(RUNS)]
+            results[name] = (statistics.median(start for start, _ in runs) * 1000,
+                             statistics.median(opening for _, opening in runs) * 1000)
+
+    print("%-10s %14s %14s" % ("forms", "start (ms)", "case (ms)"))
+    for name, (start, opening) in results.items():
+        print("%-10s %14.1f %14.1f" % (name, start, opening))
+    print("budget     %14.0f" % budget)
+
+    if results["compiled"][0] > budget:
+        print("FAILED")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,634 @@
+"""
+Command-line interface for working with cases without the windows.
+
+Only `Models` is imported up front, so it starts fast and runs on machines without a display. Qt is only imported
+    for PDF reports.
+Run `digidence --help` from the repository root, or `python Cli.py --help` from here, to see the commands.
+"""
+from Models.Case import Case
+from Models.CaseCatalog import CaseCatalog, CatalogError
+from Models.CaseDatabase import CaseDatabase
+from Models.CaseImporter import CaseImporter, CaseImportError
+from Models.CaseJournal import CaseJournal, JournalError
+from Models.CaseMerger import CaseMerger, MergeError
+from Models.CaseServer import CaseServer, CaseServerError, PORT
+from Models.LazyRecords import MappedFile
+from Models.Event import Event
+from Models.Evidence import Evidence
+from Models.ImageHasher import ImageHasher
+from Models.Timestamp import require_period, require_time
+
+import Instrumentation
+
+import argparse
+import asyncio
+import json
+import os
+import shutil
+import sqlite3
+import sys
+
+
+STORAGE = {"journal": CaseJournal, "sqlite": CaseDatabase, None: None}
+
+
+class CliError(Exception):
+    """
+    Something the user asked for can't be done. The message is shown to them as is.
+    """
+
+
+def open_case(location: str) -> Case:
+    if not os.path.exists(location):
+        raise CliError("No such case: " + location)
+
+    case = Case.open_from_disk(location)
+    if case is None:
+        raise CliError("Corrupt case file or invalid file type: " + location)
+
+    return case
+
+
+def save_case(case: Case, **options):
+    """
+    Saves a case and updates its entry in the case catalog. The catalog not working doesn't stop anything.
+    Every command is done with the case once it's saved, so its search index goes next to it as well.
+    :param options: Passed on to `Case.save_to_disk`
+    :return: None
+    """
+    case.save_to_disk(**options)
+    case.write_search_index()
+    catalog_case(case)
+
+
+def catalog_case(case: Case):
+    try:
+        CaseCatalog.shared().record(case)
+    except (CatalogError, sqlite3.Error, OSError) as error:
+        sys.stderr.write("digidence: Could not update the case catalog, " + str(error) + "\n")
+
+
+def event_fields(index: int, event: Event) -> dict:
+    return {
+        "index": index,
+        "start_time": event.start_time,
+        "stop_time": event.stop_time,
+        "device": event.device,
+        "comments": event.comments
+    }
+
+
+def evidence_fields(index: int, evidence: Evidence) -> dict:
+    return {
+        "index": index,
+        "unique_identifier": evidence.unique_identifier,
+        "seized_date": evidence.seized_date,
+        "description": evidence.description,
+        "additional_information": evidence.additional_information
+    }
+
+
+def image_fields(evidence: Evidence, image) -> dict:
+    return {
+        "unique_identifier": evidence.unique_identifier,
+        "location": image.location,
+        "size": image.size,
+        "md5": image.md5,
+        "sha1": image.sha1,
+        "sha256": image.sha256
+    }
+
+
+def hashing_progress(done: int, total: int):
+    """
+    Shows how far hashing has got on the terminal, if there is one.
+    :return: None
+    """
+    if sys.stderr.isatty():
+        sys.stderr.write("\rHashing %5.1f%%" % (100 * done / max(total, 1)) + ("\n" if done >= total else ""))
+        sys.stderr.flush()
+
+
+def print_records(records: [dict], as_json: bool):
+    """
+    Prints records as JSON Lines, or as tab separated text with newlines in fields escaped.
+    :return: None
+    """
+    write = sys.stdout.write
+    for record in records:
+        if as_json:
+            write(json.dumps(record, ensure_ascii=False) + "\n")
+        else:
+            write("\t".join(str(value).replace("\\", "\\\\").replace("\n", "\\n").replace("\t", "\\t")
+                            for value in record.values()) + "\n")
+
+
+# Commands -----------------------------------------------------------------------------------------------------------
+
+def command_new(arguments):
+    if os.path.exists(arguments.case) and not arguments.force:
+        raise CliError("Case already exists, use --force to overwrite: " + arguments.case)
+
+    case = Case()
+    case.case_reference = arguments.case_reference
+    case.lab_reference = arguments.lab_reference
+    case.investigator = arguments.investigator
+    case.save_location = arguments.case
+    case.storage = STORAGE[arguments.storage]
+    save_case(case)
+
+
+def command_info(arguments):
+    for location in arguments.cases:
+        case = open_case(location)
+        print_records([{
+            "location": location,
+            "case_reference": case.case_reference,
+            "lab_reference": case.lab_reference,
+            "investigator": case.investigator,
+            "events": len(case.events),
+            "evidence": len(case.physical_evidence)
+        }], arguments.json)
+
+
+def command_add_evidence(arguments):
+    case = open_case(arguments.case)
+    if case.evidence_index(arguments.id) is not None:
+        raise CliError("There is already evidence with identifier " + arguments.id)
+
+    evidence = Evidence(arguments.id, arguments.information, arguments.seized, arguments.description)
+    if "" in (evidence.unique_identifier, evidence.additional_information, evidence.seized_date, evidence.description):
+        raise CliError("You must fill out all the fields!")
+    try:
+        require_time(arguments.seized, "seized date")
+    except ValueError as error:
+        raise CliError(str(error))
+
+    case.add_evidence(evidence)
+    save_case(case)
+
+
+def command_add_event(arguments):
+    case = open_case(arguments.case)
+    if case.evidence_index(arguments.device) is None:
+        raise CliError("No evidence with identifier " + arguments.device)
+
+    event = Event(arguments.start, arguments.stop, arguments.comments, arguments.device)
+    if "" in (event.start_time, event.stop_time, event.comments):
+        raise CliError("You must fill out all the fields!")
+    try:
+        require_period(arguments.start, arguments.stop)
+    except ValueError as error:
+        raise CliError(str(error))
+
+    case.add_event(event)
+    save_case(case)
+
+
+def command_import(arguments):
+    case = open_case(arguments.case)
+    importer = CaseImporter(case, arguments.strict)
+
+    try:
+        if arguments.evidence:
+            importer.import_evidence(arguments.file, arguments.format)
+        else:
+            importer.import_events(arguments.file, arguments.format)
+    except (CaseImportError, OSError, UnicodeDecodeError) as error:
+        raise CliError("Nothing imported, " + str(error))
+
+    save_case(case)
+
+    for message in importer.errors:
+        sys.stderr.write(message + "\n")
+    if importer.skipped > len(importer.errors):
+        sys.stderr.write("... and %d more\n" % (importer.skipped - len(importer.errors)))
+    sys.stderr.write("Imported %d, skipped %d\n" % (importer.imported, importer.skipped))
+
+
+def command_export(arguments):
+    if arguments.events is None and arguments.evidence is None and arguments.html is None:
+        raise CliError("Nothing to export, give --events, --evidence or --html")
+
+    case = open_case(arguments.case)
+    if arguments.events is not None:
+        case.export_events(arguments.events, arguments.format)
+    if arguments.evidence is not None:
+        case.export_evidence(arguments.evidence, arguments.format)
+    if arguments.html is not None:
+        case.export_html(arguments.html)
+
+
+def command_convert(arguments):
+    if arguments.output is not None and len(arguments.cases) > 1:
+        raise CliError("--output only works with one case")
+
+    compression = {"none": MappedFile.NONE, "zlib": MappedFile.ZLIB, "zstd": MappedFile.ZSTD,
+                   None: None}[arguments.compression]
+
+    for location in arguments.cases:
+        case = open_case(location)
+
+        case.storage = STORAGE[arguments.storage]
+        if arguments.output is not None:
+            case.save_location = arguments.output
+        elif not arguments.no_backup and not CaseJournal.is_journal(location) and \
+                not CaseDatabase.is_database(location):
+            shutil.copy2(location, location + ".bak")  # Pickles can't be opened by older versions once converted
+
+        try:
+            save_case(case, rewrite=True, compression=compression)
+        except JournalError as error:
+            raise CliError(str(error))
+
+
+def command_cases(arguments):
+    for location in arguments.add or ():
+        catalog_case(open_case(location))
+
+    catalog = CaseCatalog.shared()
+    try:
+        if arguments.device is not None:
+            cases = catalog.cases_with_device(arguments.device)
+        elif arguments.search is not None:
+            cases = catalog.search(arguments.search, arguments.limit)
+        else:
+            cases = catalog.recent(arguments.limit)
+    except (CatalogError, sqlite3.Error, OSError) as error:
+        raise CliError("Can't read the case catalog, " + str(error))
+
+    if not arguments.json:
+        for case in cases:
+            case["saved"] = CaseCatalog.local_time(case["saved"])
+            case["opened"] = CaseCatalog.local_time(case["opened"])
+
+    print_records(cases, arguments.json)
+
+
+def command_verify(arguments):
+    failed = False
+    for location in arguments.cases:
+        case = open_case(location)
+        problems = case.verify(full=True, head=arguments.head)
+        if arguments.images or arguments.rehash:
+            problems += ImageHasher().verify([image for evidence in case.physical_evidence
+                                              for image in evidence.images], arguments.rehash, hashing_progress)
+
+        sys.stdout.write("%s\t%s\t%s\n" % (location, case.ledger.head_hex(), "ok" if not problems else "FAILED"))
+        for problem in problems:
+            sys.stdout.write("\t" + problem + "\n")
+        failed = failed or bool(problems)
+
+    if failed:
+        raise CliError("Some records don't match the ledger" + (" or images their digests" if arguments.images or
+                                                                arguments.rehash else ""))
+
+
+def command_attach_image(arguments):
+    case = open_case(arguments.case)
+    index = case.evidence_index(arguments.id)
+    if index is None:
+        raise CliError("There is no evidence with identifier " + arguments.id)
+
+    try:
+        images = ImageHasher(None if arguments.no_cache else CaseCatalog.shared()).hash_files(arguments.images,
+                                                                                           hashing_progress)
+    except OSError as error:
+        raise CliError("Could not hash the image, " + str(error))
+
+    hashed = {image.location for image in images}
+    evidence = case.physical_evidence[index]
+    case.set_evidence_images(index, [image for image in evidence.images if image.location not in hashed] + images)
+    save_case(case)
+
+    print_records((image_fields(evidence, image) for image in images), arguments.json)
+
+
+def command_images(arguments):
+    case = open_case(arguments.case)
+
+    print_records((image_fields(evidence, image) for evidence in case.physical_evidence for image in evidence.images
+                   if arguments.id is None or evidence.unique_identifier == arguments.id), arguments.json)
+
+
+def command_list(arguments):
+    case = open_case(arguments.case)
+
+    if not arguments.events_only:
+        print_records((evidence_fields(index, evidence) for index, evidence in enumerate(case.physical_evidence)),
+                      arguments.json)
+    if not arguments.evidence_only:
+        print_records((event_fields(index, event) for index, event in enumerate(case.events)), arguments.json)
+
+
+def command_query(arguments):
+    case = open_case(arguments.case)
+
+    if arguments.overlaps:
+        print_records(({"first": first, "second": second}
+                       for first, second in case.overlapping_events(arguments.device)), arguments.json)
+        return
+
+    # Start with the most selective answer the indexes give, then narrow it down with the rest.
+    indexes = None
+    if arguments.between is not None:
+        try:
+            indexes = case.event_indexes_between(*arguments.between)
+        except ValueError as error:
+            raise CliError(str(error))
+    if arguments.device is not None:
+        indexes = narrow(indexes, case.event_indexes_for_device(arguments.device))
+    if arguments.search is not None:
+        indexes = narrow(indexes, case.search_events(arguments.search))
+        case.write_search_index()  # Built just now, the next search can start from it
+
+    if indexes is None:
+        indexes = range(len(case.events))
+
+    if arguments.chronological:
+        order = {index: position for position, index in enumerate(case.chronological_event_indexes())}
+        indexes = sorted(indexes, key=order.__getitem__)
+
+    events = case.events
+    print_records((event_fields(index, events[index]) for index in indexes), arguments.json)
+
+
+def narrow(indexes: [int], other: [int]) -> [int]:
+    if indexes is None:
+        return other
+
+    keep = set(other)
+    return [index for index in indexes if index in keep]
+
+
+def command_report(arguments):
+    os.makedirs(arguments.output, exist_ok=True)
+
+    for location in arguments.cases:
+        case = open_case(location)
+        name = os.path.splitext(os.path.basename(location))[0]
+
+        if arguments.format == "pdf":
+            from Reports.ParallelReport import ParallelReport  # Only now, Qt takes a while to import.
+
+            ParallelReport(case, arguments.workers).write_pdf(os.path.join(arguments.output, name + ".pdf"))
+        else:
+            for number, html in enumerate(case.records_to_html(), 1):
+                with open(os.path.join(arguments.output, "%s-%06d.html" % (name, number)), "w",
+                          encoding="utf-8") as file:
+                    file.write(html)
+
+
+def compared_cases(arguments) -> CaseMerger:
+    merger = CaseMerger(open_case(arguments.ours), open_case(arguments.theirs))
+    merger.compare()
+    for name in merger.details:
+        sys.stderr.write("digidence: The cases have different %s, ours is kept\n" % name.replace("_", " "))
+
+    return merger
+
+
+def difference_fields(status: str, kind: str, our_index: int, their_index: int, record, fields) -> dict:
+    """
+    A difference between two cases, with the version of the record that would end up in the merged case.
+    :param fields: `event_fields` or `evidence_fields`
+    """
+    difference = {"status": status, "kind": kind, "ours": our_index, "theirs": their_index}
+    difference.update(fields(None, record))
+    del difference["index"]
+    return difference
+
+
+def print_counts(merger: CaseMerger, as_json: bool):
+    counts = merger.counts()
+    print_records((dict(kind=kind, **counts[kind]) for kind in ("evidence", "events")), as_json)
+
+
+def command_diff(arguments):
+    merger = compared_cases(arguments)
+    if arguments.summary:
+        print_counts(merger, arguments.json)
+        return
+
+    ours, theirs = merger.ours, merger.theirs
+    for kind, differences, our_records, their_records, fields in (
+            ("evidence", merger.evidence, ours.physical_evidence, theirs.physical_evidence, evidence_fields),
+            ("event", merger.events, ours.events, theirs.events, event_fields)):
+        print_records((difference_fields(status, kind, our_index, their_index,
+                                         our_records[our_index] if their_index is None else their_records[their_index],
+                                         fields)
+                       for status, our_index, their_index in differences), arguments.json)
+
+
+def command_merge(arguments):
+    merger = compared_cases(arguments)
+    prefer_theirs = {"ours": False, "theirs": True, None: None}[arguments.prefer]
+    try:
+        merger.merge(prefer_theirs)
+    except MergeError as error:
+        raise CliError(str(error) + (" Use --prefer ours or --prefer theirs." if merger.conflicts() else ""))
+
+    if arguments.output is not None:
+        merger.ours.save_location = arguments.output
+    save_case(merger.ours)
+
+    print_counts(merger, arguments.json)
+
+
+def command_serve(arguments):
+    case = open_case(arguments.case)
+    try:
+        server = CaseServer(case, arguments.host, arguments.port, os.environ.get("DIGIDENCE_SECRET"))
+    except CaseServerError as error:
+        raise CliError(str(error))
+
+    def started(server: CaseServer):
+        print("Sharing %s on %s:%d, press Ctrl+C to stop." % (arguments.case, server.host, server.port), flush=True)
+        print("Secret to join with: " + server.secret, flush=True)
+
+    try:
+        asyncio.run(server.serve(started))
+    except KeyboardInterrupt:
+        pass  # Stopping saves whatever hasn't been yet
+    except OSError as error:
+        raise CliError("Could not share the case, " + str(error.strerror or error))
+    finally:
+        catalog_case(case)
+
+
+# Argument parsing ---------------------------------------------------------------------------------------------------
+
+def parser() -> argparse.ArgumentParser:
+    main_parser = argparse.ArgumentParser(prog="digidence", description="Logging tool for digital forensics examiners.")
+    main_parser.add_argument("--trace", metavar="FILE", help="time the slow parts and write a Chrome trace to FILE, "
+                                                           "also set with DIGIDENCE_TRACE")
+    main_parser.add_argument("--profile", metavar="FILE", help="profile with cProfile and write the statistics to "
+                                                             "FILE, also set with DIGIDENCE_PROFILE")
+    commands = main_parser.add_subparsers(dest="command", metavar="command")
+    commands.required = True
+
+    new = commands.add_parser("new", help="create a case")
+    new.add_argument("case", help="case file to create")
+    new.add_argument("--case-reference", required=True)
+    new.add_argument("--lab-reference", required=True)
+    new.add_argument("--investigator", required=True)
+    new.add_argument("--force", action="store_true", help="overwrite an existing case file")
+    new.add_argument("--storage", choices=("journal", "sqlite"),
+                     help="defaults to sqlite for .digidb files, journal otherwise")
+    new.set_defaults(function=command_new)
+
+    info = commands.add_parser("info", help="show case details and record counts")
+    info.add_argument("cases", nargs="+", metavar="case")
+    info.add_argument("--json", action="store_true", help="print JSON Lines")
+    info.set_defaults(function=command_info)
+
+    add_evidence = commands.add_parser("add-evidence", help="add physical evidence to a case")
+    add_evidence.add_argument("case")
+    add_evidence.add_argument("--id", required=True, help="unique identifier")
+    add_evidence.add_argument("--description", required=True)
+    add_evidence.add_argument("--information", required=True, help="additional information")
+    add_evidence.add_argument("--seized", required=True, help="seized date, dd/mm/yyyy hh:mm")
+    add_evidence.set_defaults(function=command_add_evidence)
+
+    add_event = commands.add_parser("add-event", help="log an event on a piece of evidence")
+    add_event.add_argument("case")
+    add_event.add_argument("--device", required=True, help="unique identifier of the evidence")
+    add_event.add_argument("--start", required=True, help="start time, dd/mm/yyyy hh:mm")
+    add_event.add_argument("--stop", required=True, help="stop time, dd/mm/yyyy hh:mm")
+    add_event.add_argument("--comments", required=True)
+    add_event.set_defaults(function=command_add_event)
+
+    import_records = commands.add_parser("import", help="import events or evidence from CSV or JSON Lines")
+    import_records.add_argument("case")
+    import_records.add_argument("file", help="columns or keys named " + ", ".join(CaseImporter.EVENT_FIELDS) +
+                                " for events, or " + ", ".join(CaseImporter.EVIDENCE_FIELDS) + " for evidence")
+    import_records.add_argument("--evidence", action="store_true", help="the file holds evidence, not events")
+    import_records.add_argument("--format", choices=("csv", "jsonl"), help="defaults to the file extension")
+    import_records.add_argument("--strict", action="store_true", help="import nothing if any row is bad")
+    import_records.set_defaults(function=command_import)
+
+    export = commands.add_parser("export", help="write records to CSV, JSON Lines or a standalone HTML report")
+    export.add_argument("case")
+    export.add_argument("--events", metavar="FILE", help="write events to this file")
+    export.add_argument("--evidence", metavar="FILE", help="write evidence to this file")
+    export.add_argument("--html", metavar="FILE", help="write the whole case to this HTML file")
+    export.add_argument("--format", choices=("csv", "jsonl"), help="defaults to the file extension")
+    export.set_defaults(function=command_export)
+
+    convert = commands.add_parser("convert", help="write cases in the current file format, old pickled cases too")
+    convert.add_argument("cases", nargs="+", metavar="case")
+    convert.add_argument("--output", help="write the converted case here instead of over the original")
+    convert.add_argument("--storage", choices=("journal", "sqlite"),
+                         help="move cases to this storage, they keep theirs unless given")
+    convert.add_argument("--compression", choices=("none", "zlib", "zstd"),
+                         help="defaults to zstd when zstandard is installed and zlib otherwise")
+    convert.add_argument("--no-backup", action="store_true",
+                         help="don't keep a .bak copy of pickled cases converted in place")
+    convert.set_defaults(function=command_convert)
+
+    cases = commands.add_parser("cases", help="list and search every case saved or opened on this machine")
+    cases.add_argument("--search", help="cases with this in their references, investigator, location or evidence")
+    cases.add_argument("--device", help="cases with evidence of this identifier")
+    cases.add_argument("--add", nargs="+", metavar="CASE", help="add cases to the catalog first")
+    cases.add_argument("--limit", type=int, default=50, help="most cases to list, 50 unless given")
+    cases.add_argument("--json", action="store_true", help="print JSON Lines")
+    cases.set_defaults(function=command_cases)
+
+    verify = commands.add_parser("verify", help="check that no record has been changed since it was logged")
+    verify.add_argument("cases", nargs="+", metavar="case")
+    verify.add_argument("--head", help="ledger head noted down earlier, that the ledger should pass through")
+    verify.add_argument("--images", action="store_true",
+                        help="also check attached images that have changed size or time against their digests")
+    verify.add_argument("--rehash", action="store_true", help="check every attached image, reading all of them")
+    verify.set_defaults(function=command_verify)
+
+    attach_image = commands.add_parser("attach-image", help="hash images acquired from evidence and attach them")
+    attach_image.add_argument("case")
+    attach_image.add_argument("--id", required=True, help="unique identifier of the evidence")
+    attach_image.add_argument("images", nargs="+", metavar="image", help="image files, like E01 or dd files")
+    attach_image.add_argument("--no-cache", action="store_true",
+                              help="read every image, even ones hashed before that haven't changed")
+    attach_image.add_argument("--json", action="store_true", help="print JSON Lines")
+    attach_image.set_defaults(function=command_attach_image)
+
+    images = commands.add_parser("images", help="list the images attached to evidence, with their digests")
+    images.add_argument("case")
+    images.add_argument("--id", help="only images of this evidence")
+    images.add_argument("--json", action="store_true", help="print JSON Lines")
+    images.set_defaults(function=command_images)
+
+    list_records = commands.add_parser("list", help="list evidence and events")
+    list_records.add_argument("case")
+    only = list_records.add_mutually_exclusive_group()
+    only.add_argument("--events", dest="events_only", action="store_true", help="only list events")
+    only.add_argument("--evidence", dest="evidence_only", action="store_true", help="only list evidence")
+    list_records.add_argument("--json", action="store_true", help="print JSON Lines")
+    list_records.set_defaults(function=command_list)
+
+    query = commands.add_parser("query", help="find events")
+    query.add_argument("case")
+    query.add_argument("--device", help="events on this evidence")
+    query.add_argument("--between", nargs=2, metavar=("START", "STOP"), help="events overlapping a time range")
+    query.add_argument("--search", help="events with comments containing these words")
+    query.add_argument("--chronological", action="store_true", help="order by start time")
+    query.add_argument("--overlaps", action="store_true", help="list pairs of overlapping events on the same device")
+    query.add_argument("--json", action="store_true", help="print JSON Lines")
+    query.set_defaults(function=command_query)
+
+    report = commands.add_parser("report", help="render reports for one or more cases")
+    report.add_argument("cases", nargs="+", metavar="case")
+    report.add_argument("--output", required=True, help="folder to write reports to")
+    report.add_argument("--format", choices=("html", "pdf"), default="pdf",
+                        help="one PDF per case, or one HTML file per record")
+    report.add_argument("--workers", type=int, help="processes to lay out PDFs on, defaults to one per CPU")
+    report.set_defaults(function=command_report)
+
+    diff = commands.add_parser("diff", help="list the records two copies of a case don't have in common")
+    diff.add_argument("ours")
+    diff.add_argument("theirs")
+    diff.add_argument("--summary", action="store_true", help="only count the differences")
+    diff.add_argument("--json", action="store_true", help="print JSON Lines")
+    diff.set_defaults(function=command_diff)
+
+    merge = commands.add_parser("merge", help="merge the records of one copy of a case into another")
+    merge.add_argument("ours", help="case to merge into")
+    merge.add_argument("theirs", help="case to merge from, it isn't changed")
+    merge.add_argument("--prefer", choices=("ours", "theirs"),
+                       help="whose records to keep where both cases changed them, nothing is merged if any were "
+                            "and this isn't given")
+    merge.add_argument("--output", help="write the merged case here instead of into ours")
+    merge.add_argument("--json", action="store_true", help="print JSON Lines")
+    merge.set_defaults(function=command_merge)
+
+    serve = commands.add_parser("serve", help="share a case with other examiners logging to it at the same time",
+                                description="Examiners join with the secret printed when it starts, a random one "
+                                            "unless DIGIDENCE_SECRET is set.")
+    serve.add_argument("case")
+    serve.add_argument("--host", default="127.0.0.1",
+                       help="address to listen on, 127.0.0.1 unless given, 0.0.0.0 for every network")
+    serve.add_argument("--port", type=int, default=PORT, help="port to listen on, %d unless given" % PORT)
+    serve.set_defaults(function=command_serve)
+
+    return main_parser
+
+
+def main(argv: [str] = None) -> int:
+    arguments = parser().parse_args(argv)
+
+    Instrumentation.start_from_environment(arguments.trace, arguments.profile)
+
+    try:
+        arguments.function(arguments)
+    except CliError as error:
+        sys.stderr.write("digidence: " + str(error) + "\n")
+        return 1
+    except BrokenPipeError:
+        pass  # Output piped to something like `head` that stopped reading
+    finally:
+        Instrumentation.stop()
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,17 +1,51 @@
-from PyQt5.Qt import *
+from PyQt5.QtCore import QModelIndex, QObject, Qt, QTimer, pyqtSignal
+from PyQt5.QtGui import QTextDocument
+from PyQt5.QtPrintSupport import QPrintDialog, QPrinter
+from PyQt5.QtWidgets import QAction, QApplication, QCheckBox, QDateTimeEdit, QFileDialog, QLineEdit, QListView, \
+    QMenuBar, QMessageBox, QProgressDialog, QPushButton, QTextEdit, QToolBox
+
+import bisect
+import os
+import sqlite3
 
 from ViewController import ViewController
+from TaskRunner import Task, TaskRunner
+from Instrumentation import traced
+from RecordListModels import EventListModel, EvidenceListModel
 
 from Models.Case import Case
+from Models.CaseCatalog import CaseCatalog, CatalogError
+from Models.CaseClient import CaseClient
+from Models.CaseImporter import CaseImporter
+from Models.CaseMerger import CaseMerger, MergeError
 from Models.Event import Event
 from Models.Evidence import Evidence
+from Models.EvidenceImage import EvidenceImage
+from Models.ImageHasher import ImageHasher
+
+from Reports.CaseReport import CaseReport
+from Reports.ParallelReport import ParallelReport
 
 
 class CaseController(ViewController):
     """
     Main project view controller for managing the current case.
+
+    Shared cases (see `CaseServer`) are logged to through a `CaseClient`. Records added in the window go to the server
+        and show up once it sends them back, along with everyone else's. The server saves the case, so saving,
+        autosaving and anything else that changes records on this side alone is turned off.
     """
     case = None  # type: Case
+    client = None  # type: CaseClient  # Client of the case server when the case is shared
+
+    class ClientSignals(QObject):
+        """
+        Hands what the case client hears on its own thread to the window's.
+        """
+        records = pyqtSignal(str, int, object)  # Kind, index of the first and records, see `CaseClient.on_records`
+        saved = pyqtSignal(int, int)  # Events and evidence saved to disk
+        disconnected = pyqtSignal(str)  # Why
+        refused = pyqtSignal(object)  # Error the server turned an add down with
 
     # Define used UI elements that are imported from the UI-file.
     events_list = None  # type: QListView
@@ -30,27 +64,52 @@ class CaseController(ViewController):
     unique_identifier_field = None  # type: QLineEdit
     device_description_field = None  # type: QLineEdit
 
+    filter_events_checkbox = None  # type: QCheckBox
+    search_field = None  # type: QLineEdit
+
+    toolBox = None  # type: QToolBox  # Holds the fields and add-buttons for both kinds of record
+
+    selected_device = None  # type: str  # Unique identifier of the selected physical evidence
+
+    # Qt's spelling of `Timestamp.TIME_FORMAT`. The date fields show dates the way the locale likes, see `field_time`.
+    FIELD_TIME_FORMAT = "dd/MM/yyyy hh:mm"
+
+    AUTOSAVE_INTERVAL = 60 * 1000  # Milliseconds between autosaves
+    AUTOSAVE_CHANGES = 25  # Records added or changed that trigger an autosave before the interval is up
+
+    autosave_task = None  # type: Task  # Autosave in progress, if any
+    autosaved_revision = 0  # `Case.revision` when the last autosave started
+    autosave_warned = False  # Whether the user has been told that autosave isn't working
+
     # Models used for populating events and physical evidence lists
-    events_list_model = None  # type: QStandardItemModel
-    physical_evidence_list_model = None  # type: QStandardItemModel
+    events_list_model = None  # type: EventListModel
+    physical_evidence_list_model = None  # type: EvidenceListModel
 
-    def __init__(self, case):
+    def __init__(self, case, client: CaseClient = None):
         """
         Initiates a case view controller with a given case.
         :param case: Case must be provided.
+        :param client: Connected client of a case server, if the case is shared, `case` is then its copy of the case.
         """
         super().__init__("case.ui")
 
         self.case = case
+        self.client = client
+        self.autosaved_revision = case.revision
 
         self.setWindowTitle("Case: " + self.case.case_reference)
 
         # Configure UI elements
-        self.setup_callbacks()
         self.setup_lists()
+        self.setup_callbacks()  # After the lists, the lists' selection models are made along with their models.
         self.add_menu_bar_items()
         self.load_case_into_tables()
 
+        if client is not None:
+            self.setup_client()
+
+        self.catalog(opened=True)
+
     # Configuration functions ----------------------------------------------------------------------------------------
 
     def setup_callbacks(self):
@@ -61,17 +120,53 @@ class CaseController(ViewController):
         self.add_event_button.clicked.connect(self.clicked_add_event)
         self.add_physical_button.clicked.connect(self.clicked_add_physical_evidence)
 
-        self.physical_evidence_list.clicked.connect(self.selected_physical_evidence)
+        self.physical_evidence_list.selectionModel().currentChanged.connect(self.selected_physical_evidence)
+        self.filter_events_checkbox.toggled.connect(self.update_filters)
+
+        # Wait for the user to stop typing for a moment before searching.
+        self.search_timer = QTimer(self)
+        self.search_timer.setSingleShot(True)
+        self.search_timer.setInterval(150)
+        self.search_timer.timeout.connect(self.update_filters)
+        self.search_field.textChanged.connect(self.search_timer.start)
+
+        # Autosave every so often, and sooner when a lot is being logged.
+        self.autosave_timer = QTimer(self)
+        self.autosave_timer.setInterval(self.AUTOSAVE_INTERVAL)
+        self.autosave_timer.timeout.connect(self.autosave)
+        self.autosave_timer.start()
+
+    def setup_client(self):
+        """
+        Configures the window for a shared case.
+        :return: None
+        """
+        self.client_signals = CaseController.ClientSignals(self)
+        self.client_signals.records.connect(self.received_records)
+        self.client_signals.saved.connect(lambda events, evidence: self.update_title())
+        self.client_signals.disconnected.connect(self.disconnected)
+        self.client_signals.refused.connect(self.add_refused)
+
+        # Records are applied to the case here, on the window's thread, rather than on the client's.
+        self.client.on_records = self.client_signals.records.emit
+        self.client.on_saved = self.client_signals.saved.emit
+        self.client.on_disconnected = self.client_signals.disconnected.emit
+
+        self.autosave_timer.stop()
+        for action in self.local_actions:
+            action.setDisabled(True)
+
+        self.update_title()
 
     def setup_lists(self):
         """
         Configures the lists for events and physical evidence.
         :return: None
         """
-        self.events_list_model = QStandardItemModel()
+        self.events_list_model = EventListModel(parent=self)
         self.events_list.setModel(self.events_list_model)
 
-        self.physical_evidence_list_model = QStandardItemModel()
+        self.physical_evidence_list_model = EvidenceListModel(parent=self)
         self.physical_evidence_list.setModel(self.physical_evidence_list_model)
 
     def add_menu_bar_items(self):
@@ -87,9 +182,39 @@ class CaseController(ViewController):
         saveAction.triggered.connect(self.save)
 
         exitAction = QAction("Quit", self)  # Qt uses Mac's standard function for this, so only effective on Win/Linux
-        exitAction.triggered.connect(quit)
+        exitAction.triggered.connect(QApplication.closeAllWindows)  # Then `Main` waits for anything still running
+
+        importEventsAction = QAction("Import events...", self)
+        importEventsAction.triggered.connect(lambda: self.import_records(False))
+
+        importEvidenceAction = QAction("Import evidence...", self)
+        importEvidenceAction.triggered.connect(lambda: self.import_records(True))
+
+        verifyAction = QAction("Verify records", self)
+        verifyAction.triggered.connect(self.verify)
+
+        attachImagesAction = QAction("Attach images to selected evidence...", self)
+        attachImagesAction.triggered.connect(self.attach_images)
+
+        verifyImagesAction = QAction("Verify images", self)
+        verifyImagesAction.triggered.connect(self.verify_images)
+
+        mergeAction = QAction("Merge case from file...", self)
+        mergeAction.triggered.connect(self.merge_case)
+
+        # Actions that change the case on this side alone, off for shared cases, see `setup_client`.
+        self.local_actions = [saveAction, attachImagesAction, importEvidenceAction, importEventsAction, mergeAction]
 
         fileMenu.addAction(saveAction)
+        fileMenu.addAction(verifyAction)
+        fileMenu.addSeparator()
+        fileMenu.addAction(attachImagesAction)
+        fileMenu.addAction(verifyImagesAction)
+        fileMenu.addSeparator()
+        fileMenu.addAction(importEvidenceAction)
+        fileMenu.addAction(importEventsAction)
+        fileMenu.addAction(mergeAction)
+        fileMenu.addSeparator()
         fileMenu.addAction(exitAction)
 
         printMenu = self.menuBar.addMenu('Print')
@@ -106,21 +231,37 @@ class CaseController(ViewController):
         printPhysicalAction.setShortcut("Shift+Ctrl+P")
         printPhysicalAction.triggered.connect(self.print_evidence)
 
+        exportPdfAction = QAction("Export all to PDF...", self)
+        exportPdfAction.triggered.connect(self.export_pdf)
+
         printMenu.addAction(printAllAction)
         printMenu.addAction(printEventAction)
         printMenu.addAction(printPhysicalAction)
+        printMenu.addSeparator()
+        printMenu.addAction(exportPdfAction)
+
+        exportHtmlAction = QAction("Export all to HTML...", self)
+        exportHtmlAction.triggered.connect(self.export_html)
 
+        exportEventsAction = QAction("Export events...", self)
+        exportEventsAction.triggered.connect(lambda: self.export_records(False))
+
+        exportEvidenceAction = QAction("Export evidence...", self)
+        exportEvidenceAction.triggered.connect(lambda: self.export_records(True))
+
+        printMenu.addAction(exportHtmlAction)
+        printMenu.addAction(exportEvidenceAction)
+        printMenu.addAction(exportEventsAction)
+
+    @traced
     def load_case_into_tables(self):
         """
         Loads all relevant case information into tables.
+        The list models read straight from the case, rows are only made once the lists scroll to them.
         :return: None
         """
-        for event in self.case.events:
-            self.add_event(event.start_time, event.stop_time, event.comments, event.device)
-
-        for evidence in self.case.physical_evidence:
-            self.add_physical_evidence(evidence.seized_date, evidence.description,
-                                       evidence.additional_information, evidence.unique_identifier)
+        self.events_list_model.set_records(self.case.events)
+        self.physical_evidence_list_model.set_records(self.case.physical_evidence)
 
     # End configuration functions ------------------------------------------------------------------------------------
 
@@ -129,42 +270,53 @@ class CaseController(ViewController):
         Callback for when the add-button in the events-tab of the UI has been clicked.
         :return: None
         """
-        if self.start_time_field.text() == "" or self.stop_time_field.text() == "" or \
-                        self.comments_field.toPlainText() == "":
+        start_time, stop_time = self.field_time(self.start_time_field), self.field_time(self.stop_time_field)
+        if start_time == "" or stop_time == "" or self.comments_field.toPlainText() == "":
             return self.prompt_user_to_fill_all_fields()
 
         # Create and add event to case and then add to list of events
-        event = self.add_event(self.start_time_field.text(), self.stop_time_field.text(),
-                               self.comments_field.toPlainText(), self.selected_physical_item())
+        self.add_event(start_time, stop_time, self.comments_field.toPlainText(), self.selected_physical_item())
 
-        # Add event to case instance.
-        self.case.events += [event]
+        if self.search_field.text().strip() != "":
+            self.update_filters()  # Search results don't grow by themselves, see if the new event matches.
 
         self.clear_fields()
 
+    @classmethod
+    def field_time(cls, field: QDateTimeEdit) -> str:
+        """
+        Reads a date field as "dd/mm/yyyy hh:mm", whatever the locale shows it as, see `Timestamp.parse_time`.
+        `text()` follows the locale, and times that aren't in that format are kept as text that no time query finds.
+        :param field: Date field
+        :return: Date and time string, empty if the field has no valid date
+        """
+        date_time = field.dateTime()
+        return date_time.toString(cls.FIELD_TIME_FORMAT) if date_time.isValid() else ""
+
     def clicked_add_physical_evidence(self):
         """
         Callback for when the add-button in the physical evidence-tab of the UI has been clicked.
         :return: None
         """
         # Perform to check that no fields are empty
-        if self.additional_information_field.toPlainText() == "" or self.seized_date_field.text() == "" or \
+        seized_date = self.field_time(self.seized_date_field)
+        if self.additional_information_field.toPlainText() == "" or seized_date == "" or \
                 self.device_description_field.text() == "" or self.unique_identifier_field.text() == "":
             return self.prompt_user_to_fill_all_fields()
 
-        evidence = self.add_physical_evidence(self.seized_date_field.text(),
-                                              self.device_description_field.text(),
-                                              self.additional_information_field.toPlainText(),
-                                              self.unique_identifier_field.text())
+        self.add_physical_evidence(seized_date,
+                                   self.device_description_field.text(),
+                                   self.additional_information_field.toPlainText(),
+                                   self.unique_identifier_field.text())
 
-        # Add evidence to our case instance.
-        self.case.physical_evidence += [evidence]
+        if self.search_field.text().strip() != "":
+            self.update_filters()
 
         self.clear_fields()  # User probably don't want to add same stuff twice, so clear the fields.
 
     def add_event(self, start_time: str, stop_time: str, comments: str, device: str) -> Event:
         """
-        Adds an event to the UI list of events.
+        Adds an event to the case and the UI list of events.
         :param start_time: What date/time the user started working on this event.
         :param stop_time: Date/time user stopped working.
         :param comments: What the user has done during this time.
@@ -177,17 +329,20 @@ class CaseController(ViewController):
         event.comments = comments
         event.device = device
 
-        # Add to UI list
-        item = QStandardItem(event.comments)
-        item.setEditable(False)
-        self.events_list_model.appendRow([item])
+        if self.client is not None:
+            self.send(self.client.add_event(event))
+            return event
+
+        self.case.add_event(event)
+        self.events_list_model.records_appended()
+        self.changed()
 
         return event
 
     def add_physical_evidence(self, seized_date: str, device_description: str, additional_information: str,
                               unique_identifier: str) -> Evidence:
         """
-        Adds a physical evidence (device) to the UI list of evidence.
+        Adds a physical evidence (device) to the case and the UI list of evidence.
         Also returns back an evidence instance that can be used by whoever called this function.
         :param seized_date: Date the evidence has been seized
         :param device_description: A short description about the evidence.
@@ -201,27 +356,372 @@ class CaseController(ViewController):
         evidence.additional_information = additional_information
         evidence.unique_identifier = unique_identifier
 
-        item = QStandardItem(evidence.unique_identifier + "\n" + evidence.description)
-        item.setEditable(False)
-        self.physical_evidence_list_model.appendRow([item])
+        if self.client is not None:
+            self.send(self.client.add_evidence(evidence))
+            return evidence
+
+        self.case.add_evidence(evidence)
+        self.physical_evidence_list_model.records_appended()
+        self.changed()
 
         return evidence
 
+    def send(self, future):
+        """
+        Waits for the case server to answer an add without blocking, and tells the user if it was turned down.
+        :param future: Future of the add, see `CaseClient.add_event`
+        :return: None
+        """
+        def answered(done):
+            if done.exception() is not None:
+                self.client_signals.refused.emit(done.exception())
+
+        future.add_done_callback(answered)
+
+    def received_records(self, kind: str, first: int, records: list):
+        """
+        Adds records the case server sent to the case and the lists.
+        :param kind: "event" or "evidence"
+        :param first: Index of the first record
+        :param records: Events or evidence
+        :return: None
+        """
+        self.client.apply(kind, first, records)
+
+        if kind == "event":
+            self.events_list_model.records_appended()
+        else:
+            self.physical_evidence_list_model.records_appended()
+
+        if self.search_field.text().strip() != "":
+            self.search_timer.start()  # Records come in quickly when everyone is logging, search once they settle
+
+        self.update_title()
+
+    def update_title(self):
+        """
+        Shows who the case is shared through, and whether everything has been saved, in the title of the window.
+        :return: None
+        """
+        if self.client is None:
+            return
+
+        saved = self.client.saved == (len(self.case.events), len(self.case.physical_evidence))
+        self.setWindowTitle("Case: %s (shared from %s%s)" % (self.case.case_reference, self.client.address,
+                                                              "" if saved else ", saving..."))
+
+    @staticmethod
+    def add_refused(error: Exception):
+        """
+        Tells the user that the case server didn't add a record.
+        :param error: Why
+        :return: None
+        """
+        alert = QMessageBox()
+        alert.setIcon(QMessageBox.Warning)
+        alert.setText("The record was not added: " + str(error))
+        alert.exec_()
+
+    def disconnected(self, reason: str):
+        """
+        Tells the user that the connection to the case server was lost. The window stays open to read from, adding
+            records from then on is turned down by the client.
+        :param reason: Why
+        :return: None
+        """
+        self.setWindowTitle("Case: %s (disconnected from %s)" % (self.case.case_reference, self.client.address))
+
+        alert = QMessageBox()
+        alert.setIcon(QMessageBox.Critical)
+        alert.setText("Lost the connection to the case server: " + reason)
+        alert.setInformativeText("Everything the server acknowledged is in the case. Join it again to keep logging.")
+        alert.exec_()
+
+    def closeEvent(self, event):
+        if self.client is not None:
+            self.client.close()
+
+        # Only written now, it's the whole index every time. Runs after any save still going, see `TaskRunner`.
+        TaskRunner.shared().run(self.case.write_search_index, key=self.case.save_location)
+
+        super().closeEvent(event)
+
+    def import_records(self, evidence: bool):
+        """
+        Asks the user for a CSV or JSON Lines file and imports events or evidence from it.
+        The file is read on a worker thread. The lists are told about new rows a batch at a time as they come in.
+        :param evidence: Import evidence rather than events
+        :return: None
+        """
+        kind = "evidence" if evidence else "events"
+        location = QFileDialog.getOpenFileName(self, "Import " + kind, "",
+                                               "CSV or JSON Lines (*.csv *.jsonl *.ndjson *.json)")[0]
+        if location == "":
+            return  # User pressed cancel.
+
+        importer = CaseImporter(self.case)
+        model = self.physical_evidence_list_model if evidence else self.events_list_model
+        function = importer.import_evidence if evidence else importer.import_events
+
+        progress_dialog = QProgressDialog("Importing " + kind + "...", "Stop", 0, 1000, self)
+        progress_dialog.setWindowModality(Qt.WindowModal)
+        progress_dialog.setMinimumDuration(500)
+
+        # The case is changing under us and its indexes aren't locked, keep the user out of it until the import's done
+        # rather than until the dialog shows up.
+        self.set_importing(True)
+        task = TaskRunner.shared().run(function, location, key=self.case.save_location, progress=True)
+
+        def progress(done: int, total: int):
+            model.records_appended()  # Batches are already in the case, show them.
+            progress_dialog.setValue(int(1000 * done / max(total, 1)))
+
+        def finished(_):
+            progress_dialog.reset()
+            self.set_importing(False)
+            model.records_appended()
+
+            self.changed()
+            self.import_finished(importer)
+
+        task.signals.progress.connect(progress)
+        task.signals.finished.connect(finished)
+        task.signals.failed.connect(lambda _: progress_dialog.reset())
+        task.signals.failed.connect(lambda _: self.set_importing(False))
+        task.signals.failed.connect(lambda _: model.records_appended())
+        task.signals.failed.connect(self.import_failed)
+        progress_dialog.canceled.connect(task.cancel)
+
+    def set_importing(self, importing: bool):
+        """
+        Turns off everything in the window that reads or changes the case while records are imported on a worker, and
+            back on after. Tasks that share the case's key wait for the import by themselves.
+        :param importing: Whether an import is starting or has ended
+        :return: None
+        """
+        if importing:
+            self.search_timer.stop()  # A search waiting to run would run mid-import
+
+        # Disabled children keep their own state, so the add-event button stays off if no evidence is selected.
+        for widget in [self.search_field, self.events_list, self.filter_events_checkbox, self.physical_evidence_list,
+                       self.toolBox, self.menuBar]:
+            widget.setDisabled(importing)
+
+        if not importing and self.search_field.text().strip() != "":
+            self.search_timer.start()  # Search results don't grow by themselves
+
+    @staticmethod
+    def import_finished(importer: CaseImporter):
+        """
+        Tells the user how the import went.
+        :param importer: Importer that has finished
+        :return: None
+        """
+        text = "Imported %d, skipped %d." % (importer.imported, importer.skipped)
+        if importer.errors:
+            text += "\n\n" + "\n".join(importer.errors[:10])
+            if importer.skipped > 10:
+                text += "\n..."
+
+        alert = QMessageBox()
+        alert.setIcon(QMessageBox.Information if importer.skipped == 0 else QMessageBox.Warning)
+        alert.setText(text)
+        alert.exec_()
+
+    @staticmethod
+    def import_failed(error: Exception):
+        """
+        Tells the user that a file could not be imported.
+        :param error: What went wrong
+        :return: None
+        """
+        alert = QMessageBox()
+        alert.setIcon(QMessageBox.Critical)
+        alert.setText("Could not import the file: " + str(error))
+        alert.exec_()
+
+    def merge_case(self):
+        """
+        Asks the user for another copy of this case, and works out how it differs from this one on a worker thread,
+            see `CaseMerger`. What it would merge is shown before anything is merged.
+        :return: None
+        """
+        location = QFileDialog.getOpenFileName(self, "Merge case", "", "Case files (*.digicase *.digidb);;"
+                                                                       "All files (*)")[0]
+        if location == "":
+            return  # User pressed cancel.
+
+        def compare(progress=None) -> CaseMerger:
+            theirs = Case.open_from_disk(location)
+            if theirs is None:
+                raise MergeError("Corrupt case file or invalid file type.")
+
+            merger = CaseMerger(self.case, theirs)
+            return merger if merger.compare(progress) else None
+
+        progress_dialog = QProgressDialog("Comparing cases...", "Cancel", 0, 1000, self)
+        progress_dialog.setWindowModality(Qt.WindowModal)
+        progress_dialog.setMinimumDuration(500)
+
+        task = TaskRunner.shared().run(compare, key=self.case.save_location, progress=True)
+
+        task.signals.progress.connect(lambda done, total: progress_dialog.setValue(int(1000 * done / max(total, 1))))
+        task.signals.finished.connect(lambda _: progress_dialog.reset())
+        task.signals.finished.connect(self.cases_compared)
+        task.signals.failed.connect(lambda _: progress_dialog.reset())
+        task.signals.failed.connect(self.merge_failed)
+        progress_dialog.canceled.connect(task.cancel)
+
+    def cases_compared(self, merger: CaseMerger):
+        """
+        Shows what merging would do, and merges on a worker thread if the user wants to, asking whose records to
+            keep where both cases changed them.
+        :param merger: Merger that has compared the cases, None if the user cancelled
+        :return: None
+        """
+        if merger is None:
+            return
+
+        counts = merger.counts()
+        lines = []
+        for kind in ("evidence", "events"):
+            lines += ["%d %s %s" % (count, kind, status) for status, count in counts[kind].items() if count]
+        if merger.details:
+            lines.append("Case details differ, these are kept: " + ", ".join(merger.details).replace("_", " "))
+
+        incoming = sum(counts[kind][status] for kind in counts
+                       for status in (CaseMerger.ADDED, CaseMerger.THEIRS_CHANGED, CaseMerger.CONFLICT))
+
+        alert = QMessageBox()
+        alert.setInformativeText("\n".join(lines) or "The cases are the same.")
+        if incoming == 0:
+            alert.setIcon(QMessageBox.Information)
+            alert.setText("There is nothing to merge from that case.")
+            alert.exec_()
+            return
+
+        alert.setIcon(QMessageBox.Question)
+        conflicts = merger.conflicts()
+        if conflicts:
+            alert.setText("%d records were changed in both cases. Whose changes should be kept?" % conflicts)
+            keep_ours = alert.addButton("Keep ours", QMessageBox.AcceptRole)
+            take_theirs = alert.addButton("Take theirs", QMessageBox.AcceptRole)
+        else:
+            alert.setText("Merge these records into this case?")
+            keep_ours = alert.addButton("Merge", QMessageBox.AcceptRole)
+            take_theirs = None
+        alert.addButton(QMessageBox.Cancel)
+        alert.exec_()
+
+        clicked = alert.clickedButton()
+        if clicked is None or clicked not in (keep_ours, take_theirs):
+            return
+
+        progress_dialog = QProgressDialog("Merging...", None, 0, 1000, self)
+        progress_dialog.setWindowModality(Qt.WindowModal)  # The case is changing under us, keep the user out of it.
+        progress_dialog.setMinimumDuration(500)
+
+        task = TaskRunner.shared().run(merger.merge, clicked is take_theirs, key=self.case.save_location,
+                                       progress=True)
+
+        def finished(_):
+            progress_dialog.reset()
+            self.load_case_into_tables()  # Replaced records change rows that are already listed
+            self.update_filters()
+            self.changed()
+
+        task.signals.progress.connect(lambda done, total: progress_dialog.setValue(int(1000 * done / max(total, 1))))
+        task.signals.finished.connect(finished)
+        task.signals.failed.connect(lambda _: progress_dialog.reset())
+        task.signals.failed.connect(self.merge_failed)
+
+    @staticmethod
+    def merge_failed(error: Exception):
+        """
+        Tells the user that a case could not be merged.
+        :param error: What went wrong
+        :return: None
+        """
+        alert = QMessageBox()
+        alert.setIcon(QMessageBox.Critical)
+        alert.setText("Could not merge the case: " + str(error))
+        alert.exec_()
+
     def selected_physical_item(self) -> str:
         """
-        Returns the unique identifier of the currently selected item in the physical evidence-list
+        Returns the unique identifier of the currently selected item in the physical evidence-list.
+        The item stays selected when a search hides it from the list.
         :return: Unique identifier of the currently selected item.
         """
-        selected_index = self.physical_evidence_list.selectedIndexes()[0]  # Just support selecting one item at a time
-        return self.case.physical_evidence[selected_index.row()].unique_identifier
+        return self.selected_device
 
-    def selected_physical_evidence(self):
+    def selected_physical_evidence(self, current: QModelIndex):
         """
         Gets notified when an item in the physical evidence-list is selected and enables the event-add-button.
+        :param current: Index of the selected row
         :return: None
         """
+        if not current.isValid():
+            return  # Selection was lost to the list being filtered, the item is still selected as far as we care.
+
+        self.selected_device = self.physical_evidence_list_model.record(current.row()).unique_identifier
         self.add_event_button.setDisabled(False)
 
+        if self.filter_events_checkbox.isChecked():
+            self.update_filters()
+
+    def update_filters(self):
+        """
+        Narrows the lists down to what's typed in the search field, and the events down to the selected item if the
+            user has asked for that. Both are answered by the case's indexes, not by going through every record.
+        :return: None
+        """
+        query = self.search_field.text().strip()
+
+        event_rows = None
+        if self.filter_events_checkbox.isChecked() and self.selected_device is not None:
+            event_rows = self.case.event_indexes_for_device(self.selected_device)
+
+        if query != "":
+            found = self.case.search_events(query)
+            if event_rows is None:
+                event_rows = found
+            else:
+                device_rows = set(event_rows)
+                event_rows = [index for index in found if index in device_rows]
+
+        if event_rows is not None or self.events_list_model.rows is not None:
+            self.events_list_model.set_filter(event_rows)
+
+        evidence_rows = self.case.search_evidence(query) if query != "" else None
+        if evidence_rows is not None or self.physical_evidence_list_model.rows is not None:
+            self.physical_evidence_list_model.set_filter(evidence_rows)
+            self.show_selected_physical_item()
+
+    def show_selected_physical_item(self):
+        """
+        Selects the selected item in the physical evidence-list again after the list has changed, if it's listed.
+        :return: None
+        """
+        evidence = self.case.evidence_index(self.selected_device) if self.selected_device is not None else None
+        if evidence is None:
+            return
+
+        model = self.physical_evidence_list_model
+        if model.rows is None:
+            row = evidence
+        else:
+            row = bisect.bisect_left(model.rows, evidence)  # Search results are in ascending order
+            if row == len(model.rows) or model.rows[row] != evidence:
+                return  # Not in the search results
+
+        while model.rowCount() <= row and model.canFetchMore():
+            model.fetchMore()
+
+        self.physical_evidence_list.selectionModel().blockSignals(True)  # It's the same item, nothing to update
+        self.physical_evidence_list.setCurrentIndex(model.index(row))
+        self.physical_evidence_list.selectionModel().blockSignals(False)
+
     def clear_fields(self):
         """
         Clears the fields in the event and evidence logging tabs.
@@ -250,8 +750,237 @@ class CaseController(ViewController):
             else:
                 return
 
-        self.case.save_to_disk()
+        task = TaskRunner.shared().run(self.case.save_to_disk, key=self.case.save_location)
+        task.signals.finished.connect(lambda _: self.catalog())
+        task.signals.failed.connect(self.save_failed)
+
+    def catalog(self, opened: bool = False):
+        """
+        Updates the case's entry in the case catalog on a worker thread, so it shows up on the welcome screen.
+        The catalog not working is only worth a line in the console, the case itself is fine.
+        :param opened: Whether the case has just been opened, rather than saved
+        :return: None
+        """
+        if self.case.save_location is None:
+            return
+
+        def record():
+            try:
+                CaseCatalog.shared().record(self.case, opened)
+            except (CatalogError, sqlite3.Error, OSError) as error:
+                print("Could not update the case catalog: " + str(error))
+
+        TaskRunner.shared().run(record, key=CaseCatalog)
+
+    def changed(self):
+        """
+        Called after the case has been changed, autosaves if enough has changed since the last autosave.
+        :return: None
+        """
+        if self.client is not None:
+            return  # The server saves shared cases
+
+        if self.case.revision - self.autosaved_revision >= self.AUTOSAVE_CHANGES:
+            self.autosave()
+
+    def autosave(self):
+        """
+        Saves the case and keeps a snapshot of it on a worker thread, if it has changed, see `Case.autosave`.
+        Cases that haven't been saved yet are kept in the recovery folder until they are.
+        :return: None
+        """
+        if self.autosave_task is not None:
+            return  # Still busy with the last one
+
+        self.autosaved_revision = self.case.revision
+        self.autosave_timer.start()  # Wait a whole interval from now before the next one
+
+        self.autosave_task = TaskRunner.shared().run(self.case.autosave, key=self.case.save_location)
+        self.autosave_task.signals.finished.connect(self.autosave_finished)
+        self.autosave_task.signals.failed.connect(self.autosave_failed)
+
+    def autosave_finished(self, snapshot: str):
+        self.autosave_task = None
+        self.autosave_warned = False
+
+        if snapshot is not None:
+            self.catalog()
+
+    def autosave_failed(self, error: Exception):
+        """
+        Tells the user that autosave didn't work, once, rather than on every try.
+        :param error: What went wrong
+        :return: None
+        """
+        self.autosave_task = None
+        if self.autosave_warned:
+            return
+
+        self.autosave_warned = True
+        alert = QMessageBox()
+        alert.setIcon(QMessageBox.Warning)
+        alert.setText("Could not autosave the case: " + str(error))
+        alert.exec_()
+
+    def verify(self):
+        """
+        Checks every record against the case's ledger on a worker thread and tells the user how it went.
+        :return: None
+        """
+        task = TaskRunner.shared().run(self.case.verify, True, key=self.case.save_location)
+        task.signals.finished.connect(self.verified)
+        task.signals.failed.connect(self.report_failed)
+
+    def verified(self, problems: [str]):
+        """
+        Shows the outcome of `verify`, with the ledger head the user can note down to check against later.
+        :param problems: What's wrong, if anything
+        :return: None
+        """
+        alert = QMessageBox()
+        if problems:
+            alert.setIcon(QMessageBox.Critical)
+            alert.setText("Some records don't match the ledger:\n\n" + "\n".join(problems[:10]) +
+                          ("\n..." if len(problems) > 10 else ""))
+        else:
+            alert.setIcon(QMessageBox.Information)
+            alert.setText("Every record matches the ledger.")
+
+        alert.setInformativeText("Ledger head: " + self.case.ledger.head_hex())
+        alert.setTextInteractionFlags(Qt.TextSelectableByMouse)
+        alert.exec_()
+
+    def attach_images(self):
+        """
+        Asks the user for images acquired from the selected evidence, and hashes them on a worker thread before
+            attaching them, see `ImageHasher`.
+        :return: None
+        """
+        index = self.case.evidence_index(self.selected_device) if self.selected_device is not None else None
+        if index is None:
+            alert = QMessageBox()
+            alert.setIcon(QMessageBox.Information)
+            alert.setText("Select the evidence the images were acquired from first.")
+            alert.exec_()
+            return
+
+        locations = QFileDialog.getOpenFileNames(self, "Attach images to " + self.selected_device, "",
+                                                 "Forensic images (*.E01 *.e01 *.dd *.raw *.img *.aff *.001);;"
+                                                 "All files (*)")[0]
+        if not locations:
+            return  # User pressed cancel.
+
+        task = self.run_hashing("Hashing images...", ImageHasher(CaseCatalog.shared()).hash_files, locations)
+        task.signals.finished.connect(lambda images: self.images_hashed(index, images))
+
+    def images_hashed(self, index: int, images: [EvidenceImage]):
+        """
+        Attaches hashed images to evidence and shows their digests. Images attached before from the same files are
+            replaced.
+        :param index: Index of the evidence
+        :param images: Hashed images, None if the user cancelled
+        :return: None
+        """
+        if images is None:
+            return
+
+        hashed = {image.location for image in images}
+        evidence = self.case.physical_evidence[index]
+        self.case.set_evidence_images(index, [image for image in evidence.images if image.location not in hashed] +
+                                      images)
+        self.changed()
+
+        alert = QMessageBox()
+        alert.setIcon(QMessageBox.Information)
+        alert.setText("Attached %d image%s to %s." % (len(images), "" if len(images) == 1 else "s",
+                                                     evidence.unique_identifier))
+        alert.setInformativeText("\n\n".join("%s\nMD5: %s\nSHA-1: %s\nSHA-256: %s"
+                                              % (image.name, image.md5, image.sha1, image.sha256)
+                                              for image in images))
+        alert.setTextInteractionFlags(Qt.TextSelectableByMouse)
+        alert.exec_()
+
+    def verify_images(self):
+        """
+        Checks every attached image against its digests on a worker thread. Images that haven't changed size or
+            modification time since they were hashed aren't read again.
+        :return: None
+        """
+        images = [image for evidence in self.case.physical_evidence for image in evidence.images]
+        if not images:
+            alert = QMessageBox()
+            alert.setIcon(QMessageBox.Information)
+            alert.setText("No images have been attached to this case's evidence.")
+            alert.exec_()
+            return
+
+        task = self.run_hashing("Verifying images...", ImageHasher().verify, images)
+        task.signals.finished.connect(lambda problems: self.images_verified(problems, len(images)))
+
+    @staticmethod
+    def images_verified(problems: [str], count: int):
+        """
+        Shows the outcome of `verify_images`.
+        :param problems: What's wrong, if anything, None if the user cancelled
+        :param count: Images checked
+        :return: None
+        """
+        if problems is None:
+            return
+
+        alert = QMessageBox()
+        if problems:
+            alert.setIcon(QMessageBox.Critical)
+            alert.setText("Some images don't match their digests:\n\n" + "\n".join(problems[:10]) +
+                          ("\n..." if len(problems) > 10 else ""))
+        else:
+            alert.setIcon(QMessageBox.Information)
+            alert.setText("All %d images match their digests." % count)
+        alert.exec_()
+
+    def run_hashing(self, label: str, function, *args) -> Task:
+        """
+        Runs an `ImageHasher` function on a worker thread with a progress dialog that can cancel it.
+        :param label: Text to show in the progress dialog
+        :param function: Function taking a `progress` argument
+        :return: Task doing the hashing
+        """
+        progress_dialog = QProgressDialog(label, "Cancel", 0, 1000, self)  # Images are too big to count bytes in
+        progress_dialog.setWindowModality(Qt.WindowModal)
+        progress_dialog.setMinimumDuration(500)
+
+        task = TaskRunner.shared().run(function, *args, progress=True)
+
+        task.signals.progress.connect(lambda done, total: progress_dialog.setValue(int(1000 * done / max(total, 1))))
+        task.signals.finished.connect(lambda _: progress_dialog.reset())
+        task.signals.failed.connect(lambda _: progress_dialog.reset())
+        task.signals.failed.connect(self.hashing_failed)
+        progress_dialog.canceled.connect(task.cancel)
+
+        return task
+
+    @staticmethod
+    def hashing_failed(error: Exception):
+        """
+        Tells the user that images could not be hashed.
+        :param error: What went wrong
+        :return: None
+        """
+        alert = QMessageBox()
+        alert.setIcon(QMessageBox.Critical)
+        alert.setText("Could not hash the images: " + str(error))
+        alert.exec_()
 
+    def save_failed(self, error: Exception):
+        """
+        Tells the user that the case could not be saved.
+        :param error: What went wrong
+        :return: None
+        """
+        alert = QMessageBox()
+        alert.setIcon(QMessageBox.Critical)
+        alert.setText("Could not save the case: " + str(error))
+        alert.exec_()
 
     def print_all(self):
         """
@@ -268,27 +997,96 @@ class CaseController(ViewController):
         if printer is None:  # User obviously don't want to print after all.
             return
 
-        # Starting and ending a painter will enable us to print mulitple pages in one document.
-        # The printer will start printing when painter.end() is called.
-        painter = QPainter()
-        painter.begin(printer)
+        task = self.run_report("Preparing print...", CaseReport(self.case).print, printer)
+        task.print_dialog = print_dialog  # The printer belongs to the dialog, so keep it around until we're done.
+
+    def export_pdf(self):
+        """
+        Asks the user where to put a PDF and writes the whole case to it.
+        :return: None
+        """
+        location = QFileDialog.getSaveFileName(self, "Export to PDF", "", "PDF document (*.pdf)")[0]
+        if location == "":
+            return  # User pressed cancel.
+
+        if not location.lower().endswith(".pdf"):
+            location += ".pdf"
+
+        self.run_report("Exporting to PDF...", ParallelReport(self.case).write_pdf, location)
+
+    def export_html(self):
+        """
+        Asks the user where to put an HTML file and writes the whole case to it.
+        :return: None
+        """
+        location = QFileDialog.getSaveFileName(self, "Export to HTML", "", "HTML document (*.html)")[0]
+        if location == "":
+            return  # User pressed cancel.
+
+        if not location.lower().endswith((".html", ".htm")):
+            location += ".html"
+
+        self.run_report("Exporting to HTML...", self.case.export_html, location)
+
+    def export_records(self, evidence: bool):
+        """
+        Asks the user where to put a CSV or JSON Lines file and writes events or evidence to it.
+        The files can be imported into another case with `import_records`.
+        :param evidence: Export evidence rather than events
+        :return: None
+        """
+        kind = "evidence" if evidence else "events"
+        location, chosen_filter = QFileDialog.getSaveFileName(self, "Export " + kind, "",
+                                                              "CSV (*.csv);;JSON Lines (*.jsonl)")
+        if location == "":
+            return  # User pressed cancel.
+
+        extension = ".jsonl" if "jsonl" in chosen_filter else ".csv"
+        if os.path.splitext(location)[1] == "":
+            location += extension
+
+        function = self.case.export_evidence if evidence else self.case.export_events
+        self.run_report("Exporting " + kind + "...", function, location)
 
-        for event in self.case.events:
-            self.print(printer, self.case.event_to_html(event), painter)
+    def run_report(self, label: str, function, *args) -> Task:
+        """
+        Runs a `CaseReport` or export function on a worker thread with a progress dialog that can cancel it.
+        :param label: Text to show in the progress dialog
+        :param function: Function taking a `progress` argument
+        :return: Task running the report
+        """
+        progress_dialog = QProgressDialog(label, "Cancel", 0, max(CaseReport(self.case).record_count(), 1), self)
+        progress_dialog.setWindowModality(Qt.WindowModal)
+        progress_dialog.setMinimumDuration(500)  # Don't flash a dialog for small cases
 
-            printer.newPage()
+        task = TaskRunner.shared().run(function, *args, progress=True)
 
-        first = True
-        for evidence in self.case.physical_evidence:
-            # Stops us from having an empty page at the end of the document
-            if first:
-                first = False
+        def progress(done: int, total: int):
+            if done >= total:
+                progress_dialog.setLabelText("Laying out pages...")
+                progress_dialog.setRange(0, 0)  # Layout doesn't report progress, so just show that we're busy.
             else:
-                printer.newPage()
+                progress_dialog.setMaximum(total)  # Exports of only events or evidence count fewer records
+                progress_dialog.setValue(done)
 
-            self.print(printer, self.case.evidence_to_html(evidence), painter)
+        task.signals.progress.connect(progress)
+        task.signals.finished.connect(lambda _: progress_dialog.reset())
+        task.signals.failed.connect(lambda _: progress_dialog.reset())
+        task.signals.failed.connect(self.report_failed)
+        progress_dialog.canceled.connect(task.cancel)
 
-        painter.end()
+        return task
+
+    def report_failed(self, error: Exception):
+        """
+        Tells the user that printing or exporting failed.
+        :param error: What went wrong
+        :return: None
+        """
+        alert = QMessageBox()
+        alert.setIcon(QMessageBox.Critical)
+        alert.setText("Could not print or export the case: " + str(error))
+        alert.exec_()
 
     def print_event(self):
         """
@@ -308,7 +1106,7 @@ class CaseController(ViewController):
 
         printer = print_dialog.printer()
 
-        self.print(printer, self.case.event_to_html(self.case.events[selected_index]))
+        self.print(printer, self.case.event_to_html(self.events_list_model.record(selected_index)))
 
     def print_evidence(self):
         """
@@ -328,9 +1126,10 @@ class CaseController(ViewController):
         # Only one item can be selected at a time anyway, so we just default to index 0
         selected_index = indexes[0].row()
 
-        self.print(printer, self.case.event_to_html(self.case.events[selected_index]))
+        self.print(printer, self.case.evidence_to_html(self.physical_evidence_list_model.record(selected_index)))
 
     @staticmethod
+    @traced
     def print(printer: QPrinter, html: str, painter=None):
         """
         Prints the given html either directly to the printer or through a painter object.
@@ -1,4 +1,4 @@
-from PyQt5.Qt import QLineEdit  # For type annotation only, speeds up development in PyCharm.
+from PyQt5.QtWidgets import QLineEdit  # For type annotation only, speeds up development in PyCharm.
 
 from ViewController import ViewController
 
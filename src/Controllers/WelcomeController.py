@@ -1,8 +1,15 @@
-from PyQt5.Qt import QFileDialog, QMessageBox
+from PyQt5.QtGui import QStandardItem, QStandardItemModel
+from PyQt5.QtWidgets import QAbstractItemView, QFileDialog, QHeaderView, QInputDialog, QLineEdit, QMessageBox
+
+import sqlite3
 
 from ViewController import ViewController
+from TaskRunner import TaskRunner
 
 from Models.Case import Case
+from Models.CaseCatalog import CaseCatalog, CatalogError
+from Models.CaseClient import CaseClient
+from Models.CaseServer import PORT
 
 from Controllers.CaseController import CaseController
 from Controllers.NewCaseController import NewCaseController
@@ -11,10 +18,15 @@ from Controllers.NewCaseController import NewCaseController
 class WelcomeController(ViewController):
     """
     The first view the user is greeted with.
-    Gives the user the chance to open an existing case or start a new one.
+    Gives the user the chance to open an existing case or start a new one, or join a case shared by a case server
+        (see `CaseServer`).
 
-    Supposed to show recently opened cases as well, but never got that far.
+    Also lists the cases most recently opened or saved, from the case catalog (see `CaseCatalog`). Typing in the search
+        field searches every case in the catalog instead, by reference, investigator, location or evidence identifier.
     """
+    CATALOG_COLUMNS = (("case_reference", "Case reference"), ("lab_reference", "Lab reference"),
+                       ("investigator", "Investigator"), ("events", "Events"), ("evidence", "Evidence"),
+                       ("used", "Last used"), ("location", "Location"))
 
     def __init__(self):
         """
@@ -22,9 +34,53 @@ class WelcomeController(ViewController):
         """
         super().__init__("welcome.ui")
 
-        # Connect our two buttons for opening a project or starting a new one.
+        # Connect our buttons for opening a project, starting a new one or joining a shared one.
         self.new_case_button.clicked.connect(self.start_new_case)
         self.open_case_button.clicked.connect(self.open_case)
+        self.join_case_button.clicked.connect(self.join_case)
+
+        self.recent_cases_model = QStandardItemModel(self)
+        self.recent_cases_model.setHorizontalHeaderLabels([title for _, title in self.CATALOG_COLUMNS])
+        self.recent_cases_table.setModel(self.recent_cases_model)
+        self.recent_cases_table.setSelectionBehavior(QAbstractItemView.SelectRows)
+        self.recent_cases_table.setEditTriggers(QAbstractItemView.NoEditTriggers)
+        self.recent_cases_table.verticalHeader().hide()
+        self.recent_cases_table.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeToContents)
+        self.recent_cases_table.doubleClicked.connect(self.open_catalogued_case)
+
+        self.search_field.textChanged.connect(self.show_cases)
+        self.show_cases()
+
+    def show_cases(self):
+        """
+        Fills the table with the recent cases, or the cases matching the search field.
+        :return: None
+        """
+        text = self.search_field.text().strip()
+        try:
+            cases = CaseCatalog.shared().search(text) if text else CaseCatalog.shared().recent()
+        except (CatalogError, sqlite3.Error, OSError) as error:
+            print("Could not read the case catalog: " + str(error))
+            cases = []
+
+        self.recent_cases_model.setRowCount(0)
+        for case in cases:
+            case["used"] = CaseCatalog.local_time(max(case["saved"] or 0, case["opened"] or 0) or None)
+
+            row = []
+            for key, _ in self.CATALOG_COLUMNS:
+                item = QStandardItem("" if case[key] is None else str(case[key]))
+                item.setData(case["location"])  # Stored as `Qt.UserRole + 1`, for opening the case
+                row.append(item)
+            self.recent_cases_model.appendRow(row)
+
+    def open_catalogued_case(self, index):
+        """
+        Opens the case double clicked in the table.
+        :param index: Model index of the clicked cell
+        :return: None
+        """
+        self.open_location(self.recent_cases_model.itemFromIndex(index).data())
 
     def start_new_case(self):
         """
@@ -56,7 +112,28 @@ class WelcomeController(ViewController):
         if user_location == '':
             return  # User most likely pressed cancel.
 
-        case = Case.open_from_disk(user_location)
+        self.open_location(user_location)
+
+    def open_location(self, user_location: str):
+        """
+        Opens the case at a location, on a worker thread.
+        :param user_location: Location of the case file
+        :return: None
+        """
+        # Opening big cases takes a while, so do it on a worker thread and come back to `opened_case` when done.
+        self.open_case_button.setDisabled(True)
+
+        task = TaskRunner.shared().run(Case.open_from_disk, user_location, key=user_location)
+        task.signals.finished.connect(self.opened_case)
+        task.signals.failed.connect(lambda _: self.opened_case(None))
+
+    def opened_case(self, case: Case):
+        """
+        Called when a case has been opened from disk.
+        :param case: The opened case, or None if it couldn't be opened.
+        :return: None
+        """
+        self.open_case_button.setDisabled(False)
 
         if case is None:  # Something bad must have happened. Tell the user that the file is corrupt. Or invalid.
             alert = QMessageBox()
@@ -71,3 +148,52 @@ class WelcomeController(ViewController):
             case_controller = CaseController(case)
 
             self.open_window(case_controller)
+
+    def join_case(self):
+        """
+        Asks the user where a case is shared from and its secret, and joins it on a worker thread.
+        :return: None
+        """
+        address, clicked_ok = QInputDialog.getText(self, "Join shared case",
+                                                   "Address of the case server, like 192.168.1.20:%d:" % PORT,
+                                                   QLineEdit.Normal, "127.0.0.1:%d" % PORT)
+        address = address.strip()
+        if not clicked_ok or address == "":
+            return
+
+        host, _, port = address.rpartition(":") if ":" in address else (address, None, str(PORT))
+        if not port.isdigit():
+            return self.joined_case(None, "%s is not a port." % port)
+
+        secret, clicked_ok = QInputDialog.getText(self, "Join shared case",
+                                                  "Secret the case server printed when it started:", QLineEdit.Password)
+        if not clicked_ok or secret.strip() == "":
+            return
+
+        client = CaseClient(host, int(port), secret.strip())
+        self.join_case_button.setDisabled(True)
+
+        # Copying a big case over takes a while, like opening one does.
+        task = TaskRunner.shared().run(client.connect)
+        task.signals.finished.connect(lambda _: self.joined_case(client))
+        task.signals.failed.connect(lambda error: self.joined_case(None, str(error)))
+
+    def joined_case(self, client: CaseClient, error: str = None):
+        """
+        Called when a shared case has been joined.
+        :param client: Connected client, or None if the case couldn't be joined.
+        :param error: What went wrong, if the case couldn't be joined
+        :return: None
+        """
+        self.join_case_button.setDisabled(False)
+
+        if client is None:
+            alert = QMessageBox()
+            alert.setText("Could not join the case: " + error)
+            alert.setIcon(QMessageBox.Critical)
+            alert.exec_()
+            return
+
+        case_controller = CaseController(client.case, client)
+
+        self.open_window(case_controller)
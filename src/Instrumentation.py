@@ -0,0 +1,170 @@
+"""
+Opt-in timing of the parts of Digidence that get slow on big cases, for finding out where the time goes.
+
+Functions marked with `@traced` are timed and counted while tracing is on. When it's off they cost one extra function
+    call, nothing is recorded. Turn it on with the DIGIDENCE_TRACE environment variable, or `--trace` on the command
+    line, set to where the trace should go:
+
+        DIGIDENCE_TRACE=trace.json python Main.py
+        ./digidence --trace trace.json report case.digicase
+
+The trace is written when the program exits, in Chrome's trace event format, which chrome://tracing and
+    https://ui.perfetto.dev open. It also holds a summary of calls and time per function under "otherData".
+DIGIDENCE_PROFILE, or `--profile`, also runs the main thread under cProfile and writes its statistics there, for
+    `python -m pstats` or snakeviz.
+"""
+import cProfile
+import functools
+import json
+import os
+import threading
+import time
+
+MAX_EVENTS = 500000  # Trace events kept, calls after that are only counted so tracing long sessions doesn't run away
+
+_tracer = None  # type: Tracer  # The tracer while tracing is on
+
+
+class Tracer(object):
+    """
+    Collects timed calls as trace events, along with the number of calls and time per function.
+    """
+
+    def __init__(self, location: str, profile_location: str = None):
+        """
+        Initiates a tracer, it's only used once passed to `start`.
+        :param location: Where to write the trace, or None to only profile
+        :param profile_location: Where to write cProfile statistics, or None to leave cProfile out
+        """
+        self.location = location
+        self.profile_location = profile_location
+
+        self.events = []  # Complete trace events, see `add`
+        self.dropped = 0  # Calls not kept as events after `MAX_EVENTS`
+        self.summary = {}  # type: {str: [int, float, float]}  # Calls, total and longest seconds by name
+        self.threads = {}  # type: {int: str}  # Names of the threads seen
+
+        self.lock = threading.Lock()
+        self.process = os.getpid()
+        self.started = time.perf_counter()
+        self.profile = cProfile.Profile() if profile_location else None
+
+    def add(self, name: str, category: str, start: float, duration: float):
+        """
+        Records a call.
+        :param name: What was called
+        :param category: Module it's in, so the trace can be filtered
+        :param start: `time.perf_counter` when the call started
+        :param duration: Seconds the call took
+        """
+        thread = threading.get_ident()
+
+        with self.lock:
+            totals = self.summary.get(name)
+            if totals is None:
+                totals = self.summary[name] = [0, 0.0, 0.0]
+            totals[0] += 1
+            totals[1] += duration
+            totals[2] = max(totals[2], duration)
+
+            if thread not in self.threads:
+                self.threads[thread] = threading.current_thread().name
+
+            if len(self.events) < MAX_EVENTS:
+                self.events.append({"name": name, "cat": category, "ph": "X", "pid": self.process, "tid": thread,
+                                    "ts": (start - self.started) * 1e6, "dur": duration * 1e6})
+            else:
+                self.dropped += 1
+
+    def write(self):
+        """
+        Writes the trace and profile out.
+        :return: None
+        """
+        if self.profile is not None:
+            self.profile.disable()
+            self.profile.dump_stats(self.profile_location)
+
+        if self.location is None:
+            return
+
+        with self.lock:
+            metadata = [{"name": "thread_name", "ph": "M", "pid": self.process, "tid": thread,
+                         "args": {"name": name}} for thread, name in self.threads.items()]
+            summary = {name: {"calls": calls, "total_ms": total * 1000, "longest_ms": longest * 1000}
+                       for name, (calls, total, longest) in sorted(self.summary.items(),
+                                                                   key=lambda item: -item[1][1])}
+            trace = {"traceEvents": metadata + self.events, "displayTimeUnit": "ms",
+                     "otherData": {"summary": summary, "dropped_events": self.dropped}}
+
+        with open(self.location, "w") as file:
+            json.dump(trace, file)
+
+
+def start(location: str = None, profile_location: str = None):
+    """
+    Turns tracing on, until `stop`.
+    :param location: Where to write the trace
+    :param profile_location: Where to write cProfile statistics of the calling thread, if anywhere
+    :return: None
+    """
+    global _tracer
+
+    if _tracer is not None or (location is None and profile_location is None):
+        return
+
+    tracer = Tracer(location, profile_location)
+    if tracer.profile is not None:
+        tracer.profile.enable()
+
+    _tracer = tracer
+
+
+def start_from_environment(location: str = None, profile_location: str = None):
+    """
+    Turns tracing on if DIGIDENCE_TRACE or DIGIDENCE_PROFILE is set, or locations are given, which win over them.
+    Only called by the program itself, so report workers (see `ParallelReport`) don't write over its trace.
+    :param location: Where to write the trace, like from `--trace`
+    :param profile_location: Where to write cProfile statistics, like from `--profile`
+    :return: None
+    """
+    start(location or os.environ.get("DIGIDENCE_TRACE") or None,
+          profile_location or os.environ.get("DIGIDENCE_PROFILE") or None)
+
+
+def stop():
+    """
+    Turns tracing off and writes the trace out.
+    :return: None
+    """
+    global _tracer
+
+    tracer, _tracer = _tracer, None
+    if tracer is not None:
+        tracer.write()
+
+
+def enabled() -> bool:
+    return _tracer is not None
+
+
+def traced(function):
+    """
+    Decorator that times and counts calls to a function while tracing is on.
+    """
+    name = function.__qualname__
+    category = function.__module__
+
+    @functools.wraps(function)
+    def wrapper(*args, **kwargs):
+        tracer = _tracer
+        if tracer is None:
+            return function(*args, **kwargs)
+
+        start_time = time.perf_counter()
+        try:
+            return function(*args, **kwargs)
+        finally:
+            tracer.add(name, category, start_time, time.perf_counter() - start_time)
+
+    return wrapper
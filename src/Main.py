@@ -1,12 +1,23 @@
 import sys
 
 from Controllers.WelcomeController import WelcomeController
+from TaskRunner import TaskRunner
 
-from PyQt5.Qt import *
+import Instrumentation
 
-app = QApplication(sys.argv)
+from PyQt5.QtWidgets import QApplication
 
-wc = WelcomeController()
-wc.show()
+# Report workers are started by importing this file again (see `Reports.ParallelReport`), so only start up when run.
+if __name__ == "__main__":
+    Instrumentation.start_from_environment()  # Only if asked for with DIGIDENCE_TRACE or DIGIDENCE_PROFILE
 
-app.exec_()
+    app = QApplication(sys.argv)
+
+    wc = WelcomeController()
+    wc.show()
+
+    app.exec_()
+
+    TaskRunner.shared().shutdown()  # Saves still going finish before Python goes away under them
+
+    Instrumentation.stop()
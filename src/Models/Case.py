@@ -1,39 +1,392 @@
 from Models.Event import Event
 from Models.Evidence import Evidence
+from Models.EvidenceImage import EvidenceImage
+from Models.EventStore import EventStore
+from Models.CaseExporter import CaseExporter
+from Models.CaseJournal import CaseJournal, JournalError
+from Models.CaseDatabase import CaseDatabase
+from Models.CaseSnapshots import CaseSnapshots
+from Models.Ledger import Ledger
+from Models.DeviceIndex import DeviceIndex
+from Models.TimeIndex import TimeIndex
+from Models.SearchIndex import SearchIndex
+from Models.Timestamp import parse_time
+from Models.Template import Template
 
+from Instrumentation import traced
+
+import os
 import pickle
+import threading
 
-class Case(object):
+
+def _escaped(text: str) -> str:
     """
+    Escapes text for putting into a template, so text like "<" in comments comes out as typed.
+    Most text has nothing to escape, checking first is a lot quicker than escaping everything.
+    """
+    if not text:
+        return ""
+    if "&" in text or "<" in text or ">" in text:
+        return text.replace("&", "&amp;").replace("<", "&lt;").replace(">", "&gt;")
+
+    return text
+
 
+class _CaseUnpickler(pickle.Unpickler):
+    """
+    Reads cases pickled by older versions. A pickle can make any object it likes, including ones that run commands,
+        and cases get passed around, so only the classes a case was ever made of are let through.
+    """
+    ALLOWED = {
+        ("Models.Case", "Case"),
+        ("Models.Event", "Event"),
+        ("Models.Evidence", "Evidence"),
+        ("copyreg", "_reconstructor"),  # Older pickle protocols make objects through these two
+        ("builtins", "object")
+    }
+
+    def find_class(self, module: str, name: str):
+        if (module, name) not in self.ALLOWED:
+            raise pickle.UnpicklingError("%s.%s isn't part of a case." % (module, name))
+
+        return super().find_class(module, name)
+
+
+class Case(object):
+    """
+    A case with everything an investigator has logged for it.
+    Saved to disk as blocks of records followed by a journal of changes (see `CaseJournal`), or in a SQLite database
+        that records are written to as they're added (see `CaseDatabase`), see `storage_for`. Old pickled cases can
+        still be opened, and are saved in the current format from then on.
     """
     case_reference = None  # type: str
     lab_reference = None  # type: str
     investigator = None  # type: str
 
-    events = []  # type: [Event]
+    events = []  # type: [Event] or EventStore
     physical_evidence = []  # type: [Evidence]
 
     save_location = None  # type: str
 
+    STORAGE_EXTENSIONS = {".digidb": CaseDatabase}  # Storage for new case files by extension, `CaseJournal` otherwise
+
+    # Record templates live in the views folder next to this one, so rendering doesn't depend on the working directory.
+    EVENT_TEMPLATE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "Views",
+                                  "event_record.html")
+    EVIDENCE_TEMPLATE = os.path.join(os.path.dirname(EVENT_TEMPLATE), "evidence_record.html")
+
+    def __init__(self, event_store: bool = False):
+        """
+        Initiates an empty case.
+        :param event_store: Keep events in a column-oriented `EventStore` instead of a list, for very big cases.
+        """
+        self.events = EventStore() if event_store else []
+        self.physical_evidence = []
+
+        self._journal = None  # type: CaseJournal or CaseDatabase
+        self.storage = None  # `CaseJournal` or `CaseDatabase` to write new files with, see `storage_for`
+        self.write_through = True  # Store records as they're added when the storage can, see `_write_through`
+        self._changed_events = set()
+        self._changed_evidence = set()
+        self._save_lock = threading.RLock()  # Saves may run on a worker thread, one at a time please.
+
+        self.revision = 0  # Goes up with every record added or replaced, tells saves whether there's anything to do
+        self._saved_state = None  # What `_state` was at the last save, None if never saved
+
+        self.ledger = Ledger()  # Hash of every record as it was logged, see `verify`
+        self._snapshot_state = None  # What `_state` was at the last autosave snapshot
+
+        # Indexes are built the first time they're needed and kept up to date from then on.
+        self._device_index = None  # type: DeviceIndex
+        self._time_index = None  # type: TimeIndex
+        self._search_index = None  # type: SearchIndex  # Also read from where the case is stored when opened
+        self._search_index_state = None  # What `_state` was when the search index was last written or read
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        # Open files, locks and bookkeeping don't belong in a pickle.
+        state.pop("_journal", None)
+        state.pop("_save_lock", None)
+        state.pop("ledger", None)  # Old pickles never had one, it's made when they are opened.
+        state.pop("_device_index", None)  # Cheap enough to build again
+        state.pop("_time_index", None)
+        state.pop("_search_index", None)  # Kept in its own file, see `write_search_index`
+        return state
+
+    def __setstate__(self, state):
+        # Old pickled cases were made before `__init__` existed, so set up the defaults before restoring.
+        self.__init__()
+        self.__dict__.update(state)
+
+    def add_event(self, event: Event):
+        """
+        Adds an event to the case.
+        :param event: Event to add
+        :return: None
+        """
+        self.events.append(event)
+        self.revision += 1
+        self.ledger.update(self)
+        self._write_through()
+
+        if self._device_index is not None:
+            self._device_index.update(self)
+        if self._time_index is not None:
+            self._time_index.update(self)
+        if self._search_index is not None:
+            self._search_index.update(self)
+
+    def add_evidence(self, evidence: Evidence):
+        """
+        Adds physical evidence to the case.
+        :param evidence: Evidence to add
+        :return: None
+        """
+        self.physical_evidence.append(evidence)
+        self.revision += 1
+        self.ledger.update(self)
+        self._write_through()
+
+        if self._device_index is not None:
+            self._device_index.update(self)
+        if self._search_index is not None:
+            self._search_index.update(self)
+
+    def extend_events(self, events: [Event]):
+        """
+        Adds many events to the case at once. Indexes are updated once for all of them instead of once per event.
+        :param events: Events to add
+        :return: None
+        """
+        self.events.extend(events)
+        self.revision += 1
+        self.ledger.update(self)
+        self._write_through()
+
+        if self._device_index is not None:
+            self._device_index.update(self)
+        if self._time_index is not None:
+            self._time_index.update(self)
+        if self._search_index is not None:
+            self._search_index.update(self)
+
+    def extend_evidence(self, evidence: [Evidence]):
+        """
+        Adds many pieces of physical evidence to the case at once, see `extend_events`.
+        :param evidence: Evidence to add
+        :return: None
+        """
+        self.physical_evidence.extend(evidence)
+        self.revision += 1
+        self.ledger.update(self)
+        self._write_through()
+
+        if self._device_index is not None:
+            self._device_index.update(self)
+        if self._search_index is not None:
+            self._search_index.update(self)
+
+    def replace_event(self, index: int, event: Event):
+        """
+        Replaces an already logged event, making sure the change is saved on next save.
+        :param index: Index of the event in `events`
+        :param event: The new event
+        :return: None
+        """
+        if self._device_index is not None:
+            self._device_index.replace_event(index, self.events[index], event)
+        if self._time_index is not None:
+            self._time_index.replace_event(index, self.events[index], event)
+        if self._search_index is not None:
+            self._search_index.replace_event(index, self.events[index], event)
+
+        self.events[index] = event
+        self._changed_events.add(index)
+        self.ledger.replace_event(index, event)
+        self.revision += 1
+        self._write_through()
+
+    def replace_evidence(self, index: int, evidence: Evidence):
+        """
+        Replaces already logged evidence, making sure the change is saved on next save.
+        :param index: Index of the evidence in `physical_evidence`
+        :param evidence: The new evidence
+        :return: None
+        """
+        if self._device_index is not None:
+            self._device_index.replace_evidence(index, self.physical_evidence[index], evidence)
+        if self._search_index is not None:
+            self._search_index.replace_evidence(index, self.physical_evidence[index], evidence)
+
+        self.physical_evidence[index] = evidence
+        self._changed_evidence.add(index)
+        self.ledger.replace_evidence(index, evidence)
+        self.revision += 1
+        self._write_through()
+
+    def set_evidence_images(self, index: int, images: [EvidenceImage]):
+        """
+        Replaces the images of logged evidence, see `EvidenceImage`. Goes through `replace_evidence`, so the images
+            and their digests go into the ledger.
+        :param index: Index of the evidence in `physical_evidence`
+        :param images: All images of the evidence, the ones it already has included
+        :return: None
+        """
+        self.replace_evidence(index, self.physical_evidence[index].with_images(images))
+
+    def verify(self, full: bool = False, head: str = None) -> [str]:
+        """
+        Checks that no record has been changed since it was logged, other than through `replace_event` and
+            `replace_evidence`, see `Ledger`.
+        Only records that haven't been checked yet are hashed, so checking again after adding records is quick.
+        :param full: Check every record again, not just the new ones.
+        :param head: Ledger head the chain should pass through, as given by `ledger.head_hex()` at some earlier point.
+            Anyone able to change the case file can make up a new ledger to go with it, a head kept somewhere else
+            is what catches that. Checking it goes through the whole ledger.
+        :return: Descriptions of what's wrong, empty if nothing is.
+        """
+        problems = self.ledger.verify(self, full)
+        if head is not None:
+            try:
+                known = self.ledger.passed_through(bytes.fromhex(head))
+            except ValueError:
+                known = False
+
+            if not known:
+                problems.append("The ledger has never had the head %s." % head)
+
+        return problems
+
+    def evidence_by_identifier(self, unique_identifier: str) -> Evidence:
+        """
+        Looks up evidence by its unique identifier.
+        :param unique_identifier: Unique identifier of the evidence
+        :return: Evidence, or None if there is none with that identifier.
+        """
+        index = self.evidence_index(unique_identifier)
+        return self.physical_evidence[index] if index is not None else None
+
+    def evidence_index(self, unique_identifier: str) -> int:
+        """
+        Looks up where evidence is in `physical_evidence` by its unique identifier.
+        :param unique_identifier: Unique identifier of the evidence
+        :return: Index in `physical_evidence`, or None if there is no evidence with that identifier.
+        """
+        return self._updated_device_index().evidence.get(unique_identifier)
+
+    def event_indexes_for_device(self, unique_identifier: str) -> [int]:
+        """
+        Returns where in `events` the events logged on a device are, without looking through every event.
+        The list is the one kept by the index and grows as events are added, don't change it.
+        :param unique_identifier: Unique identifier of the evidence
+        :return: Indexes in `events`, in ascending order
+        """
+        return self._updated_device_index().events.setdefault(unique_identifier, [])
+
+    def events_for_device(self, unique_identifier: str) -> [Event]:
+        """
+        Returns the events logged on a device.
+        :param unique_identifier: Unique identifier of the evidence
+        :return: List of events
+        """
+        events = self.events
+        return [events[index] for index in self.event_indexes_for_device(unique_identifier)]
+
+    def event_indexes_between(self, start, stop) -> [int]:
+        """
+        Finds the events that overlap a time range, without going through every event.
+        :param start: Start of the range, as an epoch or a "dd/mm/yyyy hh:mm" string
+        :param stop: End of the range, as an epoch or a "dd/mm/yyyy hh:mm" string
+        :return: Indexes in `events`, ordered by start time
+        """
+        start, stop = parse_time(start), parse_time(stop)
+        if start.__class__ is not int or stop.__class__ is not int:
+            raise ValueError("Times must be epochs or dd/mm/yyyy hh:mm")
+
+        return self._updated_time_index().between(start, stop)
+
+    def events_between(self, start, stop) -> [Event]:
+        """
+        Returns the events that overlap a time range, see `event_indexes_between`.
+        :return: List of events, ordered by start time
+        """
+        events = self.events
+        return [events[index] for index in self.event_indexes_between(start, stop)]
+
+    def chronological_event_indexes(self) -> [int]:
+        """
+        Every event index ordered by start time.
+        Events with start times that aren't in the usual format come last, in the order they were logged.
+        :return: Indexes in `events`
+        """
+        return self._updated_time_index().chronological()
+
+    def chronological_events(self):
+        """
+        Goes through every event ordered by start time, see `chronological_event_indexes`.
+        :return: Generator of events
+        """
+        events = self.events
+        for index in self.chronological_event_indexes():
+            yield events[index]
+
+    def overlapping_events(self, unique_identifier: str = None) -> [(int, int)]:
+        """
+        Finds events logged on the same device at overlapping times.
+        :param unique_identifier: Only look at events on this device, or on every device if None
+        :return: Pairs of indexes in `events`, the one that started first comes first
+        """
+        return self._updated_time_index().overlaps(unique_identifier)
+
+    def search_events(self, query: str) -> [int]:
+        """
+        Finds events with comments containing every word in the query, see `SearchIndex`.
+        :param query: Words to search for
+        :return: Indexes in `events`, ascending
+        """
+        return self._updated_search_index().search_events(query)
+
+    def search_evidence(self, query: str) -> [int]:
+        """
+        Finds evidence with a description or additional information containing every word in the query.
+        :param query: Words to search for
+        :return: Indexes in `physical_evidence`, ascending
+        """
+        return self._updated_search_index().search_evidence(query)
+
+    def _updated_search_index(self) -> SearchIndex:
+        if self._search_index is None:
+            self._search_index = SearchIndex()
+
+        self._search_index.update(self)
+        return self._search_index
+
+    def _updated_time_index(self) -> TimeIndex:
+        if self._time_index is None:
+            self._time_index = TimeIndex()
+
+        self._time_index.update(self)
+        return self._time_index
+
+    def _updated_device_index(self) -> DeviceIndex:
+        if self._device_index is None:
+            self._device_index = DeviceIndex()
+
+        # Also picks up records that were added straight to the lists, like when replaying a journal.
+        self._device_index.update(self)
+        return self._device_index
+
+    @traced
     def event_to_html(self, event: Event) -> str:
         """
         Returns HTML representation of an event.
         :param event: Event to turn into HTML
         :return: HTML string
         """
-        template_file = open("Views/event_record.html", "r")
-        template = template_file.read()
-
-        template = template.replace("${CaseRef}", self.case_reference)
-        template = template.replace("${ItemUUID}", event.device)
-        template = template.replace("${StartDate}", event.start_time)
-        template = template.replace("${Comments}", event.comments)
-        template = template.replace("${StopDate}", event.stop_time)
-        template = template.replace("${InvestigatorName}", self.investigator)
-
-        return template
+        return Template.load(self.EVENT_TEMPLATE).render(self._event_values(event, self._case_values()))
 
+    @traced
     def evidence_to_html(self, evidence: Evidence) -> str:
         """
         Returns HTML representation of some evidence.
@@ -41,47 +394,330 @@ class Case(object):
         :param evidence: Evidence to turn into HTML
         :return: HTML string
         """
-        template_file = open("Views/evidence_record.html", "r")
-        template = template_file.read()
+        return Template.load(self.EVIDENCE_TEMPLATE).render(self._evidence_values(evidence, self._case_values()))
 
-        template = template.replace("${CaseRef}", self.case_reference)
-        template = template.replace("${LabRef}", self.lab_reference)
-        template = template.replace("${ItemUUID}", evidence.unique_identifier)
-        template = template.replace("${SeizedDate}", evidence.seized_date)
-        template = template.replace("${AdditionalInfo}", evidence.additional_information)
-        template = template.replace("${DeviceDesc}", evidence.description)
-        template = template.replace("${InvestigatorName}", self.investigator)
+    def records_to_html(self, section: str = None):
+        """
+        Renders every event and then every piece of evidence in the case, in that order.
+        Templates and the case-wide values are only looked up once for the whole case.
+        :param section: Only render the part of the templates inside this element, see `Template.section`.
+        :return: Generator of HTML strings
+        """
+        case_values = self._case_values()
 
-        return template
+        render = self._template(self.EVENT_TEMPLATE, section).render
+        event_values = self._event_values
+        for event in self.events:
+            yield render(event_values(event, case_values))
 
-    def save_to_disk(self):
+        render = self._template(self.EVIDENCE_TEMPLATE, section).render
+        evidence_values = self._evidence_values
+        for evidence in self.physical_evidence:
+            yield render(evidence_values(evidence, case_values))
+
+    def record_styles(self) -> [str]:
+        """
+        Returns the stylesheets of the record templates, leaving out repeats, for documents holding many records.
+        :return: List of CSS strings
         """
-        Will save to disk if `save_location` is set
+        case_values = self._case_values()
+        styles = []
+        for location in (self.EVENT_TEMPLATE, self.EVIDENCE_TEMPLATE):
+            template = Template.load(location)
+            style = template.section("style")
+            if style is not template:
+                style = style.render(case_values)
+                if style not in styles:
+                    styles.append(style)
+
+        return styles
+
+    @staticmethod
+    def _template(location: str, section: str = None) -> Template:
+        template = Template.load(location)
+        return template.section(section) if section is not None else template
+
+    def _case_values(self) -> dict:
+        return {
+            "CaseRef": _escaped(self.case_reference),
+            "LabRef": _escaped(self.lab_reference),
+            "InvestigatorName": _escaped(self.investigator)
+        }
+
+    @staticmethod
+    def _event_values(event: Event, case_values: dict) -> dict:
+        values = case_values.copy()
+        values["ItemUUID"] = _escaped(event.device)
+        values["StartDate"] = _escaped(event.start_time)
+        values["Comments"] = _escaped(event.comments)
+        values["StopDate"] = _escaped(event.stop_time)
+        return values
+
+    @staticmethod
+    def _evidence_values(evidence: Evidence, case_values: dict) -> dict:
+        values = case_values.copy()
+        values["ItemUUID"] = _escaped(evidence.unique_identifier)
+        values["SeizedDate"] = _escaped(evidence.seized_date)
+        values["AdditionalInfo"] = _escaped(evidence.additional_information)
+        values["DeviceDesc"] = _escaped(evidence.description)
+        values["Images"] = "".join(
+            "<p><span>Image: </span><i>%s</i> (%d bytes)<br>MD5: %s<br>SHA-1: %s<br>SHA-256: %s</p>"
+            % (_escaped(image.location), image.size or 0, image.md5, image.sha1, image.sha256)
+            for image in evidence.images)
+        return values
+
+    def export_events(self, location: str, file_format: str = None, progress=None) -> bool:
+        """
+        Writes every event to a CSV or JSON Lines file, see `CaseExporter.write_events`.
+        :return: False if cancelled
+        """
+        return CaseExporter(self).write_events(location, file_format, progress)
+
+    def export_evidence(self, location: str, file_format: str = None, progress=None) -> bool:
+        """
+        Writes all the physical evidence to a CSV or JSON Lines file, see `CaseExporter.write_evidence`.
+        :return: False if cancelled
+        """
+        return CaseExporter(self).write_evidence(location, file_format, progress)
+
+    def export_html(self, location: str, progress=None) -> bool:
+        """
+        Writes the whole case as one standalone HTML report, see `CaseExporter.write_html`.
+        :return: False if cancelled
+        """
+        return CaseExporter(self).write_html(location, progress)
+
+    def has_unsaved_changes(self) -> bool:
+        """
+        Tells whether anything has changed since the case was last saved or opened.
+        :return: True if the case has never been saved, or has been changed since
+        """
+        return self._state() != self._saved_state
+
+    def _state(self) -> tuple:
+        # Records only change through methods that bump `revision`, the case details are plain attributes.
+        return self.revision, self.case_reference, self.lab_reference, self.investigator
+
+    @traced
+    def save_to_disk(self, rewrite: bool = False, compression: int = None):
+        """
+        Will save to disk if `save_location` is set.
+        Only records that are new or changed since the last save are written, unless the case hasn't been saved to
+            this location before, in which case the whole case is written. Nothing is written if nothing has changed.
+        The file is synced to disk before this returns, see `CaseJournal` and `CaseDatabase`.
+        :param rewrite: Write the whole case in the current format anyway, for converting and compacting cases.
+        :param compression: Compression to rewrite with, see `CaseJournal.__init__`.
         :return: None
         """
         if self.save_location is None:
             return  # Can't save if we don't know where to
 
-        with open(self.save_location, 'wb') as dump_file:
-            pickle.dump(self, dump_file, pickle.HIGHEST_PROTOCOL)
+        with self._save_lock:
+            journal = self._journal
+            state = self._state()
+            if journal is not None and journal.location == self.save_location and state == self._saved_state and \
+                    not rewrite:
+                return
+
+            if journal is None or journal.location != self.save_location or rewrite:
+                # Files keep their storage when written again, unless told otherwise.
+                storage = self.storage or (type(journal) if journal is not None and
+                                           journal.location == self.save_location
+                                           else self.storage_for(self.save_location))
+                journal = storage(self.save_location, compression)
+                self._rewrite(journal)
+                self._journal = journal
+            elif journal.needs_compaction():
+                self._rewrite(journal)  # Older versions are written again right away, not appended to first
+            else:
+                self._append_changes(journal)
+                if journal.needs_compaction():
+                    self._rewrite(journal)
+
+            self._saved_state = state
+
+    def write_search_index(self):
+        """
+        Stores the search index along with the case, so opening the case again doesn't mean indexing every record
+            again, see `CaseJournal.write_search_index` and `CaseDatabase.write_search_index`. Only worth it when the
+            case is closed: it's the whole index every time, and it's only trusted for the case exactly as it was
+            stored, so the next save makes it out of date anyway.
+        Nothing is stored if the index was never built, the case has unsaved changes, or the stored index is already
+            up to date.
+        :return: None
+        """
+        with self._save_lock:
+            journal = self._journal
+            index = self._search_index
+            if index is None or journal is None or journal.location != self.save_location or \
+                    self.has_unsaved_changes():
+                return
+
+            index.update(self)  # Records replayed straight into the lists
+            if not index.changed and self._search_index_state == self._saved_state:
+                return
+
+            journal.write_search_index(index)
+            self._search_index_state = self._saved_state
+
+    @classmethod
+    def storage_for(cls, location: str):
+        """
+        Picks the storage for a new case file, by its extension: `CaseDatabase` for .digidb and `CaseJournal` for the
+            rest. Set `storage` to pick one regardless, like when converting.
+        :param location: Location of the case file
+        :return: `CaseJournal` or `CaseDatabase`
+        """
+        return cls.STORAGE_EXTENSIONS.get(os.path.splitext(location)[1].lower(), CaseJournal)
+
+    def copy_saved(self, location: str):
+        """
+        Copies the case as last saved to another file, synced to disk. Used for snapshots, see `CaseSnapshots`.
+        :param location: Where to copy to
+        :return: None
+        """
+        with self._save_lock:
+            journal = self._journal
+            if journal is None or journal.location != self.save_location:
+                journal = CaseJournal(self.save_location)  # Never saved here, it's still whatever file was opened
+
+            journal.copy_to(location)
+
+    def _write_through(self):
+        """
+        Stores changes right away when the storage makes that cheap, see `CaseDatabase`.
+        A save that is already running will pick them up, and so will the next save if storing them fails.
+        Turned off with `write_through` by whoever saves in batches of their own instead, see `CaseServer` and
+            `CaseImporter`.
+        :return: None
+        """
+        journal = self._journal
+        if journal is None or not self.write_through or not journal.WRITES_THROUGH or journal.location != self.save_location:
+            return
+        if not self._save_lock.acquire(blocking=False):
+            return
+
+        try:
+            state = self._state()  # Everything up to here is stored, details included, see `CaseDatabase.append`
+            self._append_changes(journal)
+            self._saved_state = state
+        except Exception as error:
+            print("Could not store changes, they're saved with the case instead: " + str(error))
+        finally:
+            self._save_lock.release()
+
+    def _rewrite(self, journal):
+        """
+        Writes the whole case to storage. Call with `_save_lock` held.
+        :return: None
+        """
+        # Everything is written, only changes made while writing are left for the next save.
+        changed_events, self._changed_events = self._changed_events, set()
+        changed_evidence, self._changed_evidence = self._changed_evidence, set()
+
+        try:
+            journal.rewrite(self)
+        except BaseException:
+            self._changed_events |= changed_events
+            self._changed_evidence |= changed_evidence
+            raise
+
+    def _append_changes(self, journal):
+        """
+        Appends new and changed records to storage. Call with `_save_lock` held.
+        :return: None
+        """
+        # Swap the change sets out first, changes made while saving will then be picked up by the next save.
+        changed_events, self._changed_events = self._changed_events, set()
+        changed_evidence, self._changed_evidence = self._changed_evidence, set()
+
+        try:
+            # Records past the saved count are new and will be written anyway.
+            journal.append(self, sorted(index for index in changed_events if index < journal.event_count),
+                           sorted(index for index in changed_evidence if index < journal.evidence_count))
+        except BaseException:
+            # Nothing is lost, the next save tries again.
+            self._changed_events |= changed_events
+            self._changed_evidence |= changed_evidence
+            raise
+
+    def autosave(self, snapshots: int = None) -> str:
+        """
+        Saves the case if it has changed since the last autosave, and keeps a copy of it as a snapshot.
+        Cases that haven't been saved anywhere yet are only snapshotted, see `CaseSnapshots`.
+        Meant to be run on a timer, on a worker thread.
+        :param snapshots: Number of snapshots to keep, defaults to `CaseSnapshots.KEEP`.
+        :return: Location of the new snapshot, or None if nothing had changed.
+        """
+        with self._save_lock:
+            state = self._state()
+            if state == self._snapshot_state:
+                return None
+
+            self.save_to_disk()
+            location = CaseSnapshots.for_case(self, snapshots).take(self)
+            self._snapshot_state = state
+
+        return location
 
     @staticmethod
-    def open_from_disk(location: str):  # Can not type annotate return value because of recursion in classes...
+    @traced
+    def open_from_disk(location: str, event_store: bool = False):  # Can't annotate return value, recursion...
         """
         Opens a case from a location and returns that.
         Naively assumes that the location is readable and writable.
             The location should come from a file picker anyway, and those files will exist 99.99% of the time.
         :param location: Location on disk
+        :param event_store: Keep events in an `EventStore`, see `__init__`.
         :return: Returns a Case or None if something bad has happened.
         """
-        file = open(location, "rb")
-        try:
-            return pickle.load(file)
-        except TypeError:
-            return None
-        except pickle.UnpicklingError:
-            print("Lid stuck too hard, ask someone for help.")
+        storage = CaseJournal if CaseJournal.is_journal(location) else \
+            CaseDatabase if CaseDatabase.is_database(location) else None
+        if storage is not None:
+            case = Case(event_store)
+            journal = storage(location)
+            try:
+                journal.replay(case)
+            except (JournalError, KeyError, ValueError, TypeError) as error:
+                print("Could not read case: " + str(error))
+                return None
+
+            case.ledger.update(case)  # Records saved before there was a ledger get their entries now.
+            case.save_location = location
+            case._journal = journal
+            case._saved_state = case._snapshot_state = case._state()
+            case._search_index = journal.read_search_index()
+            case._search_index_state = case._saved_state
+            return case
+
+        # Anything that isn't a journal is a case pickled by an older version.
+        # It is rewritten as a journal the first time it is saved.
+        with open(location, "rb") as file:
+            try:
+                case = _CaseUnpickler(file).load()
+            except pickle.UnpicklingError as error:
+                print("Lid stuck too hard, ask someone for help. " + str(error))
+                return None
+            except EOFError as error:
+                print("Could not parse file for unpickling. Unexpected end of file.")
+                return None
+            except (AttributeError, KeyError, TypeError, ValueError) as error:
+                print("Could not read case: " + str(error))
+                return None
+
+        # Only builtins and case classes get through the unpickler, which is no promise that they make up a case.
+        if not isinstance(case, Case):
+            print("Could not read case: the file holds a pickled %s, not a case." % type(case).__name__)
             return None
-        except EOFError as error:
-            print("Could not parse file for unpickling. Unexpected end of file.")
+
+        try:
+            case.ledger.update(case)
+            case.save_location = location
+            case._search_index = SearchIndex.read(location + ".search", location)
+            if event_store and not isinstance(case.events, EventStore):
+                case.events = EventStore(case.events)
+        except (AttributeError, KeyError, TypeError, ValueError) as error:
+            print("Could not read case: " + str(error))  # Records that aren't records, missing attributes and such
             return None
+
+        return case
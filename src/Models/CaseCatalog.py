@@ -0,0 +1,242 @@
+import os
+import sqlite3
+import time
+
+
+class CatalogError(Exception):
+    """
+    Raised when the catalog can't be used, like when it was made by a newer version.
+    """
+
+
+class CaseCatalog(object):
+    """
+    Database of every case opened or saved on this machine, so cases can be listed and searched without opening them.
+
+    Keeps the details, record counts and evidence identifiers of each case, by the absolute location of its file.
+        Entries are updated whenever a case is saved or opened through the windows or the command line, cases that
+        have been moved or deleted since stay listed until they're forgotten.
+    Also remembers the digests of evidence images by location, size and modification time, so images that haven't
+        changed aren't read again when they're attached to another case, see `ImageHasher`.
+    Stored in SQLite at `LOCATION`, or wherever the DIGIDENCE_CATALOG environment variable points. Every call opens the
+        database, does its work in one transaction and closes it again, so it can be used from any thread and by
+        several programs at once.
+    """
+    VERSION = 2  # 2 added image digests
+
+    LOCATION = os.path.join(os.path.expanduser("~"), ".digidence", "catalog.sqlite")
+
+    _shared = None  # type: CaseCatalog
+
+    _columns = "location, case_reference, lab_reference, investigator, events, evidence, saved, opened"
+
+    def __init__(self, location: str = None):
+        """
+        Initiates a catalog. Nothing is read or written until asked to.
+        :param location: Location of the database, defaults to DIGIDENCE_CATALOG or `LOCATION`.
+        """
+        self.location = location or os.environ.get("DIGIDENCE_CATALOG") or self.LOCATION
+
+    @classmethod
+    def shared(cls):
+        """
+        The catalog the windows and the command line use.
+        :return: CaseCatalog
+        """
+        if cls._shared is None:
+            cls._shared = CaseCatalog()
+
+        return cls._shared
+
+    def record(self, case, opened: bool = False):
+        """
+        Adds a saved case to the catalog, or updates it if it's already there.
+        :param case: Case with a `save_location`
+        :param opened: Whether the case has just been opened, rather than saved
+        :return: None
+        """
+        if case.save_location is None:
+            return
+
+        location = os.path.abspath(case.save_location)
+        now = time.time()
+        details = (case.case_reference, case.lab_reference, case.investigator, len(case.events),
+                   len(case.physical_evidence))
+        identifiers = [(location, evidence.unique_identifier) for evidence in case.physical_evidence]
+
+        connection = self._connect()
+        try:
+            with connection:
+                updated = connection.execute(
+                    "UPDATE cases SET case_reference = ?, lab_reference = ?, investigator = ?, events = ?, "
+                    "evidence = ?, %s = ?, used = ? WHERE location = ?" % ("opened" if opened else "saved"),
+                    details + (now, now, location)).rowcount
+
+                if not updated:
+                    connection.execute("INSERT INTO cases (%s, used) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)"
+                                       % self._columns,
+                                       (location,) + details + (None if opened else now, now if opened else None,
+                                                                now))
+
+                connection.execute("DELETE FROM evidence WHERE location = ?", (location,))
+                connection.executemany("INSERT INTO evidence (location, unique_identifier) VALUES (?, ?)",
+                                       identifiers)
+        finally:
+            connection.close()
+
+    def forget(self, location: str):
+        """
+        Takes a case out of the catalog. The case file itself is left alone.
+        :param location: Location of the case file
+        :return: None
+        """
+        location = os.path.abspath(location)
+
+        connection = self._connect()
+        try:
+            with connection:
+                connection.execute("DELETE FROM evidence WHERE location = ?", (location,))
+                connection.execute("DELETE FROM cases WHERE location = ?", (location,))
+        finally:
+            connection.close()
+
+    def recent(self, limit: int = 50) -> [dict]:
+        """
+        The most recently saved or opened cases.
+        :param limit: Most cases to return
+        :return: Cases, most recent first, with the same keys as `_columns`
+        """
+        return self._query("SELECT %s FROM cases ORDER BY used DESC LIMIT ?" % self._columns, (limit,))
+
+    def search(self, text: str, limit: int = 500) -> [dict]:
+        """
+        Cases with the given text anywhere in their references, investigator, location or evidence identifiers,
+            ignoring case.
+        :param text: Text to look for, every case matches empty text
+        :param limit: Most cases to return
+        :return: Cases, most recent first, see `recent`
+        """
+        pattern = "%" + text.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%"
+
+        return self._query(
+            "SELECT %s FROM cases WHERE case_reference LIKE :pattern ESCAPE '\\' "
+            "OR lab_reference LIKE :pattern ESCAPE '\\' OR investigator LIKE :pattern ESCAPE '\\' "
+            "OR location LIKE :pattern ESCAPE '\\' OR location IN "
+            "(SELECT location FROM evidence WHERE unique_identifier LIKE :pattern ESCAPE '\\') "
+            "ORDER BY used DESC LIMIT :limit" % self._columns, {"pattern": pattern, "limit": limit})
+
+    def cases_with_device(self, unique_identifier: str) -> [dict]:
+        """
+        Cases with evidence of the given identifier, ignoring case.
+        :param unique_identifier: Identifier of the evidence
+        :return: Cases, most recent first, see `recent`
+        """
+        return self._query("SELECT %s FROM cases WHERE location IN "
+                           "(SELECT location FROM evidence WHERE unique_identifier = ?) ORDER BY used DESC"
+                           % self._columns, (unique_identifier,))
+
+    def cached_digests(self, location: str, size: int, modified: int) -> dict:
+        """
+        Digests of an image file worked out earlier, if the file hasn't changed since.
+        :param location: Absolute location of the file
+        :param size: Size of the file now
+        :param modified: Modification time of the file now, in nanoseconds
+        :return: Digests by algorithm name, see `EvidenceImage.ALGORITHMS`, or None if there are none
+        """
+        connection = self._connect()
+        try:
+            row = connection.execute("SELECT md5, sha1, sha256 FROM hashes WHERE location = ? AND size = ? AND "
+                                     "modified = ?", (location, size, modified)).fetchone()
+        finally:
+            connection.close()
+
+        return None if row is None else dict(zip(("md5", "sha1", "sha256"), row))
+
+    def remember_digests(self, location: str, size: int, modified: int, digests: dict):
+        """
+        Remembers the digests of an image file, see `cached_digests`.
+        :return: None
+        """
+        connection = self._connect()
+        try:
+            with connection:
+                connection.execute("INSERT OR REPLACE INTO hashes (location, size, modified, md5, sha1, sha256, "
+                                   "hashed) VALUES (?, ?, ?, ?, ?, ?, ?)", (location, size, modified, digests["md5"],
+                                                                            digests["sha1"], digests["sha256"],
+                                                                            time.time()))
+        finally:
+            connection.close()
+
+    @staticmethod
+    def local_time(seconds: float) -> str:
+        """
+        Turns a time from the catalog into a local "dd/mm/yyyy hh:mm" string, like the times in cases.
+        :param seconds: Seconds since 1970, or None
+        :return: Date and time string, empty for None
+        """
+        return "" if seconds is None else time.strftime("%d/%m/%Y %H:%M", time.localtime(seconds))
+
+    # Helpers --------------------------------------------------------------------------------------------------------
+
+    def _query(self, query: str, parameters) -> [dict]:
+        connection = self._connect()
+        try:
+            names = [name.strip() for name in self._columns.split(",")]
+            return [dict(zip(names, row)) for row in connection.execute(query, parameters)]
+        finally:
+            connection.close()
+
+    def _connect(self) -> sqlite3.Connection:
+        """
+        Opens the database, making it first if it isn't there.
+        :return: Connection, close it when done
+        """
+        folder = os.path.dirname(os.path.abspath(self.location))
+        os.makedirs(folder, exist_ok=True)
+
+        connection = sqlite3.connect(self.location, timeout=10)
+        try:
+            version = connection.execute("PRAGMA user_version").fetchone()[0]
+            if version > self.VERSION:
+                raise CatalogError("The case catalog at %s was made by a newer version of digidence." % self.location)
+
+            if version < self.VERSION:
+                with connection:
+                    connection.executescript("""
+                        CREATE TABLE IF NOT EXISTS cases (
+                            location TEXT PRIMARY KEY,
+                            case_reference TEXT,
+                            lab_reference TEXT,
+                            investigator TEXT,
+                            events INTEGER NOT NULL DEFAULT 0,
+                            evidence INTEGER NOT NULL DEFAULT 0,
+                            saved REAL,
+                            opened REAL,
+                            used REAL NOT NULL
+                        );
+                        CREATE INDEX IF NOT EXISTS cases_used ON cases (used);
+
+                        CREATE TABLE IF NOT EXISTS evidence (
+                            location TEXT NOT NULL,
+                            unique_identifier TEXT NOT NULL COLLATE NOCASE
+                        );
+                        CREATE INDEX IF NOT EXISTS evidence_identifier ON evidence (unique_identifier);
+                        CREATE INDEX IF NOT EXISTS evidence_location ON evidence (location);
+
+                        CREATE TABLE IF NOT EXISTS hashes (
+                            location TEXT PRIMARY KEY,
+                            size INTEGER NOT NULL,
+                            modified INTEGER NOT NULL,
+                            md5 TEXT NOT NULL,
+                            sha1 TEXT NOT NULL,
+                            sha256 TEXT NOT NULL,
+                            hashed REAL NOT NULL
+                        );
+
+                        PRAGMA user_version = %d;
+                    """ % self.VERSION)
+        except BaseException:
+            connection.close()
+            raise
+
+        return connection
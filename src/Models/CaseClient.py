@@ -0,0 +1,251 @@
+from Models.Case import Case
+from Models.CaseJournal import CaseJournal
+from Models.CaseServer import CaseServerError, LINE_LIMIT, PORT, decode, encode
+from Models.Event import Event
+from Models.Evidence import Evidence
+
+import asyncio
+from concurrent.futures import Future
+import itertools
+import threading
+
+
+class CaseClient(object):
+    """
+    Connects to a `CaseServer` to log to a case along with other examiners.
+
+    The client keeps a copy of the case, `case`, that's caught up with the server when connecting and kept in step
+        with it from then on. Records added through the client go to the server, and come back along with everyone
+        else's in the order the server added them, so only the server ever decides where a record goes.
+    Talking to the server happens on a thread of its own. Records from the server are handed to `on_records` there,
+        which adds them to the copy of the case with `apply` unless it's been replaced, windows replace it to apply
+        them on their own thread instead, see `CaseController`.
+    """
+
+    def __init__(self, host: str = "127.0.0.1", port: int = PORT, secret: str = ""):
+        """
+        Initiates a client, nothing happens until `connect`.
+        :param host: Address of the server
+        :param port: Port of the server
+        :param secret: The server's secret, see `CaseServer.secret`
+        """
+        self.host = host
+        self.port = port
+        self.secret = secret
+
+        self.case = None  # type: Case  # Copy of the case, set once connected
+        self.saved = (0, 0)  # Events and evidence the server has saved to disk
+
+        # Callbacks, called on the client's thread.
+        self.on_records = self.apply  # Called with the kind, "event" or "evidence", index of the first and records
+        self.on_saved = None  # Called with the events and evidence saved to disk
+        self.on_disconnected = None  # Called with the reason when the connection is lost, not after `close`
+
+        self._loop = None  # type: asyncio.AbstractEventLoop
+        self._thread = None  # type: threading.Thread
+        self._writer = None  # type: asyncio.StreamWriter
+        self._listening = None  # type: asyncio.Task
+        self._requests = {}  # type: {int: Future}  # Adds waiting for the server to answer, by request number
+        self._numbers = itertools.count()
+        self._requests_lock = threading.Lock()  # Adds are made on any thread, answered on the client's
+        self._closing = False
+
+    def connect(self, timeout: float = 30) -> Case:
+        """
+        Connects to the server and copies the case from it.
+        :param timeout: Seconds to wait for the server at most
+        :return: Copy of the case, also kept in `case`
+        """
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._loop.run_forever, name="CaseClient", daemon=True)
+        self._thread.start()
+
+        try:
+            asyncio.run_coroutine_threadsafe(self._connect(), self._loop).result(timeout)
+        except BaseException:
+            self.close()
+            raise
+
+        return self.case
+
+    def add_event(self, event: Event) -> Future:
+        """
+        Asks the server to add an event to the case.
+        :param event: Event to add
+        :return: Future of the index the event was added at, fails with `CaseServerError` if it was turned down
+        """
+        return self._request("add_event", [event.start_time, event.stop_time, event.comments, event.device])
+
+    def add_evidence(self, evidence: Evidence) -> Future:
+        """
+        Asks the server to add evidence to the case.
+        :param evidence: Evidence to add
+        :return: Future of the index the evidence was added at, see `add_event`
+        """
+        return self._request("add_evidence", [evidence.unique_identifier, evidence.additional_information,
+                                              evidence.seized_date, evidence.description])
+
+    def apply(self, kind: str, first: int, records: list):
+        """
+        Adds records from the server to the copy of the case. Records it already has are skipped.
+        :param kind: "event" or "evidence"
+        :param first: Index of the first record
+        :param records: Events or evidence
+        :return: None
+        """
+        existing = len(self.case.events) if kind == "event" else len(self.case.physical_evidence)
+        if first > existing:
+            raise CaseServerError("Records %d to %d of the case are missing." % (existing, first - 1))
+
+        records = records[existing - first:]
+        if kind == "event":
+            self.case.extend_events(records)
+        else:
+            self.case.extend_evidence(records)
+
+    def close(self):
+        """
+        Disconnects from the server. Adds that haven't been answered fail.
+        :return: None
+        """
+        self._closing = True
+        if self._loop is None or self._loop.is_closed():
+            return
+
+        try:
+            asyncio.run_coroutine_threadsafe(self._disconnect(), self._loop).result(5)
+        except Exception:
+            pass  # Gone already
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join(5)
+        if not self._thread.is_alive():
+            self._loop.close()
+        self._fail_requests(CaseServerError("Disconnected from the case server."))
+
+    @property
+    def address(self) -> str:
+        return "%s:%d" % (self.host, self.port)
+
+    # Helpers --------------------------------------------------------------------------------------------------------
+
+    def _request(self, operation: str, fields: list) -> Future:
+        future = Future()
+        with self._requests_lock:
+            if self._writer is None or self._closing:
+                future.set_exception(CaseServerError("Not connected to the case server."))
+                return future
+
+            number = next(self._numbers)
+            self._requests[number] = future
+            writer = self._writer
+
+        self._loop.call_soon_threadsafe(writer.write, encode({"op": operation, "id": number, "fields": fields}))
+        return future
+
+    async def _connect(self):
+        try:
+            reader, writer = await asyncio.open_connection(self.host, self.port, limit=LINE_LIMIT)
+        except OSError as error:
+            raise CaseServerError("Could not connect to the case server at %s, %s" %
+                                  (self.address, error.strerror or error))
+
+        writer.write(encode({"op": "hello", "secret": self.secret}))
+
+        # The server sends the whole case, then "synced".
+        case = None
+        while True:
+            message = await self._read(reader)
+            operation = message.get("op")
+            if operation == "welcome":
+                case = Case()
+                details = message.get("details") or {}
+                case.case_reference = details.get("case_reference")
+                case.lab_reference = details.get("lab_reference")
+                case.investigator = details.get("investigator")
+                self.saved = tuple(message.get("saved") or (0, 0))
+                self.case = case
+            elif operation == "records" and case is not None:
+                self.apply(message["kind"], message["first"], self._records(message))
+            elif operation == "synced" and case is not None:
+                break
+            elif operation == "error":
+                raise CaseServerError("The case server turned us down, " + str(message.get("message")))
+
+        self._writer = writer
+        self._listening = asyncio.ensure_future(self._listen(reader))
+
+    async def _disconnect(self):
+        if self._listening is not None:
+            self._listening.cancel()
+            try:
+                await self._listening
+            except asyncio.CancelledError:
+                pass
+
+        with self._requests_lock:
+            writer, self._writer = self._writer, None
+        if writer is not None:
+            writer.close()
+
+    async def _listen(self, reader: asyncio.StreamReader):
+        """
+        Handles what the server sends for as long as the connection lasts.
+        """
+        reason = "The case server closed the connection."
+        try:
+            while True:
+                message = await self._read(reader)
+                operation = message.get("op")
+                if operation == "records":
+                    self.on_records(message["kind"], message["first"], self._records(message))
+                elif operation in ("added", "error"):
+                    with self._requests_lock:
+                        future = self._requests.pop(message.get("id"), None)
+                    if future is None:
+                        continue
+                    if operation == "added":
+                        future.set_result(message["index"])
+                    else:
+                        future.set_exception(CaseServerError(message.get("message")))
+                elif operation == "saved":
+                    self.saved = (message["events"], message["evidence"])
+                    if self.on_saved is not None:
+                        self.on_saved(*self.saved)
+        except (CaseServerError, ConnectionError, asyncio.IncompleteReadError) as error:
+            reason = str(error) or reason
+        except Exception as error:
+            reason = "Something went wrong talking to the case server, " + str(error)
+
+        with self._requests_lock:
+            if self._writer is not None:
+                self._writer.close()
+            self._writer = None
+        self._fail_requests(CaseServerError(reason))
+
+        if not self._closing and self.on_disconnected is not None:
+            self.on_disconnected(reason)
+
+    @staticmethod
+    async def _read(reader: asyncio.StreamReader) -> dict:
+        line = await reader.readline()
+        if not line:
+            raise CaseServerError("The case server closed the connection.")
+
+        try:
+            return decode(line)
+        except ValueError as error:
+            raise CaseServerError("Unreadable message from the case server, " + str(error))
+
+    @staticmethod
+    def _records(message: dict) -> list:
+        if message["kind"] == "event":
+            return [CaseJournal._fields_to_event(fields) for fields in message["records"]]
+
+        return [CaseJournal._fields_to_evidence(fields) for fields in message["records"]]
+
+    def _fail_requests(self, error: Exception):
+        with self._requests_lock:
+            requests, self._requests = self._requests, {}
+        for future in requests.values():
+            if not future.done():
+                future.set_exception(error)
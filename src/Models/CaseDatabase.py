@@ -0,0 +1,478 @@
+from Models.CaseJournal import CaseJournal, JournalError
+from Models.LazyRecords import LazyRecords
+from Models.Ledger import Ledger
+from Models.SearchIndex import SearchIndex
+
+from array import array
+import json
+import os
+import sqlite3
+import sys
+import threading
+
+
+class DatabaseRecords(LazyRecords):
+    """
+    `LazyRecords` read a page at a time from a table of a `CaseDatabase`, instead of from blocks of a case file.
+    Event lists can also give their times and devices straight from the table, like an `EventStore` does.
+    """
+
+    def __init__(self, database, table: str, count: int, make_record):
+        """
+        Initiates a list over a table.
+        :param database: `CaseDatabase` the table is in
+        :param table: "events" or "evidence"
+        :param count: Rows in the table
+        :param make_record: Callable making a record from the fields of a row
+        """
+        super().__init__(database, [], database.PAGE_SIZE, count, make_record)
+        self.table = table
+
+    def timings(self, start: int = 0) -> [(int, int, str)]:
+        """
+        Start epoch, stop epoch and device of every event from the given index, see `EventStore.timings`.
+        """
+        with self.source.lock:
+            timings = self.source.timings(start, self.stored_count)
+            for index, event in self._changed.items():
+                if index >= start:
+                    timings[index - start] = (event.start_epoch, event.stop_epoch, event.device)
+
+        timings.extend((event.start_epoch, event.stop_epoch, event.device)
+                       for event in self._appended[max(start - self.stored_count, 0):])
+        return timings
+
+    def devices(self, start: int = 0) -> [str]:
+        """
+        Device identifiers of every event from the given index, see `EventStore.devices`.
+        """
+        return [device for _, _, device in self.timings(start)]
+
+    def _read_block(self, number: int) -> list:
+        start = number * self.block_size
+        return self.source.rows(self.table, start, min(start + self.block_size, self.stored_count))
+
+
+class CaseDatabase(object):
+    """
+    Storage for a case in a SQLite database, the alternative to `CaseJournal` for cases that are added to a lot.
+
+    Events, evidence and ledger entries each have a table, with a row per record by index, and the case details are
+        name and value pairs in a table of their own. Record fields are stored the way `Event.__getstate__` and
+        `Evidence.__getstate__` give them. Events are indexed on device and start time, for other tools reading the
+        database as much as for us. The search index has a table too, see `write_search_index`.
+    The database is kept in WAL mode, so storing a record is a single-row insert that doesn't touch the rest of the
+        file. Records are stored as they are added (see `WRITES_THROUGH` and `Case._write_through`), saving only has
+        the case details and the search index left to do.
+    Opening a case reads its details and ledger, records are read a page at a time as they're needed.
+    Has the same methods as `CaseJournal`, `Case` picks one or the other by file type, see `Case.storage_for`.
+    """
+    VERSION = 3  # 2 added evidence images, 3 the search index
+    MAGIC = b"SQLite format 3\x00"
+
+    WRITES_THROUGH = True
+
+    PAGE_SIZE = 500  # Records read at a time
+
+    _columns = {
+        "events": ("start_time", "stop_time", "comments", "device"),
+        "evidence": ("unique_identifier", "additional_information", "seized_date", "description", "images")
+    }
+
+    location = None  # type: str
+
+    event_count = 0  # type: int
+    evidence_count = 0  # type: int
+    header = None  # type: tuple
+
+    ledger_count = 0  # type: int
+    ledger_head = Ledger.EMPTY_HEAD  # type: bytes
+
+    def __init__(self, location: str, compression: int = None):
+        """
+        Initiates storage for the database at the given location. Nothing is read or written until asked to.
+        :param location: Location on disk
+        :param compression: Ignored, it's there to match `CaseJournal`.
+        """
+        self.location = location
+        self.version = self.VERSION
+        self.lock = threading.RLock()  # One connection is shared by the interface and workers, one at a time please.
+        self._connection = None  # type: sqlite3.Connection
+
+    @classmethod
+    def is_database(cls, location: str) -> bool:
+        """
+        Checks whether the file at the given location is a SQLite database.
+        :param location: Location on disk
+        :return: True if the file starts with the SQLite magic string
+        """
+        with open(location, "rb") as file:
+            return file.read(len(cls.MAGIC)) == cls.MAGIC
+
+    def replay(self, case):
+        """
+        Reads the case details and ledger into the given case, and gives it lists that read records from the
+            database as they're needed. Cases keeping their events in an `EventStore` get every event read into it.
+        :param case: An empty case to fill
+        :return: None
+        """
+        try:
+            with self.lock:
+                connection = self.connection()
+                details = dict(connection.execute("SELECT name, value FROM details"))
+                event_count = connection.execute("SELECT coalesce(max(id) + 1, 0) FROM events").fetchone()[0]
+                evidence_count = connection.execute("SELECT coalesce(max(id) + 1, 0) FROM evidence").fetchone()[0]
+                ledger = connection.execute("SELECT kind, record, hash FROM ledger ORDER BY position").fetchall()
+        except sqlite3.DatabaseError as error:
+            raise JournalError("Unreadable case database, " + str(error))
+
+        case.case_reference = details.get("case_reference")
+        case.lab_reference = details.get("lab_reference")
+        case.investigator = details.get("investigator")
+        self.header = (case.case_reference, case.lab_reference, case.investigator)
+
+        events = DatabaseRecords(self, "events", event_count, CaseJournal._fields_to_event)
+        if isinstance(case.events, list):
+            case.events = events
+        else:
+            case.events.extend(events)  # An `EventStore`, read everything into it
+        case.physical_evidence = DatabaseRecords(self, "evidence", evidence_count, CaseJournal._fields_to_evidence)
+
+        indexes = array("I", (index for _, index, _ in ledger))
+        if sys.byteorder == "big":
+            indexes.byteswap()  # `Ledger.load_columns` takes them little-endian
+        ledger_head = bytes.fromhex(details.get("ledger_head") or "") or Ledger.EMPTY_HEAD
+        case.ledger.load_columns(bytes(kind for kind, _, _ in ledger), indexes.tobytes(),
+                                 b"".join(digest for _, _, digest in ledger), ledger_head)
+
+        self.event_count = event_count
+        self.evidence_count = evidence_count
+        self.ledger_count = len(ledger)
+        self.ledger_head = ledger_head
+
+    def rewrite(self, case):
+        """
+        Writes the whole case, replacing whatever was at the location.
+        A database is emptied and filled again in one transaction, anything else is replaced by a new database
+            written next to it, so nothing is lost if writing fails halfway.
+        :param case: Case to write
+        :return: None
+        """
+        if self._is_case_database():
+            with self.lock:
+                connection = self.connection()
+                with connection:
+                    for table in ("events", "evidence", "ledger", "details", "search"):
+                        connection.execute("DELETE FROM " + table)
+                    written = self._write_all(connection, case)
+
+            self.header, self.event_count, self.evidence_count, self.ledger_count, self.ledger_head = written
+            return
+
+        temporary_location = self.location + ".tmp"
+        for location in (temporary_location, temporary_location + "-wal", temporary_location + "-shm"):
+            if os.path.exists(location):
+                os.remove(location)
+
+        try:
+            connection = self._connect(temporary_location)
+            try:
+                with connection:
+                    written = self._write_all(connection, case)
+            finally:
+                connection.close()  # Moves everything from the write-ahead log into the file itself
+        except BaseException:
+            if os.path.exists(temporary_location):
+                os.remove(temporary_location)
+            raise
+
+        with open(temporary_location, "rb+") as file:
+            CaseJournal.sync(file)
+
+        with self.lock:
+            self.close()
+            CaseJournal.release(case)
+            os.replace(temporary_location, self.location)
+            CaseJournal.sync_folder(self.location)
+
+        self.header, self.event_count, self.evidence_count, self.ledger_count, self.ledger_head = written
+
+    def append(self, case, changed_events: [int], changed_evidence: [int]):
+        """
+        Stores everything that is new in the case since the last save, plus the given changed records, in one
+            transaction.
+        :param case: Case to save
+        :param changed_events: Indexes of already saved events that have been changed
+        :param changed_evidence: Indexes of already saved evidence that has been changed
+        :return: None
+        """
+        with self.lock:
+            connection = self.connection()
+            with connection:
+                written = self._write_changes(connection, case, changed_events, changed_evidence)
+
+            # Only counted as written once the transaction has gone through
+            self.header, self.event_count, self.evidence_count, self.ledger_count, self.ledger_head = written
+
+    def read_search_index(self) -> SearchIndex:
+        """
+        Reads the search index stored by `write_search_index`, if it's for the records as they are. Call after
+            `replay`.
+        :return: SearchIndex, or None if there is none or records have been stored since
+        """
+        try:
+            with self.lock:
+                connection = self.connection()
+                stored = connection.execute("SELECT value FROM details WHERE name = 'search_index'").fetchone()
+                if stored is None:
+                    return None
+
+                stored = json.loads(stored[0])
+                if stored["ledger_head"] != self.ledger_head.hex() or stored["events"] != self.event_count or \
+                        stored["evidence"] != self.evidence_count:
+                    return None
+
+                postings = {Ledger.EVENT: {}, Ledger.EVIDENCE: {}}
+                for kind, word, indexes in connection.execute("SELECT kind, word, indexes FROM search"):
+                    postings[kind][word] = indexes
+        except (sqlite3.DatabaseError, ValueError, KeyError, TypeError):
+            return None  # Broken, the index is built again when it's needed.
+
+        return SearchIndex.from_postings(stored["events"], stored["evidence"], postings[Ledger.EVENT],
+                                         postings[Ledger.EVIDENCE])
+
+    def write_search_index(self, index: SearchIndex):
+        """
+        Stores the search index, replacing the one stored before, so opening the case doesn't mean reading every
+            record to index it again. Every record added or changed makes a new ledger head, so the index is stored
+            with the head it was written for and only trusted while that's still the head.
+        Store the case first, indexes covering records that aren't stored yet aren't stored.
+        :param index: Index of the case as stored
+        :return: None
+        """
+        events, evidence, event_postings, evidence_postings = index.postings()
+
+        try:
+            with self.lock:
+                if (events, evidence) != (self.event_count, self.evidence_count):
+                    index.changed = True  # Records came in since the case was stored, next time
+                    return
+
+                connection = self.connection()
+                with connection:
+                    connection.execute("DELETE FROM search")
+                    for kind, postings in ((Ledger.EVENT, event_postings), (Ledger.EVIDENCE, evidence_postings)):
+                        connection.executemany("INSERT INTO search (kind, word, indexes) VALUES (?, ?, ?)",
+                                               ((kind, word, indexes) for word, indexes in postings.items()))
+                    connection.execute("INSERT OR REPLACE INTO details (name, value) VALUES ('search_index', ?)",
+                                       (json.dumps({"events": events, "evidence": evidence,
+                                                    "ledger_head": self.ledger_head.hex()}),))
+        except BaseException:
+            index.changed = True  # Still to be written
+            raise
+
+    def needs_compaction(self) -> bool:
+        """
+        Databases never need to be written again from scratch, SQLite reuses the space of deleted rows.
+        :return: False
+        """
+        return False
+
+    def copy_to(self, location: str):
+        """
+        Copies the saved case to another database, synced to disk, with SQLite's backup so the copy is whole even
+            while records are being added.
+        :param location: Where to copy to
+        :return: None
+        """
+        with self.lock:
+            target = sqlite3.connect(location)
+            try:
+                self.connection().backup(target)
+            finally:
+                target.close()
+
+        with open(location, "rb+") as file:
+            CaseJournal.sync(file)
+
+    def close(self):
+        """
+        Closes the connection to the database, if it's open. It's opened again when needed.
+        :return: None
+        """
+        with self.lock:
+            if self._connection is not None:
+                self._connection.close()
+                self._connection = None
+
+    # Reading --------------------------------------------------------------------------------------------------------
+
+    def connection(self) -> sqlite3.Connection:
+        """
+        The connection to the database, opened the first time it's needed. Only use it with `lock` held.
+        :return: Connection
+        """
+        if self._connection is None:
+            self._connection = self._connect(self.location, False)
+
+        return self._connection
+
+    def rows(self, table: str, start: int, stop: int) -> [tuple]:
+        """
+        Reads the fields of a range of records.
+        :param table: "events" or "evidence"
+        :param start: First index
+        :param stop: Index to stop before
+        :return: Fields of each record, in order
+        """
+        with self.lock:
+            rows = self.connection().execute("SELECT %s FROM %s WHERE id >= ? AND id < ? ORDER BY id" % (
+                ", ".join(self._columns[table]), table), (start, stop)).fetchall()
+
+        if table == "evidence":  # Images are stored as JSON, see `_row`
+            rows = [row[:4] + (json.loads(row[4]),) if row[4] else row[:4] for row in rows]
+
+        return rows
+
+    def timings(self, start: int, stop: int) -> [(int, int, str)]:
+        """
+        Start epoch, stop epoch and device of a range of events, see `EventStore.timings`.
+        """
+        with self.lock:
+            return self.connection().execute(
+                "SELECT CASE WHEN typeof(start_time) = 'integer' THEN start_time END, "
+                "CASE WHEN typeof(stop_time) = 'integer' THEN stop_time END, device "
+                "FROM events WHERE id >= ? AND id < ? ORDER BY id", (start, stop)).fetchall()
+
+    # Helpers --------------------------------------------------------------------------------------------------------
+
+    def _is_case_database(self) -> bool:
+        if not os.path.exists(self.location) or not self.is_database(self.location):
+            return False
+
+        try:
+            with self.lock:
+                self.connection()
+        except (JournalError, sqlite3.DatabaseError):
+            return False  # Some other database, it's replaced like any other file
+
+        return True
+
+    def _connect(self, location: str, create: bool = True) -> sqlite3.Connection:
+        """
+        Opens a database, setting it up for cases first if it's new.
+        :param location: Location on disk
+        :param create: Whether to set up databases that aren't case databases yet, rather than refuse them
+        :return: Connection
+        """
+        connection = sqlite3.connect(location, timeout=10, check_same_thread=False)
+        try:
+            version = connection.execute("PRAGMA user_version").fetchone()[0]
+            if version > self.VERSION:
+                raise JournalError("The case was saved by a newer version of digidence (database %d)." % version)
+            if version == 0 and not create:
+                raise JournalError("Not a case database.")
+
+            connection.execute("PRAGMA journal_mode = WAL")
+            connection.execute("PRAGMA synchronous = FULL")  # Every commit is on disk, like saving a journal
+
+            if version < self.VERSION:
+                with connection:
+                    connection.executescript("""
+                        CREATE TABLE IF NOT EXISTS details (name TEXT PRIMARY KEY, value TEXT);
+                        CREATE TABLE IF NOT EXISTS events (
+                            id INTEGER PRIMARY KEY,
+                            start_time,
+                            stop_time,
+                            comments TEXT,
+                            device TEXT
+                        );
+                        CREATE INDEX IF NOT EXISTS events_device ON events (device);
+                        CREATE INDEX IF NOT EXISTS events_start_time ON events (start_time);
+                        CREATE TABLE IF NOT EXISTS evidence (
+                            id INTEGER PRIMARY KEY,
+                            unique_identifier TEXT,
+                            additional_information TEXT,
+                            seized_date,
+                            description TEXT,
+                            images TEXT
+                        );
+                        CREATE TABLE IF NOT EXISTS ledger (
+                            position INTEGER PRIMARY KEY,
+                            kind INTEGER NOT NULL,
+                            record INTEGER NOT NULL,
+                            hash BLOB NOT NULL
+                        );
+                        CREATE TABLE IF NOT EXISTS search (
+                            kind INTEGER NOT NULL,
+                            word TEXT NOT NULL,
+                            indexes BLOB NOT NULL,
+                            PRIMARY KEY (kind, word)
+                        ) WITHOUT ROWID;
+                        %s
+                        PRAGMA user_version = %d;
+                    """ % ("ALTER TABLE evidence ADD COLUMN images TEXT;" if version == 1 else "", self.VERSION))
+        except BaseException:
+            connection.close()
+            raise
+
+        return connection
+
+    def _write_all(self, connection: sqlite3.Connection, case) -> tuple:
+        # Nothing counts as written until this has gone through, rows written again later simply replace these.
+        self.event_count = 0
+        self.evidence_count = 0
+        self.header = None
+        self.ledger_count = 0
+        self.ledger_head = Ledger.EMPTY_HEAD
+
+        return self._write_changes(connection, case, [], [])
+
+    def _write_changes(self, connection: sqlite3.Connection, case, changed_events: [int], changed_evidence: [int]):
+        """
+        Writes the header, changed and new records and new ledger entries, within the caller's transaction.
+        :return: What has been written once the transaction goes through: header, event, evidence and ledger entry
+            counts and the ledger head.
+        """
+        header = (case.case_reference, case.lab_reference, case.investigator)
+        if header != self.header:
+            connection.executemany("INSERT OR REPLACE INTO details (name, value) VALUES (?, ?)", (
+                ("case_reference", case.case_reference),
+                ("lab_reference", case.lab_reference),
+                ("investigator", case.investigator)
+            ))
+
+        # Lengths are read once, records added while we are writing (from another thread) are left for the next save.
+        event_count = len(case.events)
+        evidence_count = len(case.physical_evidence)
+        ledger_count, ledger_head = case.ledger.snapshot()
+
+        for table, records, changed, start, stop in (
+                ("events", case.events, changed_events, self.event_count, event_count),
+                ("evidence", case.physical_evidence, changed_evidence, self.evidence_count, evidence_count)):
+            columns = self._columns[table]
+            connection.executemany("UPDATE %s SET %s WHERE id = ?" % (table, ", ".join(
+                column + " = ?" for column in columns)), (self._row(columns, records[index]) + (index,)
+                                                           for index in changed))
+            connection.executemany("INSERT OR REPLACE INTO %s (id, %s) VALUES (?%s)" % (
+                table, ", ".join(columns), ", ?" * len(columns)), ((index,) + self._row(columns, record)
+                                                                  for index, record in enumerate(records[start:stop],
+                                                                                                 start)))
+
+        if ledger_count > self.ledger_count:
+            connection.executemany("INSERT OR REPLACE INTO ledger (position, kind, record, hash) VALUES (?, ?, ?, ?)",
+                                   case.ledger.rows(self.ledger_count, ledger_count))
+            connection.execute("INSERT OR REPLACE INTO details (name, value) VALUES ('ledger_head', ?)",
+                               (ledger_head.hex(),))
+
+        return header, event_count, evidence_count, ledger_count, ledger_head
+
+    @staticmethod
+    def _row(columns: (str,), record) -> tuple:
+        """
+        The fields of a record as stored in its table: the way `__getstate__` gives them, with lists of fields (the
+            images of evidence) as JSON, and columns the record leaves out, like images of evidence without any, empty.
+        """
+        state = record.__getstate__()
+        return tuple(json.dumps(value) if isinstance(value, tuple) else value
+                     for value in state) + (None,) * (len(columns) - len(state))
@@ -0,0 +1,135 @@
+from Models.CaseImporter import CaseImporter
+
+from html import escape
+import csv
+import json
+import os
+
+
+class CaseExporter(object):
+    """
+    Writes the records of a case out to CSV, JSON Lines or one standalone HTML report.
+
+    Records are written one at a time through a large file buffer, nothing is put together in memory first.
+    CSV and JSON Lines files use the same field names as `CaseImporter`, so they can be imported again.
+    Files are written next to where they're going and moved into place when done, so a failed or cancelled export
+        never leaves half a file behind.
+    """
+    BUFFER_SIZE = 1024 * 1024
+    CHUNK_SIZE = 1000  # Records written between each progress report
+
+    def __init__(self, case):
+        """
+        Initiates an exporter for a case.
+        :param case: Case to export
+        """
+        self.case = case
+
+    def write_events(self, location: str, file_format: str = None, progress=None) -> bool:
+        """
+        Writes every event in the case to a file.
+        :param location: Where to write
+        :param file_format: "csv" or "jsonl", guessed from the file extension if None.
+        :param progress: Optional callable taking records done and records in total, return False from it to cancel.
+        :return: False if cancelled
+        """
+        fields = CaseImporter.EVENT_FIELDS
+        rows = ((event.start_time, event.stop_time, event.comments, event.device) for event in self.case.events)
+
+        return self._write_rows(location, file_format, fields, rows, len(self.case.events), progress)
+
+    def write_evidence(self, location: str, file_format: str = None, progress=None) -> bool:
+        """
+        Writes all the physical evidence in the case to a file, see `write_events`.
+        :return: False if cancelled
+        """
+        fields = CaseImporter.EVIDENCE_FIELDS
+        rows = ((evidence.unique_identifier, evidence.seized_date, evidence.description,
+                 evidence.additional_information) for evidence in self.case.physical_evidence)
+
+        return self._write_rows(location, file_format, fields, rows, len(self.case.physical_evidence), progress)
+
+    def write_html(self, location: str, progress=None) -> bool:
+        """
+        Writes the whole case as one HTML page, every record rendered with its template and starting on a new page
+            when printed from a browser.
+        :param location: Where to write
+        :param progress: See `write_events`
+        :return: False if cancelled
+        """
+        case = self.case
+        total = len(case.events) + len(case.physical_evidence)
+
+        def write(file):
+            file.write('<!DOCTYPE html>\n<html>\n<head>\n<meta charset="UTF-8">\n<title>%s</title>\n<style>\n'
+                       % escape(case.case_reference or ""))
+            for style in case.record_styles():
+                file.write(style)
+                file.write("\n")
+            file.write(".record + .record { page-break-before: always; }\n</style>\n</head>\n<body>\n")
+
+            for done, html in enumerate(case.records_to_html("body"), 1):
+                file.write('<section class="record">')
+                file.write(html)
+                file.write("</section>\n")
+
+                if done % self.CHUNK_SIZE == 0 and progress is not None and progress(done, total) is False:
+                    return False
+
+            file.write("</body>\n</html>\n")
+            return True
+
+        return self._write(location, write)
+
+    @staticmethod
+    def guess_format(location: str) -> str:
+        """
+        Picks a format from the file extension, JSON Lines for .jsonl, .ndjson and .json files and CSV for the rest.
+        :param location: File location
+        :return: "csv" or "jsonl"
+        """
+        extension = os.path.splitext(location)[1].lower()
+        return "jsonl" if extension in (".jsonl", ".ndjson", ".json") else "csv"
+
+    # Helpers --------------------------------------------------------------------------------------------------------
+
+    def _write_rows(self, location: str, file_format: str, fields: tuple, rows, total: int, progress) -> bool:
+        file_format = file_format or self.guess_format(location)
+        if file_format not in ("csv", "jsonl"):
+            raise ValueError("Unknown format: " + str(file_format))
+
+        def write(file):
+            if file_format == "csv":
+                writer = csv.writer(file)
+                writer.writerow(fields)
+                write_row = writer.writerow
+            else:
+                encode = json.JSONEncoder(ensure_ascii=False).encode
+                write_row = lambda row: file.write(encode(dict(zip(fields, row))) + "\n")
+
+            for done, row in enumerate(rows, 1):
+                write_row(row)
+
+                if done % self.CHUNK_SIZE == 0 and progress is not None and progress(done, total) is False:
+                    return False
+
+            return True
+
+        return self._write(location, write)
+
+    def _write(self, location: str, write) -> bool:
+        temporary_location = location + ".tmp"
+        try:
+            with open(temporary_location, "w", encoding="utf-8", newline="", buffering=self.BUFFER_SIZE) as file:
+                finished = write(file)
+        except BaseException:
+            if os.path.exists(temporary_location):
+                os.remove(temporary_location)
+            raise
+
+        if not finished:
+            os.remove(temporary_location)
+            return False
+
+        os.replace(temporary_location, location)
+        return True
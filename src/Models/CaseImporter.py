@@ -0,0 +1,222 @@
+from Models.Event import Event
+from Models.Evidence import Evidence
+
+import csv
+import json
+import os
+
+
+class CaseImportError(Exception):
+    """
+    A file couldn't be imported. Raised for the first bad row when importing strictly.
+    """
+
+
+class CaseImporter(object):
+    """
+    Imports events or physical evidence into a case from CSV or JSON Lines files, like the logs imaging tools write.
+
+    The file is read a line at a time and rows are added to the case in batches, so the importer holds on to no more
+        than one batch however big the file is.
+    Fields are named like the attributes of `Event` and `Evidence`, as columns in the header row of a CSV file or as
+        keys of the objects in a JSON Lines file. Anything else is ignored.
+    Rows are checked the way the case window checks what's typed in: every field has to be filled out, events have
+        to be on evidence in the case, and unique identifiers have to be unique. Bad rows are skipped and counted.
+    """
+    BATCH_SIZE = 1000  # Rows added to the case at a time
+    ERRORS_KEPT = 100  # Messages kept about skipped rows, the rest are only counted
+
+    EVENT_FIELDS = ("start_time", "stop_time", "comments", "device")
+    EVIDENCE_FIELDS = ("unique_identifier", "seized_date", "description", "additional_information")
+
+    def __init__(self, case, strict: bool = False):
+        """
+        Initiates an importer for a case.
+        :param case: Case to add records to
+        :param strict: Raise `CaseImportError` on the first bad row instead of skipping it, before anything is added.
+        """
+        self.case = case
+        self.strict = strict
+
+        self.imported = 0
+        self.skipped = 0
+        self.errors = []  # type: [str]  # The first `ERRORS_KEPT` reasons rows were skipped
+
+        self._position = 0  # Bytes read so far
+        self._seen = set()  # Unique identifiers in the file so far, the case doesn't know about the current batch yet
+
+    def import_events(self, location: str, file_format: str = None, progress=None) -> int:
+        """
+        Adds the events in a file to the case.
+        :param location: File to import
+        :param file_format: "csv" or "jsonl", guessed from the file extension if None.
+        :param progress: Optional callable taking bytes read and file size, return False from it to stop early.
+        :return: Number of events imported
+        """
+        return self._import(location, file_format, self.EVENT_FIELDS, self._event, self.case.extend_events, progress)
+
+    def import_evidence(self, location: str, file_format: str = None, progress=None) -> int:
+        """
+        Adds the physical evidence in a file to the case, see `import_events`.
+        :return: Number of pieces of evidence imported
+        """
+        return self._import(location, file_format, self.EVIDENCE_FIELDS, self._evidence, self.case.extend_evidence,
+                            progress)
+
+    @staticmethod
+    def guess_format(location: str) -> str:
+        """
+        Guesses the format of a file from its extension.
+        :param location: File location
+        :return: "csv" or "jsonl"
+        """
+        extension = os.path.splitext(location)[1].lower()
+        if extension in (".jsonl", ".ndjson", ".json"):
+            return "jsonl"
+        if extension in (".csv", ".txt"):
+            return "csv"
+
+        raise CaseImportError("Can't tell the format of " + location + ", expected .csv or .jsonl")
+
+    # Helpers --------------------------------------------------------------------------------------------------------
+
+    def _import(self, location: str, file_format: str, fields: tuple, make, add, progress) -> int:
+        file_format = file_format or self.guess_format(location)
+        if file_format not in ("csv", "jsonl"):
+            raise CaseImportError("Unknown format: " + str(file_format))
+
+        size = os.path.getsize(location)
+        imported = self.imported
+
+        # Storage that writes records through as they're added would store every batch on its own, and an import
+        #   that fails part way couldn't be taken back. Everything is stored by the save after the import instead.
+        write_through, self.case.write_through = self.case.write_through, False
+        try:
+            # Strict imports read the file twice, checking every row before adding any, so a bad row near the end
+            #   doesn't leave the rows before it in the case. Progress counts both reads.
+            done, total = 0, size
+            if self.strict:
+                total = 2 * size
+                for count, _ in enumerate(self._records(location, file_format, fields, make), 1):
+                    if count % self.BATCH_SIZE == 0 and progress is not None and \
+                            progress(self._position, total) is False:
+                        return 0
+                done = size
+
+            batch = []
+            for record in self._records(location, file_format, fields, make):
+                batch.append(record)
+                if len(batch) >= self.BATCH_SIZE:
+                    add(batch)
+                    self.imported += len(batch)
+                    batch = []
+
+                    if progress is not None and progress(done + self._position, total) is False:
+                        break
+            else:
+                if batch:
+                    add(batch)
+                    self.imported += len(batch)
+
+                if progress is not None:
+                    progress(total, total)
+        finally:
+            self.case.write_through = write_through
+
+        self._seen = set()
+        return self.imported - imported
+
+    def _records(self, location: str, file_format: str, fields: tuple, make):
+        """
+        Reads a file a line at a time, yielding the records made from the rows that check out.
+        """
+        self._position = 0
+        self._seen = set()
+
+        with open(location, "rb") as file:
+            rows = self._csv_rows(file, fields) if file_format == "csv" else self._jsonl_rows(file, fields)
+            for number, row in rows:
+                record = self._checked(number, row, fields, make)
+                if record is not None:
+                    yield record
+
+    def _lines(self, file):
+        """
+        Decodes the lines of a binary file, keeping track of how far in we are for progress reports.
+        """
+        for line in file:
+            self._position += len(line)
+            yield line.decode("utf-8-sig" if self._position == len(line) else "utf-8")
+
+    def _csv_rows(self, file, fields: tuple):
+        lines = self._lines(file)
+        reader = csv.reader(lines)
+
+        header = next(reader, None)
+        if header is None:
+            return
+
+        header = [name.strip().lower() for name in header]
+        missing = [field for field in fields if field not in header]
+        if missing:
+            raise CaseImportError("Missing columns: " + ", ".join(missing))
+
+        columns = [(field, header.index(field)) for field in fields]
+        for row in reader:
+            if not row:
+                continue  # Blank line
+
+            yield reader.line_num, {field: row[column] if column < len(row) else "" for field, column in columns}
+
+    def _jsonl_rows(self, file, fields: tuple):
+        for number, line in enumerate(self._lines(file), 1):
+            if not line.strip():
+                continue
+
+            try:
+                row = json.loads(line)
+            except ValueError as error:
+                self._skip(number, "not JSON: " + str(error))
+                continue
+
+            if not isinstance(row, dict):
+                self._skip(number, "not a JSON object")
+                continue
+
+            yield number, {field: row.get(field) for field in fields}
+
+    def _checked(self, number: int, row: dict, fields: tuple, make):
+        for field in fields:
+            value = row[field]
+            if value is None or (value.__class__ is str and value.strip() == ""):
+                return self._skip(number, "no " + field.replace("_", " "))
+            if value.__class__ is not str:
+                row[field] = str(value)
+
+        return make(number, row)
+
+    def _event(self, number: int, row: dict) -> Event:
+        device = row["device"]
+        if self.case.evidence_index(device) is None:
+            return self._skip(number, "no evidence with identifier " + device)
+
+        return Event(row["start_time"], row["stop_time"], row["comments"], device)
+
+    def _evidence(self, number: int, row: dict) -> Evidence:
+        unique_identifier = row["unique_identifier"]
+        if unique_identifier in self._seen or self.case.evidence_index(unique_identifier) is not None:
+            return self._skip(number, "there is already evidence with identifier " + unique_identifier)
+
+        self._seen.add(unique_identifier)
+        return Evidence(unique_identifier, row["additional_information"], row["seized_date"], row["description"])
+
+    def _skip(self, number: int, reason: str):
+        message = "Line %d: %s" % (number, reason)
+        if self.strict:
+            raise CaseImportError(message)
+
+        self.skipped += 1
+        if len(self.errors) < self.ERRORS_KEPT:
+            self.errors.append(message)
+
+        return None
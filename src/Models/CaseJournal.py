@@ -0,0 +1,548 @@
+from Models.Event import Event
+from Models.Evidence import Evidence
+from Models.EvidenceImage import EvidenceImage
+from Models.LazyRecords import LazyRecords, MappedFile, zstandard
+from Models.Ledger import Ledger
+from Models.SearchIndex import SearchIndex
+
+import json
+import os
+import shutil
+import struct
+
+
+class JournalError(Exception):
+    """
+    Raised when a journal file can not be understood.
+    """
+
+
+class CaseJournal(object):
+    """
+    Storage for a case: a compact copy of the whole case, followed by a journal of what has changed since.
+
+    The file starts with a fixed size header (see `_file_header`) holding a magic string, the format version, how
+        records are compressed, the number of records and where everything else is. Next come the records, in blocks
+        of `BLOCK_SIZE` events or evidence. A block is a JSON list of records, each a list of fields in the order
+        `Event.__getstate__` and `Evidence.__getstate__` give them, compressed on its own. Then a table with the
+        offset and length of every block, and the entries of the case's `Ledger` as columns (see `Ledger.columns`).
+        Opening a case only reads the header and the table, records are read when they are needed, see `LazyRecords`.
+    The journal follows. Every journal record is a 4 byte little-endian length, a 1 byte record kind and a JSON
+        payload of that length. Saving only appends journal records for what is new or changed since the last save,
+        so a save costs the same no matter how big the case is. Changed records are appended again with the same
+        index and simply win over the older copy when replaying. Ledger entries are journal records too.
+    Once the journal holds more dead copies than live records, or more records than the blocks do, the whole file is
+        written again from scratch, see `needs_compaction`.
+    Version 1 files are just the journal, with the version right after the magic string. They are still read, and
+        written in the current version the next time they are saved.
+    Nothing in the file is ever run, unlike the pickles that cases used to be saved as.
+    """
+    MAGIC = b"DIGIJRNL"
+    VERSION = 2
+
+    BLOCK_SIZE = 1000  # Records per block
+    COMPRESSION = MappedFile.ZSTD if zstandard is not None else MappedFile.ZLIB
+
+    HEADER_RECORD = 1
+    EVENT_RECORD = 2
+    EVIDENCE_RECORD = 3
+    LEDGER_RECORD = 4
+
+    WRITES_THROUGH = False  # Records are only written when the case is saved, unlike `CaseDatabase`
+
+    COMPACTION_MINIMUM = 1024  # Don't bother compacting small journals, rewriting those costs next to nothing anyway.
+
+    _record_header = struct.Struct("<IB")
+
+    # Magic, version, compression, unused, block size, event count, evidence count, ledger entry count, table offset,
+    # ledger offset, journal offset and the head of the ledger after the stored entries.
+    _file_header = struct.Struct("<8sBBHIIIIQQQ32s")
+    _block_entry = struct.Struct("<QI")  # Offset and stored length
+    _ledger_entry_size = 1 + 4 + 32  # Kind, index and hash, see `Ledger.columns`
+
+    location = None  # type: str
+
+    event_count = 0  # type: int
+    evidence_count = 0  # type: int
+    header = None  # type: tuple
+
+    live_records = 0  # type: int
+    dead_records = 0  # type: int
+
+    stored_records = 0  # type: int  # Events and evidence in blocks
+    journal_records = 0  # type: int  # Events and evidence in the journal after them
+
+    ledger_count = 0  # type: int  # Ledger entries written
+    ledger_head = Ledger.EMPTY_HEAD  # type: bytes  # Head of the ledger after the last entry written
+
+    def __init__(self, location: str, compression: int = None):
+        """
+        Initiates a journal for the file at the given location. Nothing is read or written until asked to.
+        :param location: Location on disk
+        :param compression: `MappedFile.NONE`, `ZLIB` or `ZSTD` for blocks written, defaults to `COMPRESSION`. Files
+            that are read keep the compression they were written with.
+        """
+        self.location = location
+        self.version = self.VERSION
+        self.compression = self.COMPRESSION if compression is None else compression
+        self._valid_length = None  # Offset of the end of the last complete record
+
+        if self.compression == MappedFile.ZSTD and zstandard is None:
+            raise JournalError("Compressing with zstd needs the zstandard package.")
+
+    @classmethod
+    def is_journal(cls, location: str) -> bool:
+        """
+        Checks whether the file at the given location is a journal or something else, like an old pickled case.
+        :param location: Location on disk
+        :return: True if the file starts with the journal magic string
+        """
+        with open(location, "rb") as file:
+            return file.read(len(cls.MAGIC)) == cls.MAGIC
+
+    def replay(self, case):
+        """
+        Reads the case from the file into the given case. Stored records are read as they're needed, unless the case
+            keeps its events in an `EventStore`, journal records are applied in order.
+        :param case: An empty case to fill
+        :return: None
+        """
+        with open(self.location, "rb") as file:
+            start = file.read(len(self.MAGIC) + 1)
+            if len(start) < len(self.MAGIC) + 1 or not start.startswith(self.MAGIC):
+                raise JournalError("Not a case journal.")
+
+            self.version = start[-1]
+            if self.version > self.VERSION:
+                raise JournalError("The case was saved by a newer version of digidence (format %d)." % self.version)
+
+            if self.version == 1:
+                journal_offset = len(start)
+            else:
+                file.seek(0)
+                journal_offset = self._read_stored(file, case)
+
+            file.seek(journal_offset)
+            data = file.read()
+
+        offset = 0
+        header_size = self._record_header.size
+
+        while offset + header_size <= len(data):
+            length, kind = self._record_header.unpack_from(data, offset)
+            end = offset + header_size + length
+            if end > len(data):
+                break  # Torn write at the end of the file, everything before it is still good.
+
+            try:
+                payload = json.loads(data[offset + header_size:end].decode("utf-8"))
+            except ValueError:
+                raise JournalError("Unreadable record at offset %d." % (journal_offset + offset))
+
+            self._apply(case, kind, payload)
+            offset = end
+
+        self._valid_length = journal_offset + offset
+
+    def rewrite(self, case):
+        """
+        Writes the whole case to a fresh file in the current version, replacing whatever was at the location.
+        Writes to a temporary file first and syncs it to disk before moving it into place, so neither a crash halfway
+            through nor a power cut right after leaves a half written case behind.
+        :param case: Case to write
+        :return: None
+        """
+        self.event_count = 0
+        self.evidence_count = 0
+        self.header = None
+        self.live_records = 0
+        self.dead_records = 0
+        self.journal_records = 0
+
+        temporary_location = self.location + ".tmp"
+        try:
+            with open(temporary_location, "wb") as file:
+                self._write_stored(file, case)
+                self._write_changes(file, case, [], [])  # The case details, and anything added in the meantime
+                self._valid_length = file.tell()
+                self.sync(file)
+        except BaseException:
+            if os.path.exists(temporary_location):
+                os.remove(temporary_location)
+            raise
+
+        self.release(case)
+        os.replace(temporary_location, self.location)
+        self.sync_folder(self.location)
+        self.version = self.VERSION
+
+    def append(self, case, changed_events: [int], changed_evidence: [int]):
+        """
+        Appends everything that is new in the case since the last save, plus the given changed records.
+        :param case: Case to save
+        :param changed_events: Indexes of already saved events that have been changed
+        :param changed_evidence: Indexes of already saved evidence that has been changed
+        :return: None
+        """
+        with open(self.location, "r+b") as file:
+            if self._valid_length is None:
+                file.seek(0, os.SEEK_END)
+            else:
+                file.truncate(self._valid_length)  # Drop a torn record left by a crash so we don't append after it.
+                file.seek(self._valid_length)
+
+            self._write_changes(file, case, changed_events, changed_evidence)
+            self._valid_length = file.tell()
+            self.sync(file)
+
+    def needs_compaction(self) -> bool:
+        """
+        Tells whether the journal carries enough dead records, or enough records that could be in blocks, for a
+            rewrite to be worth it. Files in an older version are always worth rewriting.
+        :return: True if the journal should be rewritten
+        """
+        if self.version < self.VERSION:
+            return True
+        if self.dead_records >= self.COMPACTION_MINIMUM and self.dead_records > self.live_records:
+            return True
+
+        # Rewriting once the journal has grown past the blocks keeps the cost of rewriting per record saved constant.
+        return self.journal_records >= self.COMPACTION_MINIMUM and self.journal_records > self.stored_records
+
+    def copy_to(self, location: str):
+        """
+        Copies the saved case to another file, synced to disk.
+        :param location: Where to copy to
+        :return: None
+        """
+        with open(self.location, "rb") as source, open(location, "wb") as file:
+            shutil.copyfileobj(source, file, 1024 * 1024)
+            self.sync(file)
+
+    def read_search_index(self) -> SearchIndex:
+        """
+        Reads the search index kept next to the file, see `SearchIndex.read`.
+        :return: SearchIndex, or None if there is none or it isn't for the file as it is
+        """
+        return SearchIndex.read(self.location + ".search", self.location)
+
+    def write_search_index(self, index: SearchIndex):
+        """
+        Writes the search index next to the file, see `SearchIndex.write`. Write the case first.
+        :return: None
+        """
+        index.write(self.location + ".search", self.location)
+
+    @staticmethod
+    def release(case):
+        """
+        Lets go of any case file the case is reading records from, before that file is replaced.
+        Only Windows needs this, it won't replace a file that is mapped.
+        :param case: Case about to be written over its own file
+        :return: None
+        """
+        if os.name == "nt":
+            for records in (case.events, case.physical_evidence):
+                if isinstance(records, LazyRecords) and isinstance(records.source, MappedFile):
+                    records.source.detach()
+
+    @staticmethod
+    def sync(file):
+        """
+        Makes sure what has been written to a file is on disk, not just in the operating system's cache.
+        :param file: Open file
+        :return: None
+        """
+        file.flush()
+        os.fsync(file.fileno())
+
+    @staticmethod
+    def sync_folder(location: str):
+        """
+        Makes sure a file that has just been created, renamed or removed stays that way after a power cut.
+        Not every system can open folders (Windows can't), those are left to themselves.
+        :param location: Location of the file
+        :return: None
+        """
+        try:
+            folder = os.open(os.path.dirname(os.path.abspath(location)), os.O_RDONLY)
+        except OSError:
+            return
+
+        try:
+            os.fsync(folder)
+        except OSError:
+            pass
+        finally:
+            os.close(folder)
+
+    # Stored records ---------------------------------------------------------------------------------------------------
+
+    def _write_stored(self, file, case):
+        """
+        Writes the header, the blocks of records, the block table and the ledger columns to a new file, and updates
+            the counts to match.
+        :return: None
+        """
+        # Counts are read once, anything added while we're writing goes into the journal after the blocks.
+        event_count = len(case.events)
+        evidence_count = len(case.physical_evidence)
+        ledger_count, ledger_head = case.ledger.snapshot()
+
+        file.write(bytes(self._file_header.size))  # Filled in once we know where everything went
+
+        blocks = []
+        for records, count in ((case.events, event_count), (case.physical_evidence, evidence_count)):
+            for number, start in enumerate(range(0, count, self.BLOCK_SIZE)):
+                data = None
+                if isinstance(records, LazyRecords):
+                    data = records.raw_block(number, self.BLOCK_SIZE, count, self.compression)  # Saves unpacking
+
+                if data is None:
+                    data = MappedFile.compress(self.compression, json.dumps(
+                        [record.__getstate__() for record in records[start:min(start + self.BLOCK_SIZE, count)]],
+                        ensure_ascii=False, separators=(",", ":")).encode("utf-8"))
+
+                blocks.append((file.tell(), len(data)))
+                file.write(data)
+
+        table_offset = file.tell()
+        for offset, length in blocks:
+            file.write(self._block_entry.pack(offset, length))
+
+        ledger_offset = file.tell()
+        for column in case.ledger.columns(ledger_count):
+            file.write(column)
+
+        journal_offset = file.tell()
+        file.seek(0)
+        file.write(self._file_header.pack(self.MAGIC, self.VERSION, self.compression, 0, self.BLOCK_SIZE,
+                                          event_count, evidence_count, ledger_count, table_offset, ledger_offset,
+                                          journal_offset, ledger_head))
+        file.seek(journal_offset)
+
+        self.event_count = event_count
+        self.evidence_count = evidence_count
+        self.ledger_count = ledger_count
+        self.ledger_head = ledger_head
+        self.stored_records = event_count + evidence_count
+        self.live_records = self.stored_records + ledger_count
+
+    def _read_stored(self, file, case) -> int:
+        """
+        Reads the header, block table and ledger columns, and gives the case lists reading from the blocks.
+        :return: Offset of the journal after the stored records
+        """
+        header = file.read(self._file_header.size)
+        if len(header) < self._file_header.size:
+            raise JournalError("The case file is cut short.")
+
+        _, _, self.compression, _, block_size, event_count, evidence_count, ledger_count, table_offset, \
+            ledger_offset, journal_offset, ledger_head = self._file_header.unpack(header)
+
+        if self.compression not in (MappedFile.NONE, MappedFile.ZLIB, MappedFile.ZSTD):
+            raise JournalError("Unknown compression %d." % self.compression)
+        if self.compression == MappedFile.ZSTD and zstandard is None:
+            raise JournalError("The case is compressed with zstd, opening it needs the zstandard package.")
+        if block_size == 0 and event_count + evidence_count > 0:
+            raise JournalError("Damaged header.")
+
+        event_blocks = -(-event_count // block_size) if event_count else 0
+        evidence_blocks = -(-evidence_count // block_size) if evidence_count else 0
+
+        file.seek(table_offset)
+        table = file.read((event_blocks + evidence_blocks) * self._block_entry.size)
+        file.seek(ledger_offset)
+        ledger = file.read(ledger_count * self._ledger_entry_size)
+        if len(table) < (event_blocks + evidence_blocks) * self._block_entry.size or \
+                len(ledger) < ledger_count * self._ledger_entry_size:
+            raise JournalError("The case file is cut short.")
+
+        blocks = list(self._block_entry.iter_unpack(table))
+        source = MappedFile(self.location, ledger_offset, self.compression)  # Everything up to the ledger
+
+        events = LazyRecords(source, blocks[:event_blocks], block_size, event_count, self._fields_to_event)
+        if isinstance(case.events, list):
+            case.events = events
+        else:
+            case.events.extend(events)  # An `EventStore`, read everything into it
+        case.physical_evidence = LazyRecords(source, blocks[event_blocks:], block_size, evidence_count,
+                                             self._fields_to_evidence)
+
+        case.ledger.load_columns(ledger[:ledger_count], ledger[ledger_count:ledger_count * 5],
+                                 ledger[ledger_count * 5:], ledger_head)
+
+        self.event_count = event_count
+        self.evidence_count = evidence_count
+        self.ledger_count = ledger_count
+        self.ledger_head = ledger_head
+        self.stored_records = event_count + evidence_count
+        self.live_records = self.stored_records + ledger_count
+
+        return journal_offset
+
+    @staticmethod
+    def _fields_to_event(fields: list) -> Event:
+        event = Event.__new__(Event)  # Skips parsing, the fields are stored parsed.
+        event.__setstate__(fields)
+        return event
+
+    @staticmethod
+    def _fields_to_evidence(fields: list) -> Evidence:
+        evidence = Evidence.__new__(Evidence)
+        evidence.__setstate__(fields)
+        return evidence
+
+    # Record handling ------------------------------------------------------------------------------------------------
+
+    def _write_changes(self, file, case, changed_events: [int], changed_evidence: [int]):
+        """
+        Writes header, changed and new records to an open file.
+        :return: None
+        """
+        header = (case.case_reference, case.lab_reference, case.investigator)
+        if header != self.header:
+            self._write_record(file, self.HEADER_RECORD, {
+                "case_reference": case.case_reference,
+                "lab_reference": case.lab_reference,
+                "investigator": case.investigator
+            }, self.header is not None)
+            self.header = header
+
+        for index in changed_events:
+            self._write_record(file, self.EVENT_RECORD, self._event_to_record(index, case.events[index]), True)
+
+        # Lengths are read once, records added while we are writing (from another thread) are left for the next save.
+        event_count = len(case.events)
+        for index in range(self.event_count, event_count):
+            self._write_record(file, self.EVENT_RECORD, self._event_to_record(index, case.events[index]), False)
+        self.event_count = event_count
+
+        for index in changed_evidence:
+            self._write_record(file, self.EVIDENCE_RECORD,
+                               self._evidence_to_record(index, case.physical_evidence[index]), True)
+
+        evidence_count = len(case.physical_evidence)
+        for index in range(self.evidence_count, evidence_count):
+            self._write_record(file, self.EVIDENCE_RECORD,
+                               self._evidence_to_record(index, case.physical_evidence[index]), False)
+        self.evidence_count = evidence_count
+
+        # The ledger is a history, every entry is kept, even through compaction.
+        ledger_count = len(case.ledger)
+        for kind, index, digest, head in case.ledger.entries(self.ledger_count, ledger_count, self.ledger_head):
+            self._write_record(file, self.LEDGER_RECORD, {
+                "kind": kind,
+                "index": index,
+                "hash": digest.hex(),
+                "head": head.hex()
+            }, False)
+            self.ledger_head = head
+        self.ledger_count = ledger_count
+
+    def _write_record(self, file, kind: int, payload: dict, replaces: bool):
+        """
+        Frames and writes a single record.
+        :param replaces: Whether this record supersedes one already in the journal
+        :return: None
+        """
+        data = json.dumps(payload, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+        file.write(self._record_header.pack(len(data), kind))
+        file.write(data)
+
+        if kind == self.EVENT_RECORD or kind == self.EVIDENCE_RECORD:
+            self.journal_records += 1
+
+        if replaces:
+            self.dead_records += 1
+        else:
+            self.live_records += 1
+
+    def _apply(self, case, kind: int, payload: dict):
+        """
+        Applies a single record read from the journal to a case.
+        :return: None
+        """
+        if kind == self.HEADER_RECORD:
+            case.case_reference = payload["case_reference"]
+            case.lab_reference = payload["lab_reference"]
+            case.investigator = payload["investigator"]
+
+            if self.header is None:
+                self.live_records += 1
+            else:
+                self.dead_records += 1
+            self.header = (case.case_reference, case.lab_reference, case.investigator)
+        elif kind == self.EVENT_RECORD:
+            self._place(case.events, payload["index"], self._record_to_event(payload))
+            self.event_count = len(case.events)
+        elif kind == self.EVIDENCE_RECORD:
+            self._place(case.physical_evidence, payload["index"], self._record_to_evidence(payload))
+            self.evidence_count = len(case.physical_evidence)
+        elif kind == self.LEDGER_RECORD:
+            head = bytes.fromhex(payload["head"])
+            case.ledger.load_entry(payload["kind"], payload["index"], bytes.fromhex(payload["hash"]), head)
+            self.ledger_count += 1
+            self.ledger_head = head
+            self.live_records += 1
+        else:
+            raise JournalError("Unknown record kind %d." % kind)
+
+    def _place(self, records: list, index: int, record):
+        """
+        Appends a record, or replaces an older copy of it.
+        :return: None
+        """
+        self.journal_records += 1
+
+        if index == len(records):
+            records.append(record)
+            self.live_records += 1
+        elif 0 <= index < len(records):
+            records[index] = record
+            self.dead_records += 1
+        else:
+            raise JournalError("Record index %d is out of order." % index)
+
+    @staticmethod
+    def _event_to_record(index: int, event: Event) -> dict:
+        return {
+            "index": index,
+            "start_time": event.start_time,
+            "stop_time": event.stop_time,
+            "comments": event.comments,
+            "device": event.device
+        }
+
+    @staticmethod
+    def _record_to_event(record: dict) -> Event:
+        event = Event()
+        event.start_time = record["start_time"]
+        event.stop_time = record["stop_time"]
+        event.comments = record["comments"]
+        event.device = record["device"]
+        return event
+
+    @staticmethod
+    def _evidence_to_record(index: int, evidence: Evidence) -> dict:
+        return {
+            "index": index,
+            "unique_identifier": evidence.unique_identifier,
+            "additional_information": evidence.additional_information,
+            "seized_date": evidence.seized_date,
+            "description": evidence.description,
+            "images": [image.__getstate__() for image in evidence.images]
+        }
+
+    @staticmethod
+    def _record_to_evidence(record: dict) -> Evidence:
+        evidence = Evidence()
+        evidence.unique_identifier = record["unique_identifier"]
+        evidence.additional_information = record["additional_information"]
+        evidence.seized_date = record["seized_date"]
+        evidence.description = record["description"]
+        for fields in record.get("images") or ():  # Journals written before images can be attached have none
+            image = EvidenceImage.__new__(EvidenceImage)
+            image.__setstate__(fields)
+            evidence.images.append(image)
+        return evidence
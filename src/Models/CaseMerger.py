@@ -0,0 +1,267 @@
+from Models.Ledger import Ledger
+
+
+class MergeError(Exception):
+    """
+    Two cases can't be merged as asked, the message says why.
+    """
+
+
+class CaseMerger(object):
+    """
+    Works out how two copies of a case differ, and merges one into the other, for examiners who worked on copies of
+        the same case on their own.
+
+    Records are matched by what they are, not where they are in the lists, since both copies have had records added
+        since they were copied. Evidence is matched by its unique identifier. Events have nothing like that, so they're
+        matched by the hash they were logged with, which the ledger keeps along with the hash of every change since
+        (see `Ledger`): an event is the same event in both cases if they ever had a version in common, however much it
+        was changed afterwards. That history also tells which side changed a record: if their version is one ours had
+        before, we changed it, if ours is one theirs had, they did. Records both sides changed are conflicts.
+    Matching goes through each case's records and ledger once, looking versions up by hash, so it takes time in step
+        with the size of the cases. Records aren't hashed again, the hashes in the ledgers are used as they are,
+        except that records taken from theirs are checked against their ledger before they go into ours.
+    """
+    ADDED = "added"  # Only theirs has it, merged in
+    ONLY_OURS = "only in ours"  # Only ours has it, kept
+    THEIRS_CHANGED = "changed by them"  # Both have it, they changed it, merged in
+    OURS_CHANGED = "changed by us"  # Both have it, we changed it, kept
+    CONFLICT = "conflict"  # Both have it and both changed it, merged in only if preferring theirs
+
+    STATUSES = (ADDED, ONLY_OURS, THEIRS_CHANGED, OURS_CHANGED, CONFLICT)
+    DETAILS = ("case_reference", "lab_reference", "investigator")
+
+    PROGRESS_EVERY = 10000  # Records between progress reports
+
+    def __init__(self, ours, theirs):
+        """
+        Initiates a merger. Nothing is compared until `compare`.
+        :param ours: Case to merge into
+        :param theirs: Case to merge from, left as it is
+        """
+        self.ours = ours
+        self.theirs = theirs
+
+        # Differences as status, index in ours and index in theirs, None where a case doesn't have the record.
+        # Records that are the same in both aren't listed.
+        self.events = []  # type: [(str, int, int)]
+        self.evidence = []  # type: [(str, int, int)]
+        self.details = []  # type: [str]  # Case details that differ, ours are kept
+
+        self._their_hashes = {}  # type: {int: [bytes]}  # Current hashes of their records by `Ledger` kind
+        self._compared = False
+
+    def compare(self, progress=None) -> bool:
+        """
+        Works out how the cases differ, see `events` and `evidence`.
+        :param progress: Optional callable taking records done and records in total, return False from it to stop.
+        :return: False if stopped early
+        """
+        ours, theirs = self.ours, self.theirs
+        self.details = [name for name in self.DETAILS if getattr(ours, name) != getattr(theirs, name)]
+
+        our_versions = self._versions(ours)
+        their_versions = self._versions(theirs)
+        total = len(ours.events) + len(theirs.events) + len(ours.physical_evidence) + len(theirs.physical_evidence)
+        done = [0]
+
+        def report(count: int) -> bool:
+            done[0] += count
+            return progress is None or progress(done[0], total) is not False
+
+        # Evidence has a stable identifier to go by.
+        ours_by_identifier = {evidence.unique_identifier: index
+                              for index, evidence in enumerate(ours.physical_evidence)}
+        matches = [(ours_by_identifier.get(evidence.unique_identifier), index)
+                   for index, evidence in enumerate(theirs.physical_evidence)]
+        self.evidence = self._differences(matches, len(ours.physical_evidence), our_versions[Ledger.EVIDENCE],
+                                          their_versions[Ledger.EVIDENCE])
+        if not report(len(ours.physical_evidence) + len(theirs.physical_evidence)):
+            return False
+
+        # Events go by every hash they've ever had. The same event logged twice has the same hashes, so versions map
+        #   to every event that had them, and each of ours is matched once.
+        current, replaced = our_versions[Ledger.EVENT]
+        ours_by_version = {}
+        for index, digest in enumerate(current):
+            for version in replaced.get(index, (digest,)):
+                indexes = ours_by_version.get(version)
+                if indexes is None:
+                    ours_by_version[version] = [index]
+                elif indexes[-1] != index:
+                    indexes.append(index)
+
+            if index % self.PROGRESS_EVERY == self.PROGRESS_EVERY - 1 and not report(self.PROGRESS_EVERY):
+                return False
+        report(len(current) % self.PROGRESS_EVERY)
+
+        matched = bytearray(len(current))
+        matches = []
+        their_current, their_replaced = their_versions[Ledger.EVENT]
+        for index, digest in enumerate(their_current):
+            match = None
+            for version in their_replaced.get(index, (digest,)):
+                for candidate in ours_by_version.get(version, ()):
+                    if not matched[candidate]:
+                        match = candidate
+                        matched[candidate] = 1
+                        break
+                if match is not None:
+                    break
+            matches.append((match, index))
+
+            if index % self.PROGRESS_EVERY == self.PROGRESS_EVERY - 1 and not report(self.PROGRESS_EVERY):
+                return False
+        report(len(their_current) % self.PROGRESS_EVERY)
+
+        self.events = self._differences(matches, len(current), our_versions[Ledger.EVENT],
+                                        their_versions[Ledger.EVENT])
+        self._their_hashes = {Ledger.EVENT: their_current, Ledger.EVIDENCE: their_versions[Ledger.EVIDENCE][0]}
+        self._compared = True
+        return True
+
+    def counts(self) -> dict:
+        """
+        How many records differ in each way.
+        :return: Counts by status, for "events" and "evidence"
+        """
+        counts = {}
+        for kind, differences in (("events", self.events), ("evidence", self.evidence)):
+            counts[kind] = dict.fromkeys(self.STATUSES, 0)
+            for status, _, _ in differences:
+                counts[kind][status] += 1
+
+        return counts
+
+    def conflicts(self) -> int:
+        return sum(1 for differences in (self.events, self.evidence) for status, _, _ in differences
+                   if status == self.CONFLICT)
+
+    def merge(self, prefer_theirs: bool = None, progress=None) -> int:
+        """
+        Merges their records into ours: records only they have are added, and records they changed replace ours.
+        Their evidence goes in before their events, so events are never added before the evidence they're on.
+        :param prefer_theirs: How to settle conflicts, True takes theirs, False keeps ours. None refuses to merge
+            cases with conflicts.
+        :param progress: See `compare`, which is run first if it hasn't been. Merging can only be stopped while
+            comparing, once records start going into ours they all go in.
+        :return: Number of records added or replaced in ours, or None if stopped early
+        """
+        if not self._compared and not self.compare(progress):
+            return None
+
+        if prefer_theirs is None and self.conflicts():
+            raise MergeError("%d records were changed in both cases, choose whose to keep." % self.conflicts())
+
+        taken = (self.ADDED, self.THEIRS_CHANGED, self.CONFLICT) if prefer_theirs else (self.ADDED,
+                                                                                         self.THEIRS_CHANGED)
+        ours, theirs = self.ours, self.theirs
+        evidence = [(status, our_index, their_index, theirs.physical_evidence[their_index])
+                    for status, our_index, their_index in self.evidence if status in taken]
+        events = [(status, our_index, their_index, theirs.events[their_index])
+                  for status, our_index, their_index in self.events if status in taken]
+
+        # Everything is checked before anything is changed, so a bad record doesn't leave half a merge behind.
+        self._check(Ledger.EVIDENCE, evidence)
+        self._check(Ledger.EVENT, events)
+
+        ours.extend_evidence([record for status, _, _, record in evidence if status == self.ADDED])
+        for status, our_index, _, record in evidence:
+            if status != self.ADDED:
+                ours.replace_evidence(our_index, record)
+
+        added = [record for status, _, _, record in events if status == self.ADDED]
+        for first in range(0, len(added), self.PROGRESS_EVERY):
+            ours.extend_events(added[first:first + self.PROGRESS_EVERY])
+            if progress is not None:
+                progress(min(first + self.PROGRESS_EVERY, len(added)), len(added))
+        for status, our_index, _, record in events:
+            if status != self.ADDED:
+                ours.replace_event(our_index, record)
+
+        self._compared = False  # Ours has changed, compare again before merging again
+        return len(evidence) + len(events)
+
+    # Helpers --------------------------------------------------------------------------------------------------------
+
+    def _differences(self, matches: [(int, int)], our_count: int, our_versions: tuple, their_versions: tuple):
+        """
+        Turns matched records into differences.
+        :param matches: Index in ours, or None, and index in theirs, for every record in theirs
+        :param our_count: Number of records in ours
+        :param our_versions: Current hashes and earlier versions of ours, see `_versions`
+        :param their_versions: The same of theirs
+        :return: Status, index in ours and index in theirs of every record that isn't the same in both
+        """
+        our_current, our_replaced = our_versions
+        their_current, their_replaced = their_versions
+
+        differences = []
+        matched = bytearray(our_count)
+        for our_index, their_index in matches:
+            if our_index is None:
+                differences.append((self.ADDED, None, their_index))
+                continue
+
+            matched[our_index] = 1
+            ours, theirs = our_current[our_index], their_current[their_index]
+            if ours == theirs:
+                continue
+
+            if theirs in our_replaced.get(our_index, ()):
+                status = self.OURS_CHANGED
+            elif ours in their_replaced.get(their_index, ()):
+                status = self.THEIRS_CHANGED
+            else:
+                status = self.CONFLICT
+            differences.append((status, our_index, their_index))
+
+        differences.extend((self.ONLY_OURS, index, None) for index in range(our_count) if not matched[index])
+        return differences
+
+    @staticmethod
+    def _versions(case) -> dict:
+        """
+        Reads the hashes of a case's records out of its ledger, see `Ledger`.
+        :return: By `Ledger` kind, the current hash of every record, and every hash in order of the records that have
+            been changed since they were logged
+        """
+        counts = {Ledger.EVENT: len(case.events), Ledger.EVIDENCE: len(case.physical_evidence)}
+        current = {Ledger.EVENT: [], Ledger.EVIDENCE: []}
+        replaced = {Ledger.EVENT: {}, Ledger.EVIDENCE: {}}
+
+        ledger = case.ledger
+        for _, kind, index, digest in ledger.rows(0, len(ledger)):
+            hashes = current[kind]
+            if index == len(hashes):
+                hashes.append(digest)
+            elif index < len(hashes):
+                versions = replaced[kind].get(index)
+                if versions is None:
+                    versions = replaced[kind][index] = [hashes[index]]
+                versions.append(digest)
+                hashes[index] = digest
+            # Entries skipping over records are reported by `Case.verify`, they can't be told apart here.
+
+        # Records logged without an entry, which `Case.verify` also reports, are hashed as they are.
+        for kind, records, hash_record in ((Ledger.EVENT, case.events, Ledger.event_hash),
+                                           (Ledger.EVIDENCE, case.physical_evidence, Ledger.evidence_hash)):
+            hashes = current[kind]
+            del hashes[counts[kind]:]
+            hashes.extend(hash_record(records[index]) for index in range(len(hashes), counts[kind]))
+
+        return {kind: (current[kind], replaced[kind]) for kind in current}
+
+    def _check(self, kind: int, records: list):
+        """
+        Makes sure records about to be taken from theirs are what their ledger says they are.
+        :param kind: `Ledger.EVENT` or `Ledger.EVIDENCE`
+        :param records: Status, index in ours, index in theirs and record
+        :return: None
+        """
+        hashes = self._their_hashes[kind]
+        hash_record = Ledger.event_hash if kind == Ledger.EVENT else Ledger.evidence_hash
+        for _, _, index, record in records:
+            if hash_record(record) != hashes[index]:
+                raise MergeError("%s %d of the case merged from has been changed since it was logged, verify it "
+                                 "first." % ("Event" if kind == Ledger.EVENT else "Evidence", index + 1))
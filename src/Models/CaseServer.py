@@ -0,0 +1,365 @@
+from Models.Case import Case
+from Models.Event import Event
+from Models.Evidence import Evidence
+from Models.Timestamp import require_period, require_time
+
+import asyncio
+import hmac
+import json
+import secrets
+import time
+
+PORT = 7571
+
+LINE_LIMIT = 64 * 2 ** 20  # Longest message either side accepts, snapshots of big cases come in batches well under it
+
+
+class CaseServerError(Exception):
+    """
+    Raised when talking to a case server goes wrong, or it turns down what it's asked to do.
+    """
+
+
+def encode(message: dict) -> bytes:
+    """
+    Turns a message into a line to send, see `CaseServer` for the messages.
+    """
+    return json.dumps(message, ensure_ascii=False, separators=(",", ":")).encode("utf-8") + b"\n"
+
+
+def decode(line: bytes) -> dict:
+    message = json.loads(line.decode("utf-8"))
+    if not isinstance(message, dict):
+        raise ValueError("Messages are JSON objects.")
+
+    return message
+
+
+class CaseServer(object):
+    """
+    Shares a case between examiners logging to it at the same time, from their own computers or the same one.
+
+    The server owns the case: records are only ever added here, one at a time in the order they arrive, and sent on
+        to every connected client, so every examiner ends up with the same records in the same order and no save
+        can overwrite another's. Clients keep their own copy of the case in step, see `CaseClient`.
+    Messages are JSON objects, one per line, over TCP:
+        Client                                      Server
+        {"op": "hello", "secret": "..."}            {"op": "welcome", "details": {...}, "events": n, "evidence": n,
+                                                        "saved": [events, evidence]}
+                                                    {"op": "records", "kind": "evidence" or "event", "first": index,
+                                                        "records": [fields, ...]}, as many as it takes
+                                                    {"op": "synced"}, from then on new records come as they're added
+        {"op": "add_event", "id": n, "fields": [start, stop, comments, device]}
+                                                    {"op": "records", ...} to everyone, the sender included
+                                                    {"op": "added", "id": n, "index": i} or
+                                                    {"op": "error", "id": n, "message": "..."}
+                                                    {"op": "saved", "events": n, "evidence": n} once on disk
+        {"op": "add_evidence", "id": n, "fields": [identifier, information, seized, description]}
+                                                    The same as events.
+    Anyone who can reach the port could change the case, so clients have to say hello with the server's `secret`
+        before anything else, or they're turned down and disconnected. Nothing is encrypted, the secret keeps out
+        whoever doesn't have it, not whoever can see the traffic. Servers listen on this computer only unless told
+        otherwise.
+    Records are added from their text fields, the way they're typed in. Records sent back are fields the way
+        `Event.__getstate__` and `Evidence.__getstate__` give them, like in case files.
+    Records are acknowledged as soon as they're in the case, and written to disk in batches, every `FLUSH_INTERVAL`
+        or every `FLUSH_RECORDS` records, whichever comes first. "saved" tells clients what's on disk.
+    Runs on asyncio, a single thread handles every client. Saving happens on a worker thread, like autosaves do.
+    What's sent is held back until the loop has nothing else to do, so records added in the meantime go out together
+        in one message, and every client gets one write instead of one per record. That's what keeps dozens of busy
+        clients from costing a system call each for every record logged.
+    """
+    FLUSH_INTERVAL = 0.5  # Seconds between saves while records are coming in
+    FLUSH_RECORDS = 1000  # Records that trigger a save before the interval is up
+
+    SNAPSHOT_BATCH = 1000  # Records per message when catching a client up
+    MAX_BUFFERED = 64 * 2 ** 20  # Bytes waiting to go to a client before it's given up on as too slow
+
+    def __init__(self, case: Case, host: str = "127.0.0.1", port: int = PORT, secret: str = None):
+        """
+        Initiates a server for a saved case. Nothing happens until `serve` or `start`.
+        :param case: Case to share, with a `save_location`
+        :param host: Address to listen on, "0.0.0.0" for every network the computer is on
+        :param port: Port to listen on, 0 for any free one
+        :param secret: Secret clients have to know to join, a random one if None, see `secret`
+        """
+        if case.save_location is None:
+            raise CaseServerError("Only saved cases can be shared.")
+        if secret == "":
+            raise CaseServerError("The secret can't be empty.")
+
+        self.case = case
+        case.write_through = False  # Saved in batches below, a commit for every record would hold up every client
+        self.host = host
+        self.port = port
+        self.secret = secret or secrets.token_urlsafe(12)  # Handed out to examiners along with the address
+
+        self.clients = set()  # type: {asyncio.StreamWriter}  # Clients that have been caught up
+        self.saved = (len(case.events), len(case.physical_evidence))  # Records on disk
+        self.unsaved = 0  # Records added since the last save
+
+        self._server = None  # type: asyncio.AbstractServer
+        self._loop = None  # type: asyncio.AbstractEventLoop
+        self._flushing = None  # type: asyncio.Task
+        self._flush_wanted = None  # type: asyncio.Event
+
+        self._records = []  # type: [(str, int, list)]  # Kind, first index and fields of records not sent yet
+        self._outgoing = {}  # type: {asyncio.StreamWriter: [bytes]}  # Messages for one client, not sent yet
+        self._sending = False  # Whether `_send_queued` is scheduled
+
+    async def start(self):
+        """
+        Starts listening. `port` is the port listened on once this returns.
+        :return: None
+        """
+        self._loop = asyncio.get_running_loop()
+        self._flush_wanted = asyncio.Event()
+        self._server = await asyncio.start_server(self._client, self.host, self.port, limit=LINE_LIMIT)
+        self.port = self._server.sockets[0].getsockname()[1]
+        self._flushing = asyncio.ensure_future(self._flush_loop())
+
+    async def stop(self):
+        """
+        Stops listening, disconnects every client and saves what hasn't been saved yet, search index included.
+        :return: None
+        """
+        self._server.close()
+        for writer in list(self.clients):
+            writer.close()
+        self.clients.clear()
+        await self._server.wait_closed()
+
+        self._flushing.cancel()
+        try:
+            await self._flushing
+        except asyncio.CancelledError:
+            pass
+
+        await self._flush()
+        await self._loop.run_in_executor(None, self.case.write_search_index)
+
+    async def serve(self, started=None):
+        """
+        Serves until cancelled, by Ctrl+C when run with `asyncio.run`.
+        :param started: Optional callable, called with the server once it's listening
+        :return: None
+        """
+        await self.start()
+        if started is not None:
+            started(self)
+
+        try:
+            await asyncio.Event().wait()  # Forever
+        finally:
+            await self.stop()
+
+    # Clients --------------------------------------------------------------------------------------------------------
+
+    async def _client(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        joined = False
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+
+                try:
+                    message = decode(line)
+                except ValueError as error:
+                    if not joined:
+                        break
+                    self._send(writer, {"op": "error", "message": "Unreadable message, " + str(error)})
+                    continue
+
+                operation = message.get("op")
+                if not joined or operation == "hello":
+                    # Nothing but a hello with the right secret, and only one go at it.
+                    if operation != "hello" or not self._knows_secret(message.get("secret")):
+                        reason = "wrong secret" if operation == "hello" else "say hello with the secret first"
+                        self._write(writer, encode({"op": "error", "id": message.get("id"), "message": reason}))
+                        await writer.drain()
+                        break
+
+                    joined = True
+                    self._welcome(writer)  # Again for a hello after joining, from scratch
+                elif operation in ("add_event", "add_evidence"):
+                    self._add(writer, message)
+                else:
+                    self._send(writer, {"op": "error", "id": message.get("id"),
+                                        "message": "Unknown operation %r." % operation})
+
+                await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError, asyncio.LimitOverrunError, ValueError):
+            pass  # The client is gone or talking nonsense, either way we're done with it
+        finally:
+            self.clients.discard(writer)
+            writer.close()
+
+    def _knows_secret(self, secret) -> bool:
+        if not isinstance(secret, str):
+            return False
+
+        return hmac.compare_digest(secret.encode("utf-8"), self.secret.encode("utf-8"))  # Takes as long either way
+
+    def _welcome(self, writer: asyncio.StreamWriter):
+        """
+        Catches a client up with the whole case and starts sending it new records.
+        Nothing else runs on the loop until this returns, so no record can slip in between.
+        """
+        self._send_queued()  # Records added before this client joined go to the others, it gets them below
+
+        case = self.case
+        lines = [encode({"op": "welcome", "details": {"case_reference": case.case_reference,
+                                                      "lab_reference": case.lab_reference,
+                                                      "investigator": case.investigator},
+                         "events": len(case.events), "evidence": len(case.physical_evidence),
+                         "saved": list(self.saved)})]
+
+        for kind, records in (("evidence", case.physical_evidence), ("event", case.events)):
+            for first in range(0, len(records), self.SNAPSHOT_BATCH):
+                lines.append(encode({"op": "records", "kind": kind, "first": first,
+                                     "records": [record.__getstate__() for record in
+                                                 records[first:first + self.SNAPSHOT_BATCH]]}))
+
+        lines.append(encode({"op": "synced"}))
+        self._write(writer, b"".join(lines))  # Right away, ahead of anything else for it
+        self.clients.add(writer)
+
+    def _add(self, writer: asyncio.StreamWriter, message: dict):
+        """
+        Adds a record to the case for a client, and sends it on to every client.
+        """
+        request = message.get("id")
+        kind = "event" if message["op"] == "add_event" else "evidence"
+
+        try:
+            record = self._record(kind, message.get("fields"))
+        except (CaseServerError, TypeError, ValueError) as error:
+            self._send(writer, {"op": "error", "id": request, "message": str(error)})
+            return
+
+        case = self.case
+        if kind == "event":
+            case.add_event(record)
+            index = len(case.events) - 1
+        else:
+            case.add_evidence(record)
+            index = len(case.physical_evidence) - 1
+
+        # Records go out to everyone before answers, so the sender has the record by the time it hears it was added.
+        self._schedule()
+        if self._records and self._records[-1][0] == kind:
+            self._records[-1][2].append(record.__getstate__())
+        else:
+            self._records.append((kind, index, [record.__getstate__()]))
+        self._send(writer, {"op": "added", "id": request, "index": index})
+
+        self.unsaved += 1
+        self._flush_wanted.set()
+
+    def _record(self, kind: str, fields) -> object:
+        """
+        Makes a record from the fields a client sent, checking it the way the command line does.
+        """
+        if not isinstance(fields, list) or len(fields) != 4 or not all(isinstance(field, str) for field in fields):
+            raise CaseServerError("Records are sent as a list of their four text fields.")
+
+        if kind == "event":
+            event = Event(*fields)
+            if self.case.evidence_index(event.device) is None:
+                raise CaseServerError("No evidence with identifier " + event.device)
+            if "" in (event.start_time, event.stop_time, event.comments):
+                raise CaseServerError("You must fill out all the fields!")
+            require_period(*fields[:2])  # Times kept as text would never turn up in anyone's time queries
+
+            return event
+
+        evidence = Evidence(*fields)
+        if self.case.evidence_index(evidence.unique_identifier) is not None:
+            raise CaseServerError("There is already evidence with identifier " + evidence.unique_identifier)
+        if "" in (evidence.unique_identifier, evidence.additional_information, evidence.seized_date,
+                  evidence.description):
+            raise CaseServerError("You must fill out all the fields!")
+        require_time(fields[2], "seized date")
+
+        return evidence
+
+    def _send(self, writer: asyncio.StreamWriter, message: dict):
+        self._queue(writer, encode(message))
+
+    def _broadcast(self, message: dict):
+        line = encode(message)  # Encoded once for everyone
+        for writer in self.clients:
+            self._queue(writer, line)
+
+    def _queue(self, writer: asyncio.StreamWriter, line: bytes):
+        self._outgoing.setdefault(writer, []).append(line)
+        self._schedule()
+
+    def _schedule(self):
+        if not self._sending:
+            self._sending = True
+            self._loop.call_soon(self._send_queued)
+
+    def _send_queued(self):
+        """
+        Sends new records to every client, then what's waiting for each of them, in one write per client.
+        """
+        self._sending = False
+        records = b"".join(encode({"op": "records", "kind": kind, "first": first, "records": fields})
+                           for kind, first, fields in self._records)
+        self._records = []
+        outgoing, self._outgoing = self._outgoing, {}
+
+        for writer in list(self.clients):
+            data = records + b"".join(outgoing.pop(writer, ()))
+            if data:
+                self._write(writer, data)
+        for writer, lines in outgoing.items():  # Clients that haven't joined yet
+            self._write(writer, b"".join(lines))
+
+    def _write(self, writer: asyncio.StreamWriter, data: bytes):
+        if writer.is_closing():
+            self.clients.discard(writer)
+            return
+
+        writer.write(data)
+        if writer.transport.get_write_buffer_size() > self.MAX_BUFFERED:
+            self.clients.discard(writer)  # Not keeping up, it can connect again and catch up when it's ready
+            writer.close()
+
+    # Saving ---------------------------------------------------------------------------------------------------------
+
+    async def _flush_loop(self):
+        """
+        Saves new records in batches for as long as the server runs.
+        """
+        while True:
+            await self._flush_wanted.wait()
+
+            # Give more records a moment to come in, unless there are plenty already.
+            deadline = self._loop.time() + self.FLUSH_INTERVAL
+            while self.unsaved < self.FLUSH_RECORDS and self._loop.time() < deadline:
+                await asyncio.sleep(min(0.05, max(deadline - self._loop.time(), 0)))
+
+            await self._flush()
+
+    async def _flush(self):
+        self._flush_wanted.clear()
+        if self.unsaved == 0:
+            return
+
+        self.unsaved = 0
+        counts = (len(self.case.events), len(self.case.physical_evidence))
+        try:
+            await self._loop.run_in_executor(None, self.case.save_to_disk)
+        except Exception as error:
+            print("%s Could not save the case, trying again: %s" % (time.strftime("%H:%M:%S"), error))
+            self.unsaved += 1
+            self._flush_wanted.set()
+            await asyncio.sleep(self.FLUSH_INTERVAL)
+            return
+
+        # Records added while saving may or may not have made it, they're saved for sure next time.
+        self.saved = counts
+        self._broadcast({"op": "saved", "events": counts[0], "evidence": counts[1]})
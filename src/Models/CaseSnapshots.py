@@ -0,0 +1,106 @@
+from Models.CaseJournal import CaseJournal
+
+from datetime import datetime
+import os
+import re
+
+
+class CaseSnapshots(object):
+    """
+    The most recent copies of a case, kept by autosave in case the case file itself is lost or damaged.
+
+    Snapshots of a saved case are kept in a folder next to it, named after the case file with ".snapshots" added.
+        A snapshot is a plain copy of the case file, made after it has been saved, and can be opened like any case.
+        Cases kept in a database are copied with SQLite's backup, see `CaseDatabase.copy_to`.
+    Cases that haven't been saved anywhere yet are written to the recovery folder instead, so nothing is lost if the
+        program goes down before the examiner gets around to saving.
+    Snapshots are written to a temporary file, synced to disk and then moved into place, so a snapshot is either
+        whole or not there. Only the `keep` newest are kept.
+    """
+    KEEP = 5
+    EXTENSION = ".digicase"
+
+    RECOVERY_FOLDER = os.path.join(os.path.expanduser("~"), ".digidence", "recovery")
+
+    _unsafe = re.compile(r"[^\w.-]+")
+
+    def __init__(self, folder: str, name: str, keep: int = None):
+        """
+        Initiates snapshots kept in a folder.
+        :param folder: Folder to keep the snapshots in, made when the first snapshot is taken
+        :param name: Snapshots are named this followed by when they were taken
+        :param keep: Number of snapshots to keep, defaults to `KEEP`.
+        """
+        self.folder = folder
+        self.name = name
+        self.keep = keep or self.KEEP
+
+    @classmethod
+    def for_case(cls, case, keep: int = None):
+        """
+        Returns the snapshots of a case, see the class description for where they are.
+        :param case: Case
+        :param keep: See `__init__`
+        :return: CaseSnapshots
+        """
+        if case.save_location is not None:
+            name = os.path.splitext(os.path.basename(case.save_location))[0]
+            return CaseSnapshots(case.save_location + ".snapshots", name, keep)
+
+        name = cls._unsafe.sub("_", case.case_reference or "") or "case"
+        return CaseSnapshots(cls.RECOVERY_FOLDER, name, keep)
+
+    def snapshots(self) -> [str]:
+        """
+        Lists the snapshots, newest first.
+        :return: Locations of the snapshots
+        """
+        prefix = self.name + "-"
+        try:
+            names = [name for name in os.listdir(self.folder)
+                     if name.startswith(prefix) and name.endswith(self.EXTENSION)]
+        except FileNotFoundError:
+            return []
+
+        # Names end in the time they were taken, formatted so they sort in the order they were taken.
+        return [os.path.join(self.folder, name) for name in sorted(names, reverse=True)]
+
+    def take(self, case) -> str:
+        """
+        Takes a snapshot of the case and removes the oldest snapshots past `keep`.
+        A saved case is copied from its file, so save it first. Other cases are written out from memory.
+        :param case: Case to snapshot
+        :return: Location of the snapshot
+        """
+        os.makedirs(self.folder, exist_ok=True)
+
+        location = os.path.join(self.folder, "%s-%s%s" % (self.name, datetime.now().strftime("%Y%m%d-%H%M%S-%f"),
+                                                          self.EXTENSION))
+
+        if case.save_location is not None and os.path.exists(case.save_location):
+            temporary_location = location + ".tmp"
+            try:
+                case.copy_saved(temporary_location)
+            except BaseException:
+                if os.path.exists(temporary_location):
+                    os.remove(temporary_location)
+                raise
+
+            os.replace(temporary_location, location)
+            CaseJournal.sync_folder(location)
+        else:
+            CaseJournal(location).rewrite(case)  # Writes through a synced temporary file as well
+
+        self.rotate()
+        return location
+
+    def rotate(self):
+        """
+        Removes the oldest snapshots past `keep`.
+        :return: None
+        """
+        for location in self.snapshots()[self.keep:]:
+            try:
+                os.remove(location)
+            except FileNotFoundError:
+                pass
@@ -0,0 +1,72 @@
+from Models.Event import Event
+from Models.Evidence import Evidence
+
+import bisect
+
+
+class DeviceIndex(object):
+    """
+    Hash index from evidence unique identifiers to the evidence, and to the events logged on it.
+
+    The index remembers how many records it has seen and only looks at the ones added since when it is updated, so
+        keeping it current costs nothing more than the records that were added.
+    """
+
+    def __init__(self):
+        self.evidence = {}  # type: {str: int}  # Unique identifier to index in `Case.physical_evidence`
+        self.events = {}  # type: {str: [int]}  # Unique identifier to indexes in `Case.events`, in ascending order
+
+        self._indexed_events = 0
+        self._indexed_evidence = 0
+
+    def update(self, case):
+        """
+        Indexes records added to the case since the last update.
+        :param case: Case the index belongs to
+        :return: None
+        """
+        events = case.events
+        if self._indexed_events < len(events):
+            if hasattr(events, "devices"):
+                devices = events.devices(self._indexed_events)  # Straight from a column, see `TimeIndex.update`
+            else:
+                devices = [event.device for event in events[self._indexed_events:]]
+
+            index = self._indexed_events
+            for device in devices:
+                self.events.setdefault(device, []).append(index)
+                index += 1
+
+            self._indexed_events = index
+
+        evidence = case.physical_evidence
+        if self._indexed_evidence < len(evidence):
+            for index in range(self._indexed_evidence, len(evidence)):
+                # First one wins if an identifier has been used twice, it's the one the events were logged against.
+                self.evidence.setdefault(evidence[index].unique_identifier, index)
+
+            self._indexed_evidence = len(evidence)
+
+    def replace_event(self, index: int, old: Event, new: Event):
+        """
+        Moves a replaced event over to its new device, if it has been indexed.
+        :return: None
+        """
+        if index >= self._indexed_events or old.device == new.device:
+            return
+
+        self.events[old.device].remove(index)
+        bisect.insort(self.events.setdefault(new.device, []), index)
+
+    def replace_evidence(self, index: int, old: Evidence, new: Evidence):
+        """
+        Points the new identifier at replaced evidence, if it has been indexed.
+        :return: None
+        """
+        if index >= self._indexed_evidence or old.unique_identifier == new.unique_identifier:
+            return
+
+        if self.evidence.get(old.unique_identifier) == index:
+            del self.evidence[old.unique_identifier]
+
+        self.evidence.setdefault(new.unique_identifier, index)
@@ -1,8 +1,67 @@
+from Models.Timestamp import parse_time, format_time
+
+import sys
+
+
 class Event(object):
     """
     An informational event logged by an investigator.
+
+    Slotted, since big cases hold a lot of these. Times are kept as epochs when they can be, see `Models.Timestamp`,
+        and device identifiers are interned so every event on a device shares the one string.
     """
-    start_time = None  # type: str
-    stop_time = None  # type: str
-    comments = None  # type: str
-    device = None  # type: str
+    __slots__ = ("_start_time", "_stop_time", "comments", "_device")
+
+    def __init__(self, start_time: str = None, stop_time: str = None, comments: str = None, device: str = None):
+        self.start_time = start_time
+        self.stop_time = stop_time
+        self.comments = comments  # type: str
+        self.device = device
+
+    @property
+    def start_time(self) -> str:
+        return format_time(self._start_time)
+
+    @start_time.setter
+    def start_time(self, value: str):
+        self._start_time = parse_time(value)
+
+    @property
+    def stop_time(self) -> str:
+        return format_time(self._stop_time)
+
+    @stop_time.setter
+    def stop_time(self, value: str):
+        self._stop_time = parse_time(value)
+
+    @property
+    def start_epoch(self) -> int:
+        """
+        Start time in seconds since 1970, or None if the start time isn't in the usual format.
+        """
+        return self._start_time if self._start_time.__class__ is int else None
+
+    @property
+    def stop_epoch(self) -> int:
+        """
+        Stop time in seconds since 1970, or None if the stop time isn't in the usual format.
+        """
+        return self._stop_time if self._stop_time.__class__ is int else None
+
+    @property
+    def device(self) -> str:
+        return self._device
+
+    @device.setter
+    def device(self, value: str):
+        self._device = sys.intern(value) if value.__class__ is str else value
+
+    def __getstate__(self):
+        return self._start_time, self._stop_time, self.comments, self._device
+
+    def __setstate__(self, state):
+        if isinstance(state, dict):  # Pickled before events had slots
+            self.__init__(state.get("start_time"), state.get("stop_time"), state.get("comments"), state.get("device"))
+        else:
+            self._start_time, self._stop_time, self.comments, device = state
+            self.device = device
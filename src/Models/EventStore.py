@@ -0,0 +1,138 @@
+from Models.Event import Event
+
+from array import array
+
+
+class EventStore(object):
+    """
+    Column-oriented list of events, for cases with more events than is comfortable to keep as objects.
+
+    Times are kept in arrays of 64-bit epochs and devices as indexes into a table of identifiers, so an event costs
+        little more than its comment. Times that aren't epochs (see `Models.Timestamp`) are kept to the side.
+    Behaves like a list of `Event`s. Reading an item makes a new `Event` from the columns, so changes to that event
+        have to be stored back with `store[index] = event`, `Case.replace_event` does that for you.
+    """
+    _NOT_EPOCH = -2 ** 63  # Marks a time that is kept in the side table instead
+
+    def __init__(self, events=()):
+        """
+        Initiates the store, optionally filled with the given events.
+        :param events: Events to store
+        """
+        self._start_times = array("q")
+        self._stop_times = array("q")
+        self._comments = []  # type: [str]
+        self._devices = array("I")
+
+        self._other_start_times = {}  # type: {int: str}
+        self._other_stop_times = {}  # type: {int: str}
+
+        self._device_table = [None]  # type: [str]
+        self._device_numbers = {None: 0}  # type: {str: int}
+
+        self.extend(events)
+
+    def __len__(self) -> int:
+        return len(self._comments)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self._event(i) for i in range(*index.indices(len(self._comments)))]
+
+        if index < 0:
+            index += len(self._comments)
+        if not 0 <= index < len(self._comments):
+            raise IndexError("event index out of range")
+
+        return self._event(index)
+
+    def __setitem__(self, index: int, event: Event):
+        if index < 0:
+            index += len(self._comments)
+        if not 0 <= index < len(self._comments):
+            raise IndexError("event index out of range")
+
+        self._start_times[index] = self._time_column_value(self._other_start_times, index, event._start_time)
+        self._stop_times[index] = self._time_column_value(self._other_stop_times, index, event._stop_time)
+        self._comments[index] = event.comments
+        self._devices[index] = self._device_number(event.device)
+
+    def __iter__(self):
+        for index in range(len(self._comments)):
+            yield self._event(index)
+
+    def __iadd__(self, events):
+        self.extend(events)
+        return self
+
+    def append(self, event: Event):
+        """
+        Adds an event to the end of the store.
+        :param event: Event to add
+        :return: None
+        """
+        index = len(self._comments)
+
+        self._start_times.append(self._time_column_value(self._other_start_times, index, event._start_time))
+        self._stop_times.append(self._time_column_value(self._other_stop_times, index, event._stop_time))
+        self._devices.append(self._device_number(event.device))
+        self._comments.append(event.comments)  # Last, the length of this column is the length of the store.
+
+    def extend(self, events):
+        for event in events:
+            self.append(event)
+
+    def timings(self, start: int = 0) -> [(int, int, str)]:
+        """
+        Start epoch, stop epoch and device of every event in order, without making `Event`s.
+        Epochs are None for times that aren't epochs, like `Event.start_epoch`.
+        :param start: Index of the first event to include
+        :return: List of tuples
+        """
+        not_epoch = self._NOT_EPOCH
+        table = self._device_table
+
+        return [(start_time if start_time != not_epoch else None, stop_time if stop_time != not_epoch else None,
+                 table[device]) for start_time, stop_time, device in zip(self._start_times[start:],
+                                                                         self._stop_times[start:],
+                                                                         self._devices[start:])]
+
+    def devices(self, start: int = 0) -> [str]:
+        """
+        Device identifiers of every event in order, without making `Event`s.
+        :param start: Index of the first event to include
+        :return: List of identifiers
+        """
+        table = self._device_table
+        return [table[number] for number in self._devices[start:]]
+
+    # Helpers --------------------------------------------------------------------------------------------------------
+
+    def _event(self, index: int) -> Event:
+        event = Event.__new__(Event)  # Skips parsing, the columns already hold parsed values.
+
+        start_time = self._start_times[index]
+        event._start_time = start_time if start_time != self._NOT_EPOCH else self._other_start_times[index]
+        stop_time = self._stop_times[index]
+        event._stop_time = stop_time if stop_time != self._NOT_EPOCH else self._other_stop_times[index]
+
+        event.comments = self._comments[index]
+        event._device = self._device_table[self._devices[index]]
+
+        return event
+
+    def _time_column_value(self, others: dict, index: int, value) -> int:
+        if value.__class__ is int:
+            others.pop(index, None)
+            return value
+
+        others[index] = value
+        return self._NOT_EPOCH
+
+    def _device_number(self, device: str) -> int:
+        number = self._device_numbers.get(device)
+        if number is None:
+            number = self._device_numbers[device] = len(self._device_table)
+            self._device_table.append(device)
+
+        return number
@@ -1,8 +1,78 @@
+from Models.EvidenceImage import EvidenceImage
+from Models.Timestamp import parse_time, format_time
+
+import sys
+
+
 class Evidence(object):
     """
     Physical evidence seized or accepted by an investigator.
+    Slotted like `Event`, with the seized date kept as an epoch when it can be.
+    Images acquired from the evidence are kept in `images`, see `EvidenceImage`. Evidence without images has the same
+        state as before they could be attached, so it's stored and hashed into the ledger the same way.
     """
-    unique_identifier = None  # type: str
-    additional_information = None  # type: str
-    seized_date = None  # type: str
-    description = None  # type: str
+    __slots__ = ("_unique_identifier", "additional_information", "_seized_date", "description", "images")
+
+    def __init__(self, unique_identifier: str = None, additional_information: str = None, seized_date: str = None,
+                 description: str = None, images: [EvidenceImage] = None):
+        self.unique_identifier = unique_identifier
+        self.additional_information = additional_information  # type: str
+        self.seized_date = seized_date
+        self.description = description  # type: str
+        self.images = list(images) if images else []  # type: [EvidenceImage]
+
+    @property
+    def unique_identifier(self) -> str:
+        return self._unique_identifier
+
+    @unique_identifier.setter
+    def unique_identifier(self, value: str):
+        # Interned so it is the same string object as the `device` of every event logged on this evidence.
+        self._unique_identifier = sys.intern(value) if value.__class__ is str else value
+
+    @property
+    def seized_date(self) -> str:
+        return format_time(self._seized_date)
+
+    @seized_date.setter
+    def seized_date(self, value: str):
+        self._seized_date = parse_time(value)
+
+    @property
+    def seized_epoch(self) -> int:
+        """
+        Seized date in seconds since 1970, or None if the date isn't in the usual format.
+        """
+        return self._seized_date if self._seized_date.__class__ is int else None
+
+    def with_images(self, images: [EvidenceImage]):
+        """
+        A copy of this evidence with the given images instead, for `Case.replace_evidence`.
+        :param images: Images of the copy
+        :return: Evidence
+        """
+        evidence = Evidence.__new__(Evidence)
+        evidence.__setstate__(self.__getstate__()[:4])
+        evidence.images = list(images)
+        return evidence
+
+    def __getstate__(self):
+        state = self._unique_identifier, self.additional_information, self._seized_date, self.description
+        if self.images:
+            state += (tuple(image.__getstate__() for image in self.images),)
+
+        return state
+
+    def __setstate__(self, state):
+        if isinstance(state, dict):  # Pickled before evidence had slots
+            self.__init__(state.get("unique_identifier"), state.get("additional_information"),
+                          state.get("seized_date"), state.get("description"))
+        else:
+            unique_identifier, self.additional_information, self._seized_date, self.description = state[:4]
+            self.unique_identifier = unique_identifier
+            self.images = []
+
+            for fields in (state[4] if len(state) > 4 else None) or ():
+                image = EvidenceImage.__new__(EvidenceImage)
+                image.__setstate__(fields)
+                self.images.append(image)
@@ -0,0 +1,57 @@
+import os
+
+
+class EvidenceImage(object):
+    """
+    Forensic image acquired from a piece of evidence, like an E01 or dd file, along with the digests of its contents.
+    Only the location of the image goes into the case, images are far too big to copy around. The size and modification
+        time the file had when it was hashed tell whether it can have changed since, see `ImageHasher.verify`.
+    Slotted like `Evidence`, which keeps a list of them.
+    """
+    __slots__ = ("location", "size", "modified", "md5", "sha1", "sha256", "hashed")
+
+    ALGORITHMS = ("md5", "sha1", "sha256")
+
+    def __init__(self, location: str = None, size: int = None, modified: int = None, md5: str = None,
+                 sha1: str = None, sha256: str = None, hashed: int = None):
+        """
+        Initiates an image.
+        :param location: Absolute location of the image file
+        :param size: Size of the file in bytes when it was hashed
+        :param modified: Modification time of the file in nanoseconds since 1970 when it was hashed
+        :param md5: Hex digests of the contents
+        :param sha1:
+        :param sha256:
+        :param hashed: Seconds since 1970 at which the file was hashed
+        """
+        self.location = location  # type: str
+        self.size = size  # type: int
+        self.modified = modified  # type: int
+        self.md5 = md5  # type: str
+        self.sha1 = sha1  # type: str
+        self.sha256 = sha256  # type: str
+        self.hashed = hashed  # type: int
+
+    @property
+    def name(self) -> str:
+        return os.path.basename(self.location or "")
+
+    def digests(self) -> dict:
+        """
+        The digests by algorithm name, see `ALGORITHMS`.
+        """
+        return {"md5": self.md5, "sha1": self.sha1, "sha256": self.sha256}
+
+    def matches(self, status: os.stat_result) -> bool:
+        """
+        Whether a file still has the size and modification time it had when it was hashed.
+        :param status: Result of `os.stat` on the file
+        :return: True if neither has changed
+        """
+        return status.st_size == self.size and status.st_mtime_ns == self.modified
+
+    def __getstate__(self):
+        return self.location, self.size, self.modified, self.md5, self.sha1, self.sha256, self.hashed
+
+    def __setstate__(self, state):
+        self.location, self.size, self.modified, self.md5, self.sha1, self.sha256, self.hashed = state
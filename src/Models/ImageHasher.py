@@ -0,0 +1,184 @@
+from Models.CaseCatalog import CatalogError
+from Models.EvidenceImage import EvidenceImage
+
+from concurrent.futures import ThreadPoolExecutor
+import hashlib
+import os
+import sqlite3
+import time
+
+
+class ImageHasher(object):
+    """
+    Works out the MD5, SHA-1 and SHA-256 of evidence images, reading each file once.
+
+    Files are read in big chunks into two buffers that take turns: while the next chunk is read into one, the three
+        digests of the other are worked out on threads of their own. hashlib lets go of the interpreter lock for big
+        buffers, so reading and the three digests all happen at once, and an image takes about as long as the slowest
+        of them, usually the disk or SHA-256, instead of all of them added up.
+    Digests are remembered by location, size and modification time (see `CaseCatalog.cached_digests`), so a file
+        that hasn't changed since it was last hashed isn't read again.
+    Hashing takes a progress callback like `CaseReport.build` does, returning False from it stops hashing.
+    """
+    CHUNK_SIZE = 16 * 2 ** 20  # Bytes read at a time, two chunks are in memory at once
+
+    def __init__(self, cache=None, chunk_size: int = None):
+        """
+        Initiates a hasher.
+        :param cache: `CaseCatalog` to remember digests in, or None to always read the files
+        :param chunk_size: Bytes to read at a time, defaults to `CHUNK_SIZE`
+        """
+        self.cache = cache
+        self.chunk_size = chunk_size or self.CHUNK_SIZE
+
+    def hash_files(self, locations: [str], progress=None) -> [EvidenceImage]:
+        """
+        Hashes image files, one after the other.
+        :param locations: Locations of the files
+        :param progress: Optional callable taking bytes done and bytes in total, see `ImageHasher`
+        :return: An image per file, in order, or None if cancelled
+        """
+        locations = [os.path.abspath(location) for location in locations]
+        statuses = [os.stat(location) for location in locations]
+        total = sum(status.st_size for status in statuses)
+
+        images = []
+        done = 0
+        for location, status in zip(locations, statuses):
+            image = self.hash_file(location, status, progress, done, total)
+            if image is None:
+                return None
+
+            images.append(image)
+            done += status.st_size
+
+        if progress is not None and progress(total, total) is False:
+            return None
+
+        return images
+
+    def hash_file(self, location: str, status: os.stat_result = None, progress=None, done: int = 0,
+                  total: int = None, cached: bool = True) -> EvidenceImage:
+        """
+        Hashes an image file.
+        :param location: Location of the file
+        :param status: `os.stat` of the file, if already known
+        :param progress: See `hash_files`
+        :param done: Bytes done before this file, for progress
+        :param total: Bytes in total, for progress, defaults to the size of this file
+        :param cached: Whether digests remembered from earlier may be used
+        :return: Image, or None if cancelled
+        """
+        location = os.path.abspath(location)
+        status = status or os.stat(location)
+        total = status.st_size if total is None else total
+
+        digests = self._cached(location, status) if cached else None
+        if digests is None:
+            digests = self._read(location, progress, done, total)
+            if digests is None:
+                return None
+
+            if os.stat(location).st_mtime_ns != status.st_mtime_ns:
+                raise OSError("%s changed while it was being hashed." % location)
+            self._remember(location, status, digests)
+
+        return EvidenceImage(location, status.st_size, status.st_mtime_ns, digests["md5"], digests["sha1"],
+                             digests["sha256"], int(time.time()))
+
+    def verify(self, images: [EvidenceImage], full: bool = False, progress=None) -> [str]:
+        """
+        Checks that images still have the digests they had when they were attached.
+        Files with the same size and modification time as then are taken to be unchanged and aren't read, unless
+            asked to.
+        :param images: Images to check
+        :param full: Read every file again
+        :param progress: See `hash_files`
+        :return: Descriptions of what's wrong, empty if nothing is, or None if cancelled.
+        """
+        problems = []
+        checks = []
+        for image in images:
+            try:
+                status = os.stat(image.location)
+            except OSError as error:
+                problems.append("%s can't be read: %s" % (image.location, error.strerror or error))
+                continue
+
+            if full or not image.matches(status):
+                checks.append((image, status))
+
+        total = sum(status.st_size for _, status in checks)
+        done = 0
+        for image, status in checks:
+            try:
+                hashed = self.hash_file(image.location, status, progress, done, total, cached=False)
+            except OSError as error:
+                problems.append("%s can't be read: %s" % (image.location, error.strerror or error))
+                continue
+
+            if hashed is None:
+                return None
+
+            if hashed.digests() != image.digests():
+                problems.append("%s doesn't match its digests, it has changed since it was attached." % image.location)
+            done += status.st_size
+
+        return problems
+
+    # Helpers --------------------------------------------------------------------------------------------------------
+
+    def _read(self, location: str, progress, done: int, total: int) -> dict:
+        """
+        Reads a file once, working out every digest along the way.
+        :return: Hex digests by algorithm name, or None if cancelled
+        """
+        digests = [hashlib.new(name) for name in EvidenceImage.ALGORITHMS]
+        buffers = [bytearray(self.chunk_size), bytearray(self.chunk_size)]
+        views = [memoryview(buffer) for buffer in buffers]
+        turn = 0
+        pending = []  # Digest updates of the chunk before, still running
+
+        with ThreadPoolExecutor(len(digests), thread_name_prefix="ImageHasher") as pool, \
+                open(location, "rb", buffering=0) as file:
+            try:
+                while True:
+                    length = file.readinto(buffers[turn])
+                    for update in pending:
+                        update.result()
+                    pending = []
+
+                    if not length:
+                        break
+
+                    chunk = views[turn][:length]
+                    pending = [pool.submit(digest.update, chunk) for digest in digests]
+                    turn = 1 - turn
+
+                    done += length
+                    if progress is not None and progress(done, total) is False:
+                        return None
+            finally:
+                for update in pending:
+                    update.result()  # They're still reading from the buffers
+
+        return {name: digest.hexdigest() for name, digest in zip(EvidenceImage.ALGORITHMS, digests)}
+
+    def _cached(self, location: str, status: os.stat_result) -> dict:
+        if self.cache is None:
+            return None
+
+        try:
+            return self.cache.cached_digests(location, status.st_size, status.st_mtime_ns)
+        except (CatalogError, sqlite3.Error, OSError) as error:
+            print("Could not read remembered digests, hashing again: " + str(error))
+            return None
+
+    def _remember(self, location: str, status: os.stat_result, digests: dict):
+        if self.cache is None:
+            return
+
+        try:
+            self.cache.remember_digests(location, status.st_size, status.st_mtime_ns, digests)
+        except (CatalogError, sqlite3.Error, OSError) as error:
+            print("Could not remember digests: " + str(error))
@@ -0,0 +1,235 @@
+from collections import OrderedDict
+import json
+import mmap
+import threading
+import zlib
+
+# zstd packs case files tighter and unpacks them quicker than zlib, but it's optional. Cases written with it can only
+# be opened where it is installed.
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+
+class MappedFile(object):
+    """
+    Read-only memory map of the start of a case file, with the compression its blocks are stored with.
+    Reading a block only pages in that block, the operating system takes care of the rest.
+    """
+    NONE = 0
+    ZLIB = 1
+    ZSTD = 2
+
+    def __init__(self, location: str, length: int, compression: int):
+        """
+        Maps the first `length` bytes of the file at the given location.
+        :param location: Location on disk
+        :param length: Bytes to map, what's after is left alone, so appending to the file is fine.
+        :param compression: `NONE`, `ZLIB` or `ZSTD`
+        """
+        self.compression = compression
+        self.lock = threading.RLock()  # Cases are read from the interface and saved on worker threads at once
+
+        with open(location, "rb") as file:
+            self._data = mmap.mmap(file.fileno(), length, access=mmap.ACCESS_READ) if length else b""
+
+    def read(self, offset: int, length: int) -> bytes:
+        """
+        Reads and decompresses a block.
+        :param offset: Offset of the block in the file
+        :param length: Stored length of the block
+        :return: Decompressed block
+        """
+        return self.decompress(self.compression, self._data[offset:offset + length])
+
+    def raw(self, offset: int, length: int) -> bytes:
+        """
+        Reads a block as stored, for copying it to another file as is.
+        """
+        return self._data[offset:offset + length]
+
+    def detach(self):
+        """
+        Reads the whole mapped part of the file into memory and lets go of the file.
+        Windows won't replace a file that is mapped, so this has to happen before a case is rewritten there.
+        :return: None
+        """
+        with self.lock:
+            if isinstance(self._data, mmap.mmap):
+                data = self._data[:]
+                self._data.close()
+                self._data = data
+
+    @staticmethod
+    def compress(compression: int, data: bytes) -> bytes:
+        if compression == MappedFile.ZLIB:
+            return zlib.compress(data, 1)  # The lowest level gets most of the way there in a fraction of the time
+        if compression == MappedFile.ZSTD:
+            return zstandard.ZstdCompressor().compress(data)
+
+        return data
+
+    @staticmethod
+    def decompress(compression: int, data: bytes) -> bytes:
+        if compression == MappedFile.ZLIB:
+            return zlib.decompress(data)
+        if compression == MappedFile.ZSTD:
+            return zstandard.ZstdDecompressor().decompress(data)
+
+        return bytes(data)
+
+
+class LazyRecords(object):
+    """
+    List of records read from a case file as they're needed, so opening a case doesn't mean reading all of it.
+
+    The records are stored in blocks of `block_size` records, each block a JSON list of records (see `CaseJournal`),
+        compressed on its own. Reading a record reads its whole block and keeps the records of the last few blocks
+        read around, so scrolling through a list only reads each block once.
+    Behaves like a list, like `EventStore`. Reading an item may give a new object every time, so changes have to be
+        stored back with `records[index] = record`, `Case.replace_event` and `Case.replace_evidence` do that for you.
+        Records stored back and records appended are kept in memory.
+    """
+    CACHED_BLOCKS = 32
+
+    def __init__(self, source: MappedFile, blocks: [(int, int)], block_size: int, count: int, make_record):
+        """
+        Initiates a list over blocks of a file.
+        :param source: File the blocks are in
+        :param blocks: Offset and stored length of each block, in order
+        :param block_size: Records in every block but the last
+        :param count: Records in all blocks together
+        :param make_record: Callable making a record from its fields
+        """
+        self.source = source
+        self.blocks = blocks
+        self.block_size = block_size
+        self.stored_count = count
+        self.make_record = make_record
+
+        self._changed = {}  # type: {int: object}  # Stored records that have been replaced, by index
+        self._changed_blocks = set()  # Blocks holding replaced records, they can't be copied as is
+        self._appended = []  # Records past the stored ones
+
+        self._cache = OrderedDict()  # Block number to records, least recently used first
+
+    def __len__(self) -> int:
+        return self.stored_count + len(self._appended)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            start, stop, step = index.indices(len(self))
+            if step != 1:
+                return [self[i] for i in range(start, stop, step)]
+
+            return list(self._range(start, stop))
+
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("record index out of range")
+
+        if index >= self.stored_count:
+            return self._appended[index - self.stored_count]
+
+        record = self._changed.get(index)
+        if record is not None:
+            return record
+
+        return self._block(index // self.block_size)[index % self.block_size]
+
+    def __setitem__(self, index: int, record):
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("record index out of range")
+
+        if index >= self.stored_count:
+            self._appended[index - self.stored_count] = record
+        else:
+            with self.source.lock:
+                self._changed[index] = record
+                self._changed_blocks.add(index // self.block_size)
+
+    def __iter__(self):
+        return self._range(0, len(self))
+
+    def __iadd__(self, records):
+        self.extend(records)
+        return self
+
+    def append(self, record):
+        self._appended.append(record)
+
+    def extend(self, records):
+        self._appended.extend(records)
+
+    def raw_block(self, number: int, block_size: int, count: int, compression: int) -> bytes:
+        """
+        A stored block as it is in the file, for writing to another file without reading it, if that's possible.
+        :param number: Block number
+        :param block_size: Block size of the other file
+        :param count: Records going into the other file
+        :param compression: Compression of the other file
+        :return: The stored block, or None if it has to be written out from its records.
+        """
+        if number >= len(self.blocks) or block_size != self.block_size or compression != self.source.compression:
+            return None
+
+        end = (number + 1) * block_size
+        if min(count, end) != min(self.stored_count, end):
+            return None  # The other file has more records in this block, the last stored one wasn't full.
+
+        with self.source.lock:
+            if number in self._changed_blocks:
+                return None
+
+            offset, length = self.blocks[number]
+            return self.source.raw(offset, length)
+
+    # Helpers --------------------------------------------------------------------------------------------------------
+
+    def _range(self, start: int, stop: int):
+        """
+        Goes through records a block at a time, much quicker than looking them up one by one.
+        """
+        index = start
+        stored_stop = min(stop, self.stored_count)
+        while index < stored_stop:
+            number = index // self.block_size
+            block = self._block(number)
+            first = number * self.block_size
+            for position in range(index - first, min(stored_stop - first, len(block))):
+                record = self._changed.get(first + position)
+                yield record if record is not None else block[position]
+            index = first + len(block)
+
+        for index in range(max(start, self.stored_count), stop):
+            yield self._appended[index - self.stored_count]
+
+    def _block(self, number: int) -> list:
+        with self.source.lock:
+            records = self._cache.get(number)
+            if records is not None:
+                self._cache.move_to_end(number)
+                return records
+
+            make_record = self.make_record
+            records = [make_record(fields) for fields in self._read_block(number)]
+            if len(records) != min(self.block_size, self.stored_count - number * self.block_size):
+                raise ValueError("Block %d holds the wrong number of records." % number)
+
+            self._cache[number] = records
+            if len(self._cache) > self.CACHED_BLOCKS:
+                self._cache.popitem(last=False)
+
+            return records
+
+    def _read_block(self, number: int) -> list:
+        """
+        Reads the fields of every record in a block. Called with the source locked.
+        :return: List of lists of fields
+        """
+        offset, length = self.blocks[number]
+        return json.loads(self.source.read(offset, length).decode("utf-8"))
@@ -0,0 +1,282 @@
+from Models.Event import Event
+from Models.Evidence import Evidence
+
+from array import array
+import hashlib
+import json
+import struct
+import sys
+import threading
+
+
+class Ledger(object):
+    """
+    Hash chain over every record logged in a case, to show that none of them have been changed behind our back.
+
+    Every record is hashed once, when it is added or replaced, and an entry with the record's kind, index and hash is
+        appended to the ledger. Each entry is chained to the one before it: the head of the chain is the hash of the
+        previous head and the entry. Changing or removing any entry changes every head after it, so a head written
+        down somewhere else, like in the case notes or on a printed report, vouches for everything up to it.
+    Checking the records against the ledger only hashes records added since the last check (see `verify`), and
+        adding to it costs one hash per record, however big the case is.
+    Saved as part of the case journal, see `CaseJournal`.
+    """
+    EVENT = 1
+    EVIDENCE = 2
+
+    EMPTY_HEAD = bytes(32)
+
+    _entry = struct.Struct("<BI")
+
+    def __init__(self):
+        self._kinds = array("B")
+        self._indexes = array("I")
+        self._digests = bytearray()  # 32 bytes per entry
+
+        self._event_entries = array("I")  # Latest entry per event index
+        self._evidence_entries = array("I")  # Latest entry per evidence index
+
+        self.head = self.EMPTY_HEAD  # Head of the chain after the last entry
+        self.problems = []  # type: [str]  # Found while loading entries, see `load_entry`
+
+        self._verified_events = 0  # Records checked against the ledger so far, see `verify`
+        self._verified_evidence = 0
+
+        self._stored_head = None  # Head loaded with `load_columns`, checked against the chain by the next `verify`
+        self._lock = threading.Lock()  # Keeps the head in step with the entries for `snapshot`
+
+    def __len__(self) -> int:
+        return len(self._kinds)
+
+    @staticmethod
+    def event_hash(event: Event) -> bytes:
+        return hashlib.sha256(json.dumps(["event", event.start_time, event.stop_time, event.comments, event.device],
+                                         ensure_ascii=False, separators=(",", ":")).encode("utf-8")).digest()
+
+    @staticmethod
+    def evidence_hash(evidence: Evidence) -> bytes:
+        fields = ["evidence", evidence.unique_identifier, evidence.seized_date, evidence.description,
+                  evidence.additional_information]
+        if evidence.images:  # Left out when there are none, so evidence logged before images hashes the same
+            fields.append([image.__getstate__() for image in evidence.images])
+
+        return hashlib.sha256(json.dumps(fields, ensure_ascii=False, separators=(",", ":")).encode("utf-8")).digest()
+
+    def head_hex(self) -> str:
+        return self.head.hex()
+
+    def update(self, case):
+        """
+        Adds entries for records added to the case since the last update.
+        :param case: Case the ledger belongs to
+        :return: None
+        """
+        events = case.events
+        first = len(self._event_entries)
+        if first < len(events):
+            for index, event in enumerate(events[first:], first):
+                self._append(self.EVENT, index, self.event_hash(event))
+
+        evidence = case.physical_evidence
+        for index in range(len(self._evidence_entries), len(evidence)):
+            self._append(self.EVIDENCE, index, self.evidence_hash(evidence[index]))
+
+    def replace_event(self, index: int, event: Event):
+        """
+        Adds an entry for a replaced event. The earlier entries for it stay in the ledger, it's a history.
+        :return: None
+        """
+        if index < len(self._event_entries):
+            self._append(self.EVENT, index, self.event_hash(event))
+
+    def replace_evidence(self, index: int, evidence: Evidence):
+        """
+        Adds an entry for replaced evidence, see `replace_event`.
+        :return: None
+        """
+        if index < len(self._evidence_entries):
+            self._append(self.EVIDENCE, index, self.evidence_hash(evidence))
+
+    def verify(self, case, full: bool = False) -> [str]:
+        """
+        Checks the records of a case against the ledger.
+        Records that have already passed a check aren't hashed again unless asked to, only new ones are.
+        :param case: Case the ledger belongs to
+        :param full: Check every record, not just the ones that haven't been checked yet.
+        :return: Descriptions of what's wrong, empty if nothing is.
+        """
+        problems = list(self.problems)
+
+        if self._stored_head is not None:
+            stored_count, stored_head = self._stored_head
+            head = self.EMPTY_HEAD
+            for _, _, _, head in self.entries(0, stored_count, head):
+                pass
+            if head != stored_head:
+                problems.append("The first %d ledger entries don't add up to the head stored with them." % stored_count)
+
+        events = case.events
+        event_entries = self._event_entries
+        first = 0 if full else self._verified_events
+        for index, event in enumerate(events[first:], first):
+            if index >= len(event_entries):
+                problems.append("Event %d isn't in the ledger." % (index + 1))
+            elif self.event_hash(event) != self._digest(event_entries[index]):
+                problems.append("Event %d has been changed since it was logged." % (index + 1))
+        if len(event_entries) > len(events):
+            problems.append("%d logged events are missing." % (len(event_entries) - len(events)))
+
+        evidence = case.physical_evidence
+        evidence_entries = self._evidence_entries
+        first = 0 if full else self._verified_evidence
+        for index in range(first, len(evidence)):
+            if index >= len(evidence_entries):
+                problems.append("Evidence %d isn't in the ledger." % (index + 1))
+            elif self.evidence_hash(evidence[index]) != self._digest(evidence_entries[index]):
+                problems.append("Evidence %d has been changed since it was logged." % (index + 1))
+        if len(evidence_entries) > len(evidence):
+            problems.append("%d pieces of logged evidence are missing." % (len(evidence_entries) - len(evidence)))
+
+        if not problems:
+            self._stored_head = None
+            self._verified_events = len(events)
+            self._verified_evidence = len(evidence)
+
+        return problems
+
+    def passed_through(self, head: bytes) -> bool:
+        """
+        Tells whether the chain has had the given head at some point, meaning nothing logged before then has been
+            changed or taken out of the ledger since.
+        :param head: Head of the chain at some earlier point
+        :return: bool
+        """
+        if head == self.EMPTY_HEAD:
+            return True
+
+        return any(entry_head == head for _, _, _, entry_head in self.entries(0, len(self), self.EMPTY_HEAD))
+
+    def snapshot(self) -> (int, bytes):
+        """
+        The number of entries and the head of the chain after them, taken together.
+        :return: Count and head
+        """
+        with self._lock:
+            return len(self._kinds), self.head
+
+    # Reading and writing --------------------------------------------------------------------------------------------
+
+    def entries(self, start: int, stop: int, head: bytes):
+        """
+        Goes through entries for writing them out, with the head of the chain after each.
+        :param start: First entry
+        :param stop: Entry to stop before
+        :param head: Head of the chain before the first entry
+        :return: Generator of kind, index, hash and head
+        """
+        for position in range(start, stop):
+            kind, index, digest = self._kinds[position], self._indexes[position], self._digest(position)
+            head = self._chain(head, kind, index, digest)
+            yield kind, index, digest, head
+
+    def load_entry(self, kind: int, index: int, digest: bytes, head: bytes):
+        """
+        Adds an entry read back from disk. Entries that don't follow on from the ones before are noted in `problems`,
+            as are records logged without an entry.
+        :param kind: `EVENT` or `EVIDENCE`
+        :param index: Index of the record
+        :param digest: Hash of the record
+        :param head: Head of the chain after the entry, as it was written
+        :return: None
+        """
+        entries = self._event_entries if kind == self.EVENT else self._evidence_entries
+        if index > len(entries):
+            self.problems.append("Ledger entry %d skips over records." % (len(self) + 1))
+
+        self._append(kind, index, digest)
+        if head != self.head:
+            self.problems.append("Ledger entry %d doesn't follow on from the one before it." % len(self))
+            self.head = head  # Carry on from what was written, so one bad entry isn't reported for every later one
+
+    def rows(self, start: int, stop: int):
+        """
+        Goes through entries as they are, without working out the chain. See `entries`.
+        :return: Generator of position, kind, index and hash
+        """
+        for position in range(start, stop):
+            yield position, self._kinds[position], self._indexes[position], self._digest(position)
+
+    def columns(self, count: int) -> (bytes, bytes, bytes):
+        """
+        The first entries as three blocks of bytes, for storing them in one go. See `load_columns`.
+        :param count: Number of entries
+        :return: Kinds (1 byte each), indexes (4 byte little-endian each) and hashes (32 bytes each)
+        """
+        indexes = self._indexes[:count]
+        if sys.byteorder == "big":
+            indexes.byteswap()
+
+        return self._kinds[:count].tobytes(), indexes.tobytes(), bytes(self._digests[:count * 32])
+
+    def load_columns(self, kinds: bytes, indexes: bytes, digests: bytes, head: bytes):
+        """
+        Adds entries stored with `columns`, to an empty ledger.
+        Working out the chain means hashing every entry, so that's left for the next `verify`, which reports it if the
+            entries don't add up to the given head.
+        :param head: Head of the chain after the entries
+        :return: None
+        """
+        loaded = array("I")
+        loaded.frombytes(indexes)
+        if sys.byteorder == "big":
+            loaded.byteswap()
+
+        self._kinds.frombytes(kinds)
+        self._indexes.extend(loaded)
+        self._digests += digests
+        if not len(self._kinds) == len(self._indexes) == len(self._digests) // 32:
+            raise ValueError("Ledger columns don't line up.")
+
+        event_entries, evidence_entries = self._event_entries, self._evidence_entries
+        for position, (kind, index) in enumerate(zip(self._kinds, loaded)):
+            entries = event_entries if kind == self.EVENT else evidence_entries
+            if index < len(entries):
+                entries[index] = position
+            elif index == len(entries):
+                entries.append(position)
+            else:
+                self.problems.append("Ledger entry %d skips over records." % (position + 1))
+                self._place(entries, index, position)
+
+        self.head = head
+        self._stored_head = len(self._kinds), head
+
+    # Helpers --------------------------------------------------------------------------------------------------------
+
+    def _append(self, kind: int, index: int, digest: bytes):
+        head = self._chain(self.head, kind, index, digest)
+
+        with self._lock:
+            position = len(self._kinds)
+
+            self._kinds.append(kind)
+            self._indexes.append(index)
+            self._digests += digest
+            self._place(self._event_entries if kind == self.EVENT else self._evidence_entries, index, position)
+
+            self.head = head
+
+    @staticmethod
+    def _place(entries: array, index: int, position: int):
+        if index < len(entries):
+            entries[index] = position
+        else:
+            while len(entries) < index:
+                entries.append(position)  # Only after a skip, already noted by `load_entry` or `load_columns`
+            entries.append(position)
+
+    def _digest(self, position: int) -> bytes:
+        return bytes(self._digests[position * 32:position * 32 + 32])
+
+    def _chain(self, head: bytes, kind: int, index: int, digest: bytes) -> bytes:
+        return hashlib.sha256(head + self._entry.pack(kind, index) + digest).digest()
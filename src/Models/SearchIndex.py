@@ -0,0 +1,297 @@
+from Models.Event import Event
+from Models.Evidence import Evidence
+
+from array import array
+import base64
+import bisect
+import json
+import os
+import re
+import sys
+import threading
+
+
+class SearchIndex(object):
+    """
+    Inverted index over event comments and evidence descriptions and additional information.
+
+    Every word maps to the sorted indexes of the records it appears in. A search matches records containing every word
+        of the query, where each word may be the start of a longer word, so "encrypt key" finds "Encryption keys".
+    Like the other indexes it only looks at records added since the last update. It's stored along with the case and
+        read back when the case is opened, so it doesn't have to be built again: next to case files (see `write`), and
+        in case databases (see `CaseDatabase.write_search_index`).
+    Records are added from the window or server thread while saves write the index on a worker thread, so everything
+        that touches the postings holds `_lock`.
+    """
+    VERSION = 1
+
+    _word = re.compile(r"\w+")
+
+    def __init__(self):
+        self._event_postings = {}  # type: {str: array}
+        self._evidence_postings = {}  # type: {str: array}
+
+        self._words = []  # type: [str]  # Every word in either postings, sorted, for prefix lookups
+        self._words_sorted = True
+
+        self._indexed_events = 0
+        self._indexed_evidence = 0
+
+        self.changed = False  # Whether the index has changed since it was read or written
+        self._lock = threading.Lock()
+
+    @classmethod
+    def words(cls, text: str) -> {str}:
+        """
+        Splits text into the lower case words the index uses.
+        :param text: Text to split
+        :return: Set of words
+        """
+        return set(cls._word.findall(text.lower())) if text else set()
+
+    @staticmethod
+    def event_words(event: Event) -> {str}:
+        return SearchIndex.words(event.comments)
+
+    @staticmethod
+    def evidence_words(evidence: Evidence) -> {str}:
+        return SearchIndex.words(evidence.description) | SearchIndex.words(evidence.additional_information)
+
+    def update(self, case):
+        """
+        Indexes records added to the case since the last update.
+        :param case: Case the index belongs to
+        :return: None
+        """
+        with self._lock:
+            events = case.events
+            if self._indexed_events < len(events):
+                for index, event in enumerate(events[self._indexed_events:], self._indexed_events):
+                    self._add(self._event_postings, index, self.event_words(event))
+
+                self._indexed_events = len(events)
+                self.changed = True
+
+            evidence = case.physical_evidence
+            if self._indexed_evidence < len(evidence):
+                for index in range(self._indexed_evidence, len(evidence)):
+                    self._add(self._evidence_postings, index, self.evidence_words(evidence[index]))
+
+                self._indexed_evidence = len(evidence)
+                self.changed = True
+
+    def replace_event(self, index: int, old: Event, new: Event):
+        """
+        Re-indexes a replaced event, if it has been indexed.
+        :return: None
+        """
+        with self._lock:
+            if index < self._indexed_events:
+                self._replace(self._event_postings, index, self.event_words(old), self.event_words(new))
+
+    def replace_evidence(self, index: int, old: Evidence, new: Evidence):
+        """
+        Re-indexes replaced evidence, if it has been indexed.
+        :return: None
+        """
+        with self._lock:
+            if index < self._indexed_evidence:
+                self._replace(self._evidence_postings, index, self.evidence_words(old), self.evidence_words(new))
+
+    def search_events(self, query: str) -> [int]:
+        """
+        Finds events with comments containing every word in the query.
+        :param query: Words to search for
+        :return: Indexes in `Case.events`, ascending
+        """
+        with self._lock:
+            return self._search(self._event_postings, query)
+
+    def search_evidence(self, query: str) -> [int]:
+        """
+        Finds evidence with a description or additional information containing every word in the query.
+        :param query: Words to search for
+        :return: Indexes in `Case.physical_evidence`, ascending
+        """
+        with self._lock:
+            return self._search(self._evidence_postings, query)
+
+    # Reading and writing --------------------------------------------------------------------------------------------
+
+    def postings(self) -> (int, int, {str: bytes}, {str: bytes}):
+        """
+        Copies everything the index holds, for storing it, see `from_postings`. Counts as written, set `changed` again
+            if storing it fails.
+        :return: Events and evidence indexed, and the postings of both as little-endian 32-bit indexes by word
+        """
+        # Copied while nothing can change them, stored after so records can keep coming in meanwhile.
+        with self._lock:
+            self.changed = False
+            return (self._indexed_events, self._indexed_evidence, self._copy_postings(self._event_postings),
+                    self._copy_postings(self._evidence_postings))
+
+    @classmethod
+    def from_postings(cls, events: int, evidence: int, event_postings: {str: bytes}, evidence_postings: {str: bytes}):
+        """
+        Makes an index out of what `postings` gave.
+        :return: SearchIndex
+        """
+        index = SearchIndex()
+        index._indexed_events = events
+        index._indexed_evidence = evidence
+        index._event_postings = cls._array_postings(event_postings)
+        index._evidence_postings = cls._array_postings(evidence_postings)
+        index._words = sorted(set(index._event_postings) | set(index._evidence_postings))
+        return index
+
+    def write(self, location: str, case_location: str):
+        """
+        Writes the index next to the case file. The case file should be saved first, the index remembers its size and
+            modification time so it won't be used if the case is changed without it.
+        :param location: Where to write the index
+        :param case_location: The case file the index belongs to
+        :return: None
+        """
+        events, evidence, event_postings, evidence_postings = self.postings()
+
+        try:
+            stat = os.stat(case_location)
+            contents = {
+                "version": self.VERSION,
+                "case_size": stat.st_size,
+                "case_modified": stat.st_mtime_ns,
+                "events": events,
+                "evidence": evidence,
+                "event_postings": self._encode_postings(event_postings),
+                "evidence_postings": self._encode_postings(evidence_postings)
+            }
+
+            temporary_location = location + ".tmp"
+            with open(temporary_location, "w", encoding="utf-8") as file:
+                json.dump(contents, file, ensure_ascii=False, separators=(",", ":"))
+
+            os.replace(temporary_location, location)
+        except BaseException:
+            self.changed = True  # Still to be written
+            raise
+
+    @classmethod
+    def read(cls, location: str, case_location: str):
+        """
+        Reads an index written by `write`.
+        :param location: Where the index is
+        :param case_location: The case file the index belongs to
+        :return: SearchIndex, or None if there is none or it doesn't match the case file.
+        """
+        try:
+            stat = os.stat(case_location)
+            with open(location, "r", encoding="utf-8") as file:
+                contents = json.load(file)
+
+            if contents["version"] != cls.VERSION or contents["case_size"] != stat.st_size or \
+                    contents["case_modified"] != stat.st_mtime_ns:
+                return None
+
+            return cls.from_postings(contents["events"], contents["evidence"],
+                                     cls._decode_postings(contents["event_postings"]),
+                                     cls._decode_postings(contents["evidence_postings"]))
+        except (OSError, ValueError, KeyError, TypeError):
+            return None  # Missing or broken, the index is built again when it's needed.
+
+    @staticmethod
+    def _copy_postings(postings: {str: array}) -> {str: bytes}:
+        if sys.byteorder == "little":
+            return {word: indexes.tobytes() for word, indexes in postings.items()}
+
+        copies = {}
+        for word, indexes in postings.items():
+            indexes = array("I", indexes)
+            indexes.byteswap()
+            copies[word] = indexes.tobytes()
+
+        return copies
+
+    @staticmethod
+    def _array_postings(postings: {str: bytes}) -> {str: array}:
+        arrays = {}
+        for word, data in postings.items():
+            indexes = array("I")
+            indexes.frombytes(data)
+            if sys.byteorder == "big":
+                indexes.byteswap()
+            arrays[word] = indexes
+
+        return arrays
+
+    @staticmethod
+    def _encode_postings(postings: {str: bytes}) -> {str: str}:
+        return {word: base64.b64encode(data).decode("ascii") for word, data in postings.items()}
+
+    @staticmethod
+    def _decode_postings(encoded: {str: str}) -> {str: bytes}:
+        return {word: base64.b64decode(data) for word, data in encoded.items()}
+
+    # Helpers --------------------------------------------------------------------------------------------------------
+
+    def _add(self, postings: {str: array}, index: int, words: {str}):
+        for word in words:
+            indexes = postings.get(word)
+            if indexes is None:
+                indexes = postings[word] = array("I")
+                self._words.append(word)
+                self._words_sorted = False
+
+            indexes.append(index)
+
+    def _replace(self, postings: {str: array}, index: int, old_words: {str}, new_words: {str}):
+        for word in old_words - new_words:
+            indexes = postings[word]
+            del indexes[bisect.bisect_left(indexes, index)]  # Sorted, `remove` would compare its way through them all
+
+        for word in new_words - old_words:
+            indexes = postings.get(word)
+            if indexes is None:
+                indexes = postings[word] = array("I")
+                self._words.append(word)
+                self._words_sorted = False
+
+            indexes.insert(bisect.bisect_left(indexes, index), index)
+
+        self.changed = True
+
+    def _search(self, postings: {str: array}, query: str) -> [int]:
+        terms = self._word.findall(query.lower())
+        if not terms:
+            return []
+
+        if not self._words_sorted:
+            self._words = sorted(set(self._words))
+            self._words_sorted = True
+
+        # Rarest term first, so the set we keep intersecting with stays small.
+        matches = sorted((self._matching_words(postings, term) for term in set(terms)),
+                         key=lambda words: sum(len(postings[word]) for word in words))
+
+        result = None
+        for words in matches:
+            found = set()
+            for word in words:
+                found.update(postings[word])
+
+            result = found if result is None else result & found
+            if not result:
+                return []
+
+        return sorted(result)
+
+    def _matching_words(self, postings: {str: array}, prefix: str) -> [str]:
+        words = self._words
+        matching = []
+
+        position = bisect.bisect_left(words, prefix)
+        while position < len(words) and words[position].startswith(prefix):
+            if words[position] in postings:
+                matching.append(words[position])
+            position += 1
+
+        return matching
@@ -0,0 +1,94 @@
+import os
+import re
+
+
+class Template(object):
+    """
+    An HTML template with `${Name}` placeholders.
+
+    The template is compiled once into a format string, so rendering is a single `str.format_map` call instead of one
+        `str.replace` pass over the whole template per placeholder.
+    Templates are cached by location and reloaded when the file on disk changes.
+    """
+    _placeholder = re.compile(r"\$\{(\w+)\}")
+
+    _cache = {}  # type: {str: Template}
+
+    location = None  # type: str
+    modified_time = None  # type: int
+
+    def __init__(self, source: str, location: str = None, modified_time: int = None):
+        """
+        Compiles a template from its source.
+        :param source: Template text
+        :param location: Where the template was loaded from, if anywhere
+        :param modified_time: Modification time of the file when it was loaded
+        """
+        self.source = source
+        self.location = location
+        self.modified_time = modified_time
+        self._sections = {}  # type: {str: Template}
+
+        # Splitting on the placeholder pattern gives literal text at even and placeholder names at odd positions.
+        # Braces in the literal text (CSS mostly) are escaped so only our placeholders are picked up by `format_map`.
+        parts = self._placeholder.split(source)
+        for index in range(0, len(parts), 2):
+            parts[index] = parts[index].replace("{", "{{").replace("}", "}}")
+        for index in range(1, len(parts), 2):
+            parts[index] = "{" + parts[index] + "}"
+
+        self._format = "".join(parts)
+        self.placeholders = self._placeholder.findall(source)  # type: [str]
+
+    @classmethod
+    def load(cls, location: str):
+        """
+        Returns the compiled template at the given location, only reading the file if it has changed since last time.
+        :param location: Location on disk
+        :return: Template
+        """
+        modified_time = os.stat(location).st_mtime_ns
+
+        template = cls._cache.get(location)
+        if template is None or template.modified_time != modified_time:
+            with open(location, "r", encoding="utf-8") as template_file:
+                template = Template(template_file.read(), location, modified_time)
+
+            cls._cache[location] = template
+
+        return template
+
+    def section(self, tag: str):
+        """
+        Returns the part of the template inside the first element with the given tag, as a template of its own.
+        Lets records be put together into one document, with `section("body")` for each record and the stylesheet
+            from `section("style")` once.
+        :param tag: Tag name, like "body" or "style"
+        :return: Template, or this template if it has no such element.
+        """
+        section = self._sections.get(tag)
+        if section is None:
+            match = re.search(r"<%s\b[^>]*>(.*?)</%s\s*>" % (tag, tag), self.source, re.DOTALL | re.IGNORECASE)
+            section = Template(match.group(1), self.location, self.modified_time) if match is not None else self
+            self._sections[tag] = section
+
+        return section
+
+    def render(self, values: dict) -> str:
+        """
+        Fills in the template. Placeholders without a value are left as they are.
+        :param values: Placeholder names mapped to their values
+        :return: Rendered template
+        """
+        try:
+            return self._format.format_map(values)
+        except KeyError:
+            return self._format.format_map(_Values(values))
+
+
+class _Values(dict):
+    """
+    Values for a template that leaves unknown placeholders untouched, like the `str.replace` rendering used to.
+    """
+    def __missing__(self, key):
+        return "${" + key + "}"
@@ -0,0 +1,163 @@
+from Models.Event import Event
+
+import bisect
+import heapq
+
+
+class TimeIndex(object):
+    """
+    Sorted index of events by start time, for range queries and chronological listings.
+
+    Event indexes are kept sorted by start epoch in a pair of parallel lists, searched with `bisect`. Range queries
+        look for events that overlap the range, so the longest event seen is remembered: anything starting more than
+        that long before the range can't reach into it.
+    Events with times that aren't epochs (see `Models.Timestamp`) can't be placed in time, they're kept to the side.
+    Like `DeviceIndex`, updating only looks at the events added since the last update.
+    """
+
+    def __init__(self):
+        self._starts = []  # type: [int]  # Start epochs, ascending
+        self._indexes = []  # type: [int]  # Event indexes, in the same order as `_starts`
+        self._stops = []  # type: [int]  # Stop epoch per event index, the start epoch if it has none
+        self._devices = []  # type: [str]  # Device per event index
+
+        self.untimed = []  # type: [int]  # Indexes of events without a start epoch, ascending
+        self.longest = 0  # Longest event seen, in seconds
+
+        self._indexed_events = 0
+
+    def update(self, case):
+        """
+        Indexes events added to the case since the last update.
+        :param case: Case the index belongs to
+        :return: None
+        """
+        events = case.events
+        first = self._indexed_events
+        if first >= len(events):
+            return
+
+        if hasattr(events, "timings"):
+            added = events.timings(first)  # Straight from the columns of an `EventStore` or a database, no `Event`s
+        else:
+            added = [(event.start_epoch, event.stop_epoch, event.device) for event in events[first:]]
+
+        if first == 0:
+            # Building from scratch, sorting once beats inserting one at a time.
+            for index, (start, stop, device) in enumerate(added):
+                self._remember(index, start, stop, device)
+
+            timed = sorted((start, index) for index, (start, _, _) in enumerate(added) if start is not None)
+            self._starts = [start for start, _ in timed]
+            self._indexes = [index for _, index in timed]
+        else:
+            for index, (start, stop, device) in enumerate(added, first):
+                self._remember(index, start, stop, device)
+
+                if start is not None:
+                    # New indexes are higher than every indexed one, so going right of equal starts keeps order.
+                    position = bisect.bisect_right(self._starts, start)
+                    self._starts.insert(position, start)
+                    self._indexes.insert(position, index)
+
+        self._indexed_events = len(events)
+
+    def replace_event(self, index: int, old: Event, new: Event):
+        """
+        Moves a replaced event to its new place in time, if it has been indexed.
+        :return: None
+        """
+        if index >= self._indexed_events:
+            return
+
+        start = old.start_epoch
+        if start is None:
+            self.untimed.remove(index)
+        else:
+            position = bisect.bisect_left(self._starts, start)
+            while self._indexes[position] != index:
+                position += 1
+
+            del self._starts[position]
+            del self._indexes[position]
+
+        start = new.start_epoch
+        self._stops[index] = self._stop(start, new.stop_epoch)
+        self._devices[index] = new.device
+
+        if start is None:
+            bisect.insort(self.untimed, index)
+        else:
+            position = bisect.bisect_left(self._starts, start)
+            while position < len(self._starts) and self._starts[position] == start and self._indexes[position] < index:
+                position += 1
+
+            self._starts.insert(position, start)
+            self._indexes.insert(position, index)
+            self.longest = max(self.longest, self._stops[index] - start)
+
+    def between(self, start: int, stop: int) -> [int]:
+        """
+        Finds events that overlap a time range, including ones that started before it or end after it.
+        :param start: Start of the range, as an epoch
+        :param stop: End of the range, as an epoch
+        :return: Event indexes, ordered by start time
+        """
+        first = bisect.bisect_left(self._starts, start - self.longest)
+        last = bisect.bisect_right(self._starts, stop)
+
+        stops = self._stops
+        return [index for index in self._indexes[first:last] if stops[index] >= start]
+
+    def chronological(self) -> [int]:
+        """
+        Every event index ordered by start time, followed by events that couldn't be placed in time.
+        :return: Event indexes
+        """
+        return self._indexes + self.untimed
+
+    def overlaps(self, device: str = None) -> [(int, int)]:
+        """
+        Finds events on the same device whose times overlap. Events that end right as another starts don't overlap.
+        :param device: Only look at this device, or at every device if None
+        :return: Pairs of event indexes, the first one starting first
+        """
+        devices = self._devices
+        stops = self._stops
+
+        active = {}  # type: {str: [(int, int)]}  # Heap per device of stop epoch and index for events still running
+        pairs = []
+
+        for start, index in zip(self._starts, self._indexes):
+            event_device = devices[index]
+            if device is not None and event_device != device:
+                continue
+
+            running = active.setdefault(event_device, [])
+            while running and running[0][0] <= start:
+                heapq.heappop(running)
+
+            pairs.extend((other, index) for _, other in running)
+            heapq.heappush(running, (stops[index], index))
+
+        return pairs
+
+    def _remember(self, index: int, start: int, stop: int, device: str):
+        stop = self._stop(start, stop)
+
+        self._stops.append(stop)
+        self._devices.append(device)
+
+        if start is None:
+            self.untimed.append(index)
+        elif stop - start > self.longest:
+            self.longest = stop - start
+
+    @staticmethod
+    def _stop(start: int, stop: int) -> int:
+        if start is None:
+            return stop
+        if stop is None or stop < start:
+            return start  # Treat events without a usable stop time as instant
+
+        return stop
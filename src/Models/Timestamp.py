@@ -0,0 +1,116 @@
+"""
+Conversion between the date/time strings shown in the UI, like "23/12/2016 22:59", and integer epochs.
+
+Strings are only turned into epochs when turning the epoch back gives the exact same string, so nothing the
+    investigator typed is ever changed. Anything else, like dates written in another locale, is kept as a string.
+Epochs are seconds since 1970 with the time taken as-is, no time zone conversion happens in either direction.
+"""
+
+from functools import lru_cache
+
+TIME_FORMAT = "%02d/%02d/%04d %02d:%02d"  # Day, month, year, hour, minute
+
+_days_in_month = (31, 28, 31, 30, 31, 30, 31, 31, 30, 31, 30, 31)
+
+
+# Cached because times are logged by the minute, so the same handful of strings and epochs come up again and again.
+@lru_cache(maxsize=65536)
+def parse_time(text: str):
+    """
+    Parses a "dd/mm/yyyy hh:mm" string into an epoch.
+    :param text: Date and time string
+    :return: Epoch in seconds, or the string itself if it isn't in that exact format.
+    """
+    if text.__class__ is not str or len(text) != 16 or text[2] != "/" or text[5] != "/" or text[10] != " " or \
+            text[13] != ":":
+        return text
+
+    digits = text[0:2] + text[3:5] + text[6:10] + text[11:13] + text[14:16]
+    if not (digits.isascii() and digits.isdigit()):
+        return text  # `int` would let signs, spaces and other scripts' digits through
+
+    day, month, year, hour, minute = int(digits[0:2]), int(digits[2:4]), int(digits[4:8]), int(digits[8:10]), \
+                                     int(digits[10:12])
+
+    if not (1 <= month <= 12 and 1 <= day <= _month_length(year, month) and hour < 24 and minute < 60):
+        return text  # Not a real date
+
+    return (_days_from_civil(year, month, day) * 24 + hour) * 3600 + minute * 60
+
+
+@lru_cache(maxsize=65536)
+def format_time(value) -> str:
+    """
+    Turns an epoch back into a "dd/mm/yyyy hh:mm" string. Strings are returned as they are.
+    :param value: Epoch in seconds, or a string that couldn't be parsed
+    :return: Date and time string
+    """
+    if value.__class__ is not int:
+        return value
+
+    days, seconds = divmod(value, 86400)
+    year, month, day = _civil_from_days(days)
+
+    return TIME_FORMAT % (day, month, year, seconds // 3600, seconds // 60 % 60)
+
+
+def require_time(text: str, name: str = "time") -> int:
+    """
+    Parses a time that has to be a real "dd/mm/yyyy hh:mm", for times typed somewhere other than the date fields.
+    Kept as strings, they'd never turn up in time queries, see `TimeIndex`.
+    :param text: Date and time string
+    :param name: What the time is, for the error message
+    :return: Epoch in seconds
+    :raises ValueError: If it isn't one
+    """
+    epoch = parse_time(text)
+    if epoch.__class__ is not int:
+        raise ValueError("The %s must be like 23/12/2016 22:59 (dd/mm/yyyy hh:mm), not %r." % (name, text))
+
+    return epoch
+
+
+def require_period(start: str, stop: str) -> (int, int):
+    """
+    Parses the start and stop time of an event, see `require_time`. The stop time can't come before the start time.
+    :return: Start and stop epochs
+    :raises ValueError: If either isn't a real time, or they're the wrong way around
+    """
+    start_epoch, stop_epoch = require_time(start, "start time"), require_time(stop, "stop time")
+    if stop_epoch < start_epoch:
+        raise ValueError("The stop time %s comes before the start time %s." % (stop, start))
+
+    return start_epoch, stop_epoch
+
+
+def _month_length(year: int, month: int) -> int:
+    if month == 2 and year % 4 == 0 and (year % 100 != 0 or year % 400 == 0):
+        return 29
+
+    return _days_in_month[month - 1]
+
+
+# The two functions below are Howard Hinnant's proleptic Gregorian calendar algorithms. They're here because
+#   `time.gmtime` and friends refuse dates before 1970 on some platforms.
+
+def _days_from_civil(year: int, month: int, day: int) -> int:
+    year -= month <= 2
+    era = year // 400
+    year_of_era = year - era * 400
+    day_of_year = (153 * (month - 3 if month > 2 else month + 9) + 2) // 5 + day - 1
+    day_of_era = year_of_era * 365 + year_of_era // 4 - year_of_era // 100 + day_of_year
+
+    return era * 146097 + day_of_era - 719468
+
+
+def _civil_from_days(days: int) -> (int, int, int):
+    days += 719468
+    era = days // 146097
+    day_of_era = days - era * 146097
+    year_of_era = (day_of_era - day_of_era // 1460 + day_of_era // 36524 - day_of_era // 146096) // 365
+    day_of_year = day_of_era - (365 * year_of_era + year_of_era // 4 - year_of_era // 100)
+    month_portion = (5 * day_of_year + 2) // 153
+    day = day_of_year - (153 * month_portion + 2) // 5 + 1
+    month = month_portion + 3 if month_portion < 10 else month_portion - 9
+
+    return year_of_era + era * 400 + (month <= 2), month, day
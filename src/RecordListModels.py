@@ -0,0 +1,142 @@
+from PyQt5.QtCore import QAbstractListModel, QModelIndex, Qt
+
+from Models.Event import Event
+from Models.Evidence import Evidence
+
+
+class RecordListModel(QAbstractListModel):
+    """
+    List model that reads straight from a list of case records, like `Case.events`.
+
+    No items are made up front. Rows are handed to the view in batches as it scrolls (`canFetchMore`/`fetchMore`),
+        and display text is only made for the rows the view asks about.
+    The list can be narrowed down to some of the records with `set_filter`.
+    Subclasses decide what a record looks like in the list by implementing `display`.
+    """
+    BATCH_SIZE = 256  # Rows exposed per fetch
+
+    def __init__(self, records: list = None, parent=None):
+        """
+        Initiates a model for the given records.
+        :param records: List of records, the model reads from it directly and never copies it.
+        :param parent: Parent QObject
+        """
+        super().__init__(parent)
+
+        self.records = records if records is not None else []
+        self.rows = None  # type: [int]  # Indexes in `records` to show, or None to show them all
+
+        self._loaded = 0  # Rows the view knows about
+        self._known = len(self.records)  # Row count when we last heard about it
+
+    def display(self, record) -> str:
+        raise NotImplementedError
+
+    def set_records(self, records: list):
+        """
+        Points the model at a new list of records.
+        :param records: List of records
+        :return: None
+        """
+        self.beginResetModel()
+        self.records = records
+        self.rows = None
+        self._loaded = 0
+        self._known = len(records)
+        self.endResetModel()
+
+    def set_filter(self, rows: [int]):
+        """
+        Only shows some of the records.
+        The list may be one that keeps growing as records are added, like `Case.event_indexes_for_device` gives,
+            call `records_appended` after adding records and new rows show up like they would without a filter.
+        :param rows: Indexes in `records` to show, in the order to show them. None shows every record again.
+        :return: None
+        """
+        self.beginResetModel()
+        self.rows = rows
+        self._loaded = 0
+        self._known = self._row_source_length()
+        self.endResetModel()
+
+    def records_appended(self):
+        """
+        Tells the model that records have been appended to its list.
+        If the view has already seen every row, the first batch of new rows is inserted right away, the rest is
+            fetched as the view scrolls.
+        :return: None
+        """
+        known, self._known = self._known, self._row_source_length()
+
+        if self._loaded == known and self._known > known:
+            self._insert(min(self._known - known, self.BATCH_SIZE))
+
+    def record(self, row: int):
+        """
+        Returns the record shown on a row.
+        :param row: Row in the list
+        :return: Record
+        """
+        return self.records[self.record_index(row)]
+
+    def record_index(self, row: int) -> int:
+        """
+        Returns the index in `records` of the record shown on a row.
+        :param row: Row in the list
+        :return: Index in `records`
+        """
+        return row if self.rows is None else self.rows[row]
+
+    # QAbstractListModel ---------------------------------------------------------------------------------------------
+
+    def rowCount(self, parent=QModelIndex()) -> int:
+        if parent.isValid():
+            return 0  # It's a list, nothing has children.
+
+        return self._loaded
+
+    def canFetchMore(self, parent=QModelIndex()) -> bool:
+        if parent.isValid():
+            return False
+
+        return self._loaded < self._row_source_length()
+
+    def fetchMore(self, parent=QModelIndex()):
+        if parent.isValid():
+            return
+
+        self._known = self._row_source_length()
+        self._insert(min(self._known - self._loaded, self.BATCH_SIZE))
+
+    def data(self, index: QModelIndex, role=Qt.DisplayRole):
+        if not index.isValid() or role != Qt.DisplayRole:
+            return None
+
+        return self.display(self.record(index.row()))
+
+    def _row_source_length(self) -> int:
+        return len(self.records) if self.rows is None else len(self.rows)
+
+    def _insert(self, count: int):
+        if count <= 0:
+            return
+
+        self.beginInsertRows(QModelIndex(), self._loaded, self._loaded + count - 1)
+        self._loaded += count
+        self.endInsertRows()
+
+
+class EventListModel(RecordListModel):
+    """
+    Lists events by their comments.
+    """
+    def display(self, record: Event) -> str:
+        return record.comments
+
+
+class EvidenceListModel(RecordListModel):
+    """
+    Lists physical evidence by unique identifier and description.
+    """
+    def display(self, record: Evidence) -> str:
+        return record.unique_identifier + "\n" + record.description
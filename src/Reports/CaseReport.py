@@ -0,0 +1,116 @@
+from PyQt5.QtCore import QCoreApplication
+from PyQt5.QtGui import QGuiApplication, QTextBlockFormat, QTextCursor, QTextDocument, QTextFormat
+from PyQt5.QtPrintSupport import QPrinter
+
+from Models.Case import Case
+
+from Instrumentation import traced
+
+import os
+import sys
+
+_application = None  # Keeps the application we create alive, Qt falls over if it's garbage collected.
+
+
+def headless_application() -> QCoreApplication:
+    """
+    Makes sure there is a Qt application to lay out text with, creating an offscreen one if there is none.
+    Lets reports be made from scripts and on servers without a display.
+    :return: The running application
+    """
+    global _application
+
+    application = QCoreApplication.instance()
+    if application is None:
+        if "QT_QPA_PLATFORM" not in os.environ and not os.environ.get("DISPLAY") and sys.platform.startswith("linux"):
+            os.environ["QT_QPA_PLATFORM"] = "offscreen"
+        application = _application = QGuiApplication(sys.argv[:1])
+
+    return application
+
+
+class CaseReport(object):
+    """
+    Lays out a whole case as one document, every record starting on a new page.
+
+    Records are rendered with the case's record templates, but only the body of each is put into the document.
+    The stylesheet is shared by every record, so it is set once for the whole document.
+    """
+    CHUNK_SIZE = 100  # Records laid out between each progress report
+
+    case = None  # type: Case
+
+    def __init__(self, case: Case):
+        """
+        Initiates a report for the given case.
+        :param case: Case to report on
+        """
+        self.case = case
+
+    def record_count(self) -> int:
+        return len(self.case.events) + len(self.case.physical_evidence)
+
+    @traced
+    def build(self, progress=None) -> QTextDocument:
+        """
+        Builds the document for the whole case.
+        Page size is left alone, `QTextDocument.print` paginates for the printer it is given.
+        :param progress: Optional callable taking records done and records in total, return False from it to cancel
+        :return: Document, or None if cancelled
+        """
+        document = QTextDocument()
+        cursor = QTextCursor(document)
+
+        page_break = QTextBlockFormat()
+        page_break.setPageBreakPolicy(QTextFormat.PageBreak_AlwaysBefore)
+
+        total = self.record_count()
+        done = 0
+
+        document.setDefaultStyleSheet("\n".join(self.case.record_styles()))
+
+        for html in self.case.records_to_html("body"):
+            if done > 0:
+                cursor.insertBlock(page_break)
+
+            cursor.insertHtml(html)
+
+            done += 1
+            if progress is not None and done % self.CHUNK_SIZE == 0 and progress(done, total) is False:
+                return None
+
+        if progress is not None and progress(done, total) is False:
+            return None
+
+        return document
+
+    @traced
+    def print(self, printer: QPrinter, progress=None) -> bool:
+        """
+        Lays out the case and prints it in one go.
+        :param printer: Printer to print with
+        :param progress: See `build`
+        :return: False if cancelled
+        """
+        document = self.build(progress)
+        if document is None:
+            return False
+
+        document.print(printer)
+        return True
+
+    def write_pdf(self, location: str, progress=None) -> bool:
+        """
+        Writes the case straight to a PDF file, no print dialog needed.
+        :param location: Where to write the PDF
+        :param progress: See `build`
+        :return: False if cancelled
+        """
+        headless_application()
+
+        printer = QPrinter(QPrinter.HighResolution)
+        printer.setOutputFormat(QPrinter.PdfFormat)
+        printer.setOutputFileName(location)
+        printer.setDocName(self.case.case_reference or "")
+
+        return self.print(printer, progress)
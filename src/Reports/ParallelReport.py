@@ -0,0 +1,209 @@
+from Models.Case import Case
+from Reports.CaseReport import CaseReport
+
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+import importlib.util
+import multiprocessing
+import os
+import shutil
+import tempfile
+
+# Chunks are put together with pikepdf, or pypdf which is a lot slower at it. Without either, reports are laid out in
+# one go instead. Both take long enough to import to slow down opening the windows, so they're only imported once
+# there's something to put together.
+MERGERS = ("pikepdf", "pypdf")
+
+
+class ParallelReport(object):
+    """
+    Writes a case to PDF on several processes at once.
+
+    The case is split into chunks of records, and each chunk is laid out and written to a PDF of its own by a worker
+        process running headless Qt. The chunk PDFs are then put together in order with pikepdf or pypdf. Every record
+        starts on a new page anyway, so the result looks like what `CaseReport` would make on its own.
+    Small cases, single workers and machines with neither pikepdf nor pypdf get a plain `CaseReport`.
+    """
+    MINIMUM_CHUNK_SIZE = 50  # Records, smaller chunks spend more time starting up than laying out
+    CHUNKS_PER_WORKER = 4  # Keeps workers busy to the end even when some chunks take longer than others
+
+    case = None  # type: Case
+
+    def __init__(self, case: Case, workers: int = None, chunk_size: int = None):
+        """
+        Initiates a report for the given case.
+        :param case: Case to report on
+        :param workers: Processes to lay out on, defaults to one per CPU.
+        :param chunk_size: Records per chunk, defaults to a few chunks per worker.
+        """
+        self.case = case
+        self.workers = workers or os.cpu_count() or 1
+
+        total = self.record_count()
+        self.chunk_size = chunk_size or max(self.MINIMUM_CHUNK_SIZE,
+                                            -(-total // (self.workers * self.CHUNKS_PER_WORKER)))
+
+    def record_count(self) -> int:
+        return len(self.case.events) + len(self.case.physical_evidence)
+
+    def is_parallel(self) -> bool:
+        """
+        Whether the report will be laid out on several processes, see the class description.
+        :return: bool
+        """
+        return self.can_merge() and self.workers > 1 and self.record_count() > self.chunk_size
+
+    def write_pdf(self, location: str, progress=None) -> bool:
+        """
+        Writes the case to a PDF file.
+        :param location: Where to write the PDF
+        :param progress: Optional callable taking records done and records in total, return False from it to cancel.
+        :return: False if cancelled
+        """
+        if not self.is_parallel():
+            return CaseReport(self.case).write_pdf(location, progress)
+
+        folder = tempfile.mkdtemp(prefix="digidence-report-")
+        try:
+            chunks = self.render_chunks(folder, progress)
+            if chunks is None:
+                return False
+
+            if progress is not None and progress(self.record_count(), self.record_count()) is False:
+                return False  # Lets the caller know we're putting pages together, and gives a last chance to stop.
+
+            self.merge(chunks, location)
+        finally:
+            shutil.rmtree(folder, ignore_errors=True)
+
+        return True
+
+    def render_chunks(self, folder: str, progress=None) -> [str]:
+        """
+        Lays out every chunk of the case on the worker processes.
+        :param folder: Folder to write the chunk PDFs to
+        :param progress: See `write_pdf`
+        :return: Locations of the chunk PDFs in order, or None if cancelled
+        """
+        total = self.record_count()
+        header = {
+            "case_reference": self.case.case_reference,
+            "lab_reference": self.case.lab_reference,
+            "investigator": self.case.investigator,
+            "EVENT_TEMPLATE": self.case.EVENT_TEMPLATE,
+            "EVIDENCE_TEMPLATE": self.case.EVIDENCE_TEMPLATE
+        }
+
+        starts = range(0, total, self.chunk_size)
+        locations = [os.path.join(folder, "%06d.pdf" % number) for number in range(len(starts))]
+        pending = iter(zip(starts, locations))
+
+        # Spawned, not forked: forking a process that has Qt running (the main window) isn't safe.
+        context = multiprocessing.get_context("spawn")
+        with ProcessPoolExecutor(self.workers, mp_context=context, initializer=_start_worker) as executor:
+            running = {}
+            done = 0
+
+            # Only a couple of chunks per worker are handed out at a time, so the records of the whole case are never
+            # copied over in one go.
+            while True:
+                while len(running) < self.workers * 2:
+                    chunk = next(pending, None)
+                    if chunk is None:
+                        break
+
+                    start, location = chunk
+                    events, evidence = self._records(start, start + self.chunk_size)
+                    running[executor.submit(_render_chunk, header, events, evidence, location)] = \
+                        len(events) + len(evidence)
+
+                if not running:
+                    break
+
+                finished, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    future.result()  # Raises anything that went wrong in the worker
+                    done += running.pop(future)
+
+                if progress is not None and done < total and progress(done, total) is False:
+                    for future in running:
+                        future.cancel()
+                    return None
+
+        return locations
+
+    @staticmethod
+    def merger() -> str:
+        """
+        Name of the library chunks are put together with, or None if neither is installed.
+        """
+        return next((name for name in MERGERS if importlib.util.find_spec(name) is not None), None)
+
+    @staticmethod
+    def can_merge() -> bool:
+        return ParallelReport.merger() is not None
+
+    @staticmethod
+    def merge(chunks: [str], location: str):
+        """
+        Puts chunk PDFs together into one, in the given order.
+        :param chunks: Locations of the PDFs
+        :param location: Where to write the result
+        :return: None
+        """
+        temporary_location = location + ".tmp"
+
+        if ParallelReport.merger() == "pikepdf":
+            import pikepdf
+            merged = pikepdf.Pdf.new()
+            sources = [pikepdf.Pdf.open(chunk) for chunk in chunks]  # Have to stay open until the result is saved
+            for source in sources:
+                merged.pages.extend(source.pages)
+
+            merged.save(temporary_location)
+            for source in sources:
+                source.close()
+        else:
+            import pypdf
+            writer = pypdf.PdfWriter()
+            for chunk in chunks:
+                writer.append(chunk)
+
+            with open(temporary_location, "wb") as file:
+                writer.write(file)
+
+        os.replace(temporary_location, location)
+
+    def _records(self, start: int, stop: int) -> ([object], [object]):
+        """
+        The events and evidence in a range of records, counting events first and then evidence like the report does.
+        """
+        events = self.case.events
+        event_count = len(events)
+
+        chunk_events = events[start:min(stop, event_count)] if start < event_count else []
+        chunk_evidence = self.case.physical_evidence[max(start - event_count, 0):max(stop - event_count, 0)]
+
+        return chunk_events, chunk_evidence
+
+
+def _start_worker():
+    os.environ["QT_QPA_PLATFORM"] = "offscreen"  # Workers never show anything, even when there is a display.
+
+
+def _render_chunk(header: dict, events: list, evidence: list, location: str):
+    """
+    Lays out some records of a case to a PDF, on a worker process.
+    :param header: Case details and template locations
+    :param events: Events in the chunk
+    :param evidence: Evidence in the chunk
+    :param location: Where to write the PDF
+    :return: None
+    """
+    case = Case()
+    for name, value in header.items():
+        setattr(case, name, value)
+
+    case.events = events
+    case.physical_evidence = evidence
+
+    CaseReport(case).write_pdf(location)
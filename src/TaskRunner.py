@@ -0,0 +1,154 @@
+from PyQt5.QtCore import QObject, QRunnable, QThreadPool, pyqtSignal
+
+import threading
+
+
+class Task(QRunnable):
+    """
+    A function to run on a worker thread.
+    Results, errors and progress are sent back through `signals`, which are delivered on the thread that made the task.
+    """
+
+    class Signals(QObject):
+        finished = pyqtSignal(object)  # Return value of the function
+        failed = pyqtSignal(object)  # Exception raised by the function
+        progress = pyqtSignal("qint64", "qint64")  # Done and total, as reported by the function, bytes can be a lot
+
+    def __init__(self, runner, function, args: tuple, kwargs: dict, key=None):
+        """
+        Initiates a task. Use `TaskRunner.run` rather than making these directly.
+        :param runner: Runner that owns the task
+        :param function: Function to run
+        :param args: Positional arguments for the function
+        :param kwargs: Keyword arguments for the function
+        :param key: Tasks with the same key never run at the same time
+        """
+        super().__init__()
+        self.setAutoDelete(False)  # Python owns the task, the runner lets go of it when it's done.
+
+        self.runner = runner
+        self.function = function
+        self.args = args
+        self.kwargs = kwargs
+        self.key = key
+
+        self.signals = Task.Signals()  # Made here so they belong to the calling thread, not the worker.
+        self._cancelled = threading.Event()
+
+    def cancel(self):
+        """
+        Asks the task to stop. Only functions that take progress callbacks will notice.
+        :return: None
+        """
+        self._cancelled.set()
+
+    def is_cancelled(self) -> bool:
+        return self._cancelled.is_set()
+
+    def report_progress(self, done: int, total: int) -> bool:
+        """
+        Progress callback handed to functions that want one.
+        :return: False if the task has been cancelled and the function should stop
+        """
+        self.signals.progress.emit(done, total)
+        return not self._cancelled.is_set()
+
+    def run(self):
+        """
+        Called by the thread pool on a worker thread.
+        :return: None
+        """
+        lock = self.runner.lock_for(self.key)
+
+        try:
+            with lock:
+                result = self.function(*self.args, **self.kwargs)
+        except Exception as error:
+            self.signals.failed.emit(error)
+        else:
+            self.signals.finished.emit(result)
+
+
+class TaskRunner(object):
+    """
+    Runs slow jobs, like saving, opening and printing cases, on a thread pool so the window stays responsive.
+    """
+    _shared = None  # type: TaskRunner
+
+    def __init__(self, pool: QThreadPool = None):
+        """
+        Initiates a runner on the given thread pool.
+        :param pool: Thread pool to use, defaults to Qt's global one.
+        """
+        self.pool = pool if pool is not None else QThreadPool.globalInstance()
+
+        self._locks = {}
+        self._locks_lock = threading.Lock()
+        self._tasks = set()  # Keeps Python references to running tasks so their signals aren't collected early.
+
+    @classmethod
+    def shared(cls):
+        """
+        Returns the runner used by the whole application.
+        :return: TaskRunner
+        """
+        if cls._shared is None:
+            cls._shared = TaskRunner()
+
+        return cls._shared
+
+    def run(self, function, *args, key=None, progress: bool = False, **kwargs) -> Task:
+        """
+        Runs a function on a worker thread. Connect to the returned task's signals to hear back from it.
+        :param function: Function to run
+        :param key: Optional key, like a file location, tasks with the same key are run one at a time.
+        :param progress: Pass the task's progress callback to the function as its `progress` argument.
+        :return: Task
+        """
+        task = Task(self, function, args, kwargs, key)
+        if progress:
+            kwargs["progress"] = task.report_progress
+
+        self._tasks.add(task)
+        task.signals.finished.connect(lambda _: self._tasks.discard(task))
+        task.signals.failed.connect(lambda _: self._tasks.discard(task))
+
+        self.pool.start(task)
+
+        return task
+
+    def lock_for(self, key):
+        """
+        Returns the lock for a key, tasks without a key get a lock of their own.
+        :return: Lock
+        """
+        if key is None:
+            return threading.Lock()
+
+        with self._locks_lock:
+            lock = self._locks.get(key)
+            if lock is None:
+                lock = self._locks[key] = threading.Lock()
+
+            return lock
+
+    def wait(self, timeout: int = -1) -> bool:
+        """
+        Blocks until all tasks in the pool are done.
+        :param timeout: Milliseconds to wait at most, -1 to wait forever.
+        :return: True if everything finished
+        """
+        return self.pool.waitForDone(timeout)
+
+    def shutdown(self, timeout: int = -1) -> bool:
+        """
+        Cancels every task and waits for them to stop, for when the application quits. Tasks outliving the
+            interpreter abort the process once they report back. Tasks that don't take progress callbacks, like
+            saves, can't be cancelled and are left to finish.
+        :param timeout: Milliseconds to wait at most, -1 to wait forever.
+        :return: True if everything finished
+        """
+        for task in list(self._tasks):
+            task.cancel()
+
+        return self.wait(timeout)
@@ -0,0 +1,60 @@
+"""
+Checks that case databases keep their search index, so opening one doesn't mean indexing every record again.
+
+Run from the source folder:
+    python -m unittest Tests.CaseDatabaseTest
+"""
+from Models.Case import Case
+from Models.Event import Event
+from Models.Evidence import Evidence
+from Models.SearchIndex import SearchIndex
+
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+
+class CaseDatabaseTest(unittest.TestCase):
+
+    def setUp(self):
+        self.folder = tempfile.TemporaryDirectory()
+        self.location = os.path.join(self.folder.name, "case.digidb")
+
+        case = Case()
+        case.case_reference = "C1"
+        case.save_location = self.location
+        case.add_evidence(Evidence("HDD1", "Seized at the office", "01/02/2017 10:00", "Disk"))
+        case.save_to_disk()
+        for number in range(50):
+            case.add_event(Event("01/02/2017 10:00", "01/02/2017 11:00", "Imaged partition %d" % number, "HDD1"))
+
+        self.assertEqual(case.search_events("partition 7"), [7])
+        case.write_search_index()
+        self.case = case
+
+    def tearDown(self):
+        self.case._journal.close()
+        self.folder.cleanup()
+
+    def test_opening_reads_the_stored_index(self):
+        with mock.patch.object(SearchIndex, "_add", side_effect=AssertionError("indexed again")):
+            case = Case.open_from_disk(self.location)
+            self.assertEqual(case.search_events("partition 7"), [7])
+            self.assertEqual(case.search_events("imaged"), list(range(50)))
+
+        case._journal.close()
+
+    def test_index_is_not_trusted_once_records_are_stored_after_it(self):
+        self.case.add_event(Event("01/02/2017 12:00", "01/02/2017 13:00", "Hashed the image", "HDD1"))
+        self.case.replace_event(7, Event("01/02/2017 10:00", "01/02/2017 11:00", "Imaged the disk", "HDD1"))
+
+        case = Case.open_from_disk(self.location)
+        self.assertEqual(case.search_events("hashed"), [50])
+        self.assertEqual(case.search_events("partition 7"), [])
+        self.assertEqual(case.search_events("disk"), [7])
+        case._journal.close()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,16 +1,18 @@
-from PyQt5.Qt import *
-from PyQt5.uic import *
+from PyQt5.QtWidgets import QDialog, QWidget
+
+import ViewForms
 
 
 class ViewController(QWidget):
     def __init__(self, view_name: str):
         """
         Initiates a view controller with given UI-file as view.
+        The view is built from its compiled form when there is one, see `ViewForms`.
         :param view_name: Name of the view to open.
         """
         super().__init__()
 
-        loadUi("Views/" + view_name, self)
+        ViewForms.set_up(self, view_name)
 
     def open_window(self, window, close_self=True):
         """
@@ -33,4 +35,4 @@ class ViewController(QWidget):
         def __init__(self, view_name: str):
             super().__init__()
 
-            loadUi("Views/" + view_name, self)
+            ViewForms.set_up(self, view_name)
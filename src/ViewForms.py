@@ -0,0 +1,119 @@
+"""
+Turns the UI-files in Views into form classes that build the windows.
+
+Parsing a UI-file takes a good part of the time it takes to open a window, so the files are compiled into Python
+    ahead of time (`Views/<name>_ui.py`), which is only a matter of importing. Run this file from the source folder
+    after changing a UI-file to compile them again: python ViewForms.py
+Compiled forms remember a digest of the UI-file they were made from. When the UI-file has changed since, or it was
+    never compiled, the UI-file is parsed instead, once per run, so changes show up straight away while working on them.
+Setting DIGIDENCE_RUNTIME_UI always parses the UI-files.
+"""
+import hashlib
+import importlib.util
+import io
+import os
+import sys
+
+VIEWS = os.path.join(os.path.dirname(os.path.realpath(__file__)), "Views")
+
+_forms = {}  # type: {str: type}  # Form class by UI-file name
+
+
+def form_class(view_name: str) -> type:
+    """
+    The form class for a UI-file, with a `setupUi(widget)` method that builds the view on the given widget.
+    :param view_name: Name of the UI-file in Views, like "case.ui"
+    :return: Form class
+    """
+    form = _forms.get(view_name)
+    if form is None:
+        form = _forms[view_name] = _compiled_form(view_name) or _parsed_form(view_name)
+
+    return form
+
+
+def set_up(widget, view_name: str):
+    """
+    Builds a view on a widget, like `PyQt5.uic.loadUi` does: every named element ends up as an attribute of the widget.
+    :param widget: Widget of the type the UI-file was designed for
+    :param view_name: Name of the UI-file in Views
+    :return: None
+    """
+    form = form_class(view_name)()
+    form.setupUi(widget)
+
+    for name, element in vars(form).items():
+        setattr(widget, name, element)
+
+
+def compile_views(folder: str = VIEWS) -> [str]:
+    """
+    Compiles every UI-file in a folder into a Python module next to it.
+    :param folder: Folder with UI-files
+    :return: Locations of the compiled modules
+    """
+    from PyQt5.uic import compileUi
+
+    compiled = []
+    for name in sorted(os.listdir(folder)):
+        if not name.endswith(".ui"):
+            continue
+
+        with open(os.path.join(folder, name), "rb") as file:
+            ui_file = io.BytesIO(file.read())
+        ui_file.name = "Views/" + name  # What the compiled module says it was made from, the same on every machine
+        digest = hashlib.sha1(ui_file.getvalue()).hexdigest()
+
+        location = os.path.join(folder, _module_name(name) + ".py")
+        with open(location, "w", encoding="utf-8") as python_file:
+            compileUi(ui_file, python_file)
+            python_file.write("\n\nUI_DIGEST = \"%s\"  # Of %s, the form is only used while it matches\n"
+                              % (digest, name))
+
+        compiled.append(location)
+
+    return compiled
+
+
+# Helpers ------------------------------------------------------------------------------------------------------------
+
+def _module_name(view_name: str) -> str:
+    return os.path.splitext(view_name)[0] + "_ui"
+
+
+def _compiled_form(view_name: str):
+    """
+    Imports the compiled form of a UI-file.
+    :return: Form class, or None if there is no compiled form or it's out of date.
+    """
+    if os.environ.get("DIGIDENCE_RUNTIME_UI"):
+        return None
+
+    location = os.path.join(VIEWS, _module_name(view_name) + ".py")
+    if not os.path.exists(location):
+        return None
+
+    spec = importlib.util.spec_from_file_location("Views." + _module_name(view_name), location)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+
+    # Only builds that leave the UI-files out can skip this, the compiled forms are all they have.
+    ui_location = os.path.join(VIEWS, view_name)
+    if os.path.exists(ui_location):
+        with open(ui_location, "rb") as file:
+            if hashlib.sha1(file.read()).hexdigest() != getattr(module, "UI_DIGEST", None):
+                return None
+
+    forms = [value for name, value in vars(module).items() if name.startswith("Ui_") and isinstance(value, type)]
+    return forms[0] if len(forms) == 1 else None
+
+
+def _parsed_form(view_name: str) -> type:
+    from PyQt5.uic import loadUiType
+
+    return loadUiType(os.path.join(VIEWS, view_name))[0]
+
+
+if __name__ == "__main__":
+    for compiled_location in compile_views(sys.argv[1] if len(sys.argv) > 1 else VIEWS):
+        print(compiled_location)
@@ -0,0 +1,175 @@
+# -*- coding: utf-8 -*-
+
+# Form implementation generated from reading ui file 'Views/case.ui'
+#
+# Created by: PyQt5 UI code generator 5.15.11
+#
+# WARNING: Any manual changes made to this file will be lost when pyuic5 is
+# run again.  Do not edit this file unless you know what you are doing.
+
+
+from PyQt5 import QtCore, QtGui, QtWidgets
+
+
+class Ui_Form(object):
+    def setupUi(self, Form):
+        Form.setObjectName("Form")
+        Form.resize(687, 510)
+        Form.setMinimumSize(QtCore.QSize(687, 510))
+        self.mainLayout = QtWidgets.QVBoxLayout(Form)
+        self.mainLayout.setObjectName("mainLayout")
+        self.search_field = QtWidgets.QLineEdit(Form)
+        self.search_field.setClearButtonEnabled(True)
+        self.search_field.setObjectName("search_field")
+        self.mainLayout.addWidget(self.search_field)
+        self.horizontalLayout = QtWidgets.QHBoxLayout()
+        self.horizontalLayout.setObjectName("horizontalLayout")
+        self.verticalLayout = QtWidgets.QVBoxLayout()
+        self.verticalLayout.setObjectName("verticalLayout")
+        self.label = QtWidgets.QLabel(Form)
+        self.label.setObjectName("label")
+        self.verticalLayout.addWidget(self.label)
+        self.events_list = QtWidgets.QListView(Form)
+        self.events_list.setAlternatingRowColors(True)
+        self.events_list.setProperty("isWrapping", True)
+        self.events_list.setResizeMode(QtWidgets.QListView.Adjust)
+        self.events_list.setUniformItemSizes(False)
+        self.events_list.setWordWrap(True)
+        self.events_list.setObjectName("events_list")
+        self.verticalLayout.addWidget(self.events_list)
+        self.filter_events_checkbox = QtWidgets.QCheckBox(Form)
+        self.filter_events_checkbox.setObjectName("filter_events_checkbox")
+        self.verticalLayout.addWidget(self.filter_events_checkbox)
+        self.verticalLayout.setStretch(1, 1)
+        self.horizontalLayout.addLayout(self.verticalLayout)
+        self.verticalLayout_4 = QtWidgets.QVBoxLayout()
+        self.verticalLayout_4.setObjectName("verticalLayout_4")
+        self.label_2 = QtWidgets.QLabel(Form)
+        self.label_2.setObjectName("label_2")
+        self.verticalLayout_4.addWidget(self.label_2)
+        self.physical_evidence_list = QtWidgets.QListView(Form)
+        self.physical_evidence_list.setAlternatingRowColors(True)
+        self.physical_evidence_list.setProperty("isWrapping", True)
+        self.physical_evidence_list.setResizeMode(QtWidgets.QListView.Adjust)
+        self.physical_evidence_list.setWordWrap(True)
+        self.physical_evidence_list.setObjectName("physical_evidence_list")
+        self.verticalLayout_4.addWidget(self.physical_evidence_list)
+        self.horizontalLayout.addLayout(self.verticalLayout_4)
+        self.verticalLayout_2 = QtWidgets.QVBoxLayout()
+        self.verticalLayout_2.setSpacing(3)
+        self.verticalLayout_2.setObjectName("verticalLayout_2")
+        self.toolBox = QtWidgets.QToolBox(Form)
+        self.toolBox.setObjectName("toolBox")
+        self.page = QtWidgets.QWidget()
+        self.page.setGeometry(QtCore.QRect(0, 0, 319, 416))
+        self.page.setObjectName("page")
+        self.verticalLayout_5 = QtWidgets.QVBoxLayout(self.page)
+        self.verticalLayout_5.setObjectName("verticalLayout_5")
+        self.horizontalLayout_4 = QtWidgets.QHBoxLayout()
+        self.horizontalLayout_4.setObjectName("horizontalLayout_4")
+        self.label_3 = QtWidgets.QLabel(self.page)
+        self.label_3.setObjectName("label_3")
+        self.horizontalLayout_4.addWidget(self.label_3)
+        self.start_time_field = QtWidgets.QDateTimeEdit(self.page)
+        self.start_time_field.setDate(QtCore.QDate(2016, 1, 1))
+        self.start_time_field.setCalendarPopup(False)
+        self.start_time_field.setObjectName("start_time_field")
+        self.horizontalLayout_4.addWidget(self.start_time_field)
+        self.horizontalLayout_4.setStretch(1, 1)
+        self.verticalLayout_5.addLayout(self.horizontalLayout_4)
+        self.horizontalLayout_3 = QtWidgets.QHBoxLayout()
+        self.horizontalLayout_3.setObjectName("horizontalLayout_3")
+        self.label_4 = QtWidgets.QLabel(self.page)
+        self.label_4.setObjectName("label_4")
+        self.horizontalLayout_3.addWidget(self.label_4)
+        self.stop_time_field = QtWidgets.QDateTimeEdit(self.page)
+        self.stop_time_field.setDate(QtCore.QDate(2016, 1, 1))
+        self.stop_time_field.setObjectName("stop_time_field")
+        self.horizontalLayout_3.addWidget(self.stop_time_field)
+        self.horizontalLayout_3.setStretch(1, 1)
+        self.verticalLayout_5.addLayout(self.horizontalLayout_3)
+        self.comments_field = QtWidgets.QTextEdit(self.page)
+        self.comments_field.setObjectName("comments_field")
+        self.verticalLayout_5.addWidget(self.comments_field)
+        self.horizontalLayout_2 = QtWidgets.QHBoxLayout()
+        self.horizontalLayout_2.setObjectName("horizontalLayout_2")
+        self.label_5 = QtWidgets.QLabel(self.page)
+        self.label_5.setObjectName("label_5")
+        self.horizontalLayout_2.addWidget(self.label_5)
+        spacerItem = QtWidgets.QSpacerItem(40, 20, QtWidgets.QSizePolicy.Expanding, QtWidgets.QSizePolicy.Minimum)
+        self.horizontalLayout_2.addItem(spacerItem)
+        self.add_event_button = QtWidgets.QPushButton(self.page)
+        self.add_event_button.setEnabled(False)
+        self.add_event_button.setObjectName("add_event_button")
+        self.horizontalLayout_2.addWidget(self.add_event_button)
+        self.verticalLayout_5.addLayout(self.horizontalLayout_2)
+        self.toolBox.addItem(self.page, "")
+        self.page_2 = QtWidgets.QWidget()
+        self.page_2.setGeometry(QtCore.QRect(0, 0, 333, 416))
+        self.page_2.setObjectName("page_2")
+        self.verticalLayout_6 = QtWidgets.QVBoxLayout(self.page_2)
+        self.verticalLayout_6.setObjectName("verticalLayout_6")
+        self.horizontalLayout_6 = QtWidgets.QHBoxLayout()
+        self.horizontalLayout_6.setObjectName("horizontalLayout_6")
+        self.label_6 = QtWidgets.QLabel(self.page_2)
+        self.label_6.setObjectName("label_6")
+        self.horizontalLayout_6.addWidget(self.label_6)
+        self.seized_date_field = QtWidgets.QDateTimeEdit(self.page_2)
+        self.seized_date_field.setCalendarPopup(True)
+        self.seized_date_field.setObjectName("seized_date_field")
+        self.horizontalLayout_6.addWidget(self.seized_date_field)
+        self.horizontalLayout_6.setStretch(1, 1)
+        self.verticalLayout_6.addLayout(self.horizontalLayout_6)
+        self.unique_identifier_field = QtWidgets.QLineEdit(self.page_2)
+        self.unique_identifier_field.setObjectName("unique_identifier_field")
+        self.verticalLayout_6.addWidget(self.unique_identifier_field)
+        self.device_description_field = QtWidgets.QLineEdit(self.page_2)
+        self.device_description_field.setObjectName("device_description_field")
+        self.verticalLayout_6.addWidget(self.device_description_field)
+        self.additional_information_field = QtWidgets.QTextEdit(self.page_2)
+        self.additional_information_field.setObjectName("additional_information_field")
+        self.verticalLayout_6.addWidget(self.additional_information_field)
+        self.horizontalLayout_5 = QtWidgets.QHBoxLayout()
+        self.horizontalLayout_5.setObjectName("horizontalLayout_5")
+        spacerItem1 = QtWidgets.QSpacerItem(40, 20, QtWidgets.QSizePolicy.Expanding, QtWidgets.QSizePolicy.Minimum)
+        self.horizontalLayout_5.addItem(spacerItem1)
+        self.add_physical_button = QtWidgets.QPushButton(self.page_2)
+        self.add_physical_button.setObjectName("add_physical_button")
+        self.horizontalLayout_5.addWidget(self.add_physical_button)
+        self.verticalLayout_6.addLayout(self.horizontalLayout_5)
+        self.toolBox.addItem(self.page_2, "")
+        self.verticalLayout_2.addWidget(self.toolBox)
+        self.verticalLayout_2.setStretch(0, 1)
+        self.horizontalLayout.addLayout(self.verticalLayout_2)
+        self.horizontalLayout.setStretch(0, 1)
+        self.horizontalLayout.setStretch(1, 1)
+        self.horizontalLayout.setStretch(2, 2)
+        self.mainLayout.addLayout(self.horizontalLayout)
+        self.mainLayout.setStretch(1, 1)
+
+        self.retranslateUi(Form)
+        self.toolBox.setCurrentIndex(1)
+        QtCore.QMetaObject.connectSlotsByName(Form)
+
+    def retranslateUi(self, Form):
+        _translate = QtCore.QCoreApplication.translate
+        Form.setWindowTitle(_translate("Form", "Case"))
+        self.search_field.setPlaceholderText(_translate("Form", "Search events and evidence"))
+        self.label.setText(_translate("Form", "Events"))
+        self.filter_events_checkbox.setText(_translate("Form", "Only show events for selected item"))
+        self.label_2.setText(_translate("Form", "Physical Evidence"))
+        self.label_3.setText(_translate("Form", "Start"))
+        self.label_4.setText(_translate("Form", "Stop"))
+        self.comments_field.setPlaceholderText(_translate("Form", "Comments"))
+        self.label_5.setText(_translate("Form", "Select device in evidence table"))
+        self.add_event_button.setText(_translate("Form", "Add"))
+        self.toolBox.setItemText(self.toolBox.indexOf(self.page), _translate("Form", "Record event"))
+        self.label_6.setText(_translate("Form", "Time and date seized"))
+        self.unique_identifier_field.setPlaceholderText(_translate("Form", "Unique Identifier or serial number"))
+        self.device_description_field.setPlaceholderText(_translate("Form", "Short device description"))
+        self.additional_information_field.setPlaceholderText(_translate("Form", "Additional information"))
+        self.add_physical_button.setText(_translate("Form", "Add"))
+        self.toolBox.setItemText(self.toolBox.indexOf(self.page_2), _translate("Form", "Physical evidence"))
+
+
+UI_DIGEST = "454a27a17f200a6e3bd01c2cfe97867ef8ea795c"  # Of case.ui, the form is only used while it matches
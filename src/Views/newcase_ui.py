@@ -0,0 +1,59 @@
+# -*- coding: utf-8 -*-
+
+# Form implementation generated from reading ui file 'Views/newcase.ui'
+#
+# Created by: PyQt5 UI code generator 5.15.11
+#
+# WARNING: Any manual changes made to this file will be lost when pyuic5 is
+# run again.  Do not edit this file unless you know what you are doing.
+
+
+from PyQt5 import QtCore, QtGui, QtWidgets
+
+
+class Ui_Dialog(object):
+    def setupUi(self, Dialog):
+        Dialog.setObjectName("Dialog")
+        Dialog.resize(416, 135)
+        Dialog.setMinimumSize(QtCore.QSize(416, 135))
+        Dialog.setMaximumSize(QtCore.QSize(416, 135))
+        self.formLayout = QtWidgets.QFormLayout(Dialog)
+        self.formLayout.setObjectName("formLayout")
+        self.buttonBox = QtWidgets.QDialogButtonBox(Dialog)
+        self.buttonBox.setOrientation(QtCore.Qt.Horizontal)
+        self.buttonBox.setStandardButtons(QtWidgets.QDialogButtonBox.Cancel|QtWidgets.QDialogButtonBox.Ok)
+        self.buttonBox.setObjectName("buttonBox")
+        self.formLayout.setWidget(3, QtWidgets.QFormLayout.FieldRole, self.buttonBox)
+        self.case_reference_field = QtWidgets.QLineEdit(Dialog)
+        self.case_reference_field.setMinimumSize(QtCore.QSize(240, 21))
+        self.case_reference_field.setAutoFillBackground(False)
+        self.case_reference_field.setStyleSheet("")
+        self.case_reference_field.setLocale(QtCore.QLocale(QtCore.QLocale.English, QtCore.QLocale.UnitedKingdom))
+        self.case_reference_field.setObjectName("case_reference_field")
+        self.formLayout.setWidget(0, QtWidgets.QFormLayout.FieldRole, self.case_reference_field)
+        self.lab_reference_field = QtWidgets.QLineEdit(Dialog)
+        self.lab_reference_field.setMinimumSize(QtCore.QSize(240, 21))
+        self.lab_reference_field.setLocale(QtCore.QLocale(QtCore.QLocale.English, QtCore.QLocale.UnitedKingdom))
+        self.lab_reference_field.setObjectName("lab_reference_field")
+        self.formLayout.setWidget(1, QtWidgets.QFormLayout.FieldRole, self.lab_reference_field)
+        self.investigator_field = QtWidgets.QLineEdit(Dialog)
+        self.investigator_field.setMinimumSize(QtCore.QSize(240, 21))
+        self.investigator_field.setLocale(QtCore.QLocale(QtCore.QLocale.English, QtCore.QLocale.UnitedKingdom))
+        self.investigator_field.setClearButtonEnabled(False)
+        self.investigator_field.setObjectName("investigator_field")
+        self.formLayout.setWidget(2, QtWidgets.QFormLayout.FieldRole, self.investigator_field)
+
+        self.retranslateUi(Dialog)
+        self.buttonBox.accepted.connect(Dialog.accept) # type: ignore
+        self.buttonBox.rejected.connect(Dialog.reject) # type: ignore
+        QtCore.QMetaObject.connectSlotsByName(Dialog)
+
+    def retranslateUi(self, Dialog):
+        _translate = QtCore.QCoreApplication.translate
+        Dialog.setWindowTitle(_translate("Dialog", "New case..."))
+        self.case_reference_field.setPlaceholderText(_translate("Dialog", "Case reference"))
+        self.lab_reference_field.setPlaceholderText(_translate("Dialog", "Lab reference"))
+        self.investigator_field.setPlaceholderText(_translate("Dialog", "Investigator name"))
+
+
+UI_DIGEST = "fed2e2b295bb5156cf2f2e4220354d649448baa8"  # Of newcase.ui, the form is only used while it matches
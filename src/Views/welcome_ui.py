@@ -0,0 +1,77 @@
+# -*- coding: utf-8 -*-
+
+# Form implementation generated from reading ui file 'Views/welcome.ui'
+#
+# Created by: PyQt5 UI code generator 5.15.11
+#
+# WARNING: Any manual changes made to this file will be lost when pyuic5 is
+# run again.  Do not edit this file unless you know what you are doing.
+
+
+from PyQt5 import QtCore, QtGui, QtWidgets
+
+
+class Ui_Form(object):
+    def setupUi(self, Form):
+        Form.setObjectName("Form")
+        Form.resize(400, 300)
+        Form.setMinimumSize(QtCore.QSize(400, 300))
+        self.gridLayout = QtWidgets.QGridLayout(Form)
+        self.gridLayout.setObjectName("gridLayout")
+        self.recent_cases_table = QtWidgets.QTableView(Form)
+        self.recent_cases_table.setObjectName("recent_cases_table")
+        self.gridLayout.addWidget(self.recent_cases_table, 3, 4, 1, 1)
+        self.label = QtWidgets.QLabel(Form)
+        font = QtGui.QFont()
+        font.setPointSize(35)
+        self.label.setFont(font)
+        self.label.setObjectName("label")
+        self.gridLayout.addWidget(self.label, 0, 1, 1, 1)
+        self.label_2 = QtWidgets.QLabel(Form)
+        font = QtGui.QFont()
+        font.setPointSize(18)
+        self.label_2.setFont(font)
+        self.label_2.setObjectName("label_2")
+        self.gridLayout.addWidget(self.label_2, 0, 4, 1, 1)
+        self.search_field = QtWidgets.QLineEdit(Form)
+        self.search_field.setClearButtonEnabled(True)
+        self.search_field.setObjectName("search_field")
+        self.gridLayout.addWidget(self.search_field, 1, 4, 1, 1)
+        self.line = QtWidgets.QFrame(Form)
+        self.line.setFrameShape(QtWidgets.QFrame.VLine)
+        self.line.setFrameShadow(QtWidgets.QFrame.Sunken)
+        self.line.setObjectName("line")
+        self.gridLayout.addWidget(self.line, 3, 2, 1, 1)
+        self.verticalLayout_2 = QtWidgets.QVBoxLayout()
+        self.verticalLayout_2.setObjectName("verticalLayout_2")
+        self.new_case_button = QtWidgets.QPushButton(Form)
+        self.new_case_button.setObjectName("new_case_button")
+        self.verticalLayout_2.addWidget(self.new_case_button)
+        self.open_case_button = QtWidgets.QPushButton(Form)
+        self.open_case_button.setObjectName("open_case_button")
+        self.verticalLayout_2.addWidget(self.open_case_button)
+        self.join_case_button = QtWidgets.QPushButton(Form)
+        self.join_case_button.setObjectName("join_case_button")
+        self.verticalLayout_2.addWidget(self.join_case_button)
+        spacerItem = QtWidgets.QSpacerItem(20, 40, QtWidgets.QSizePolicy.Minimum, QtWidgets.QSizePolicy.Expanding)
+        self.verticalLayout_2.addItem(spacerItem)
+        self.gridLayout.addLayout(self.verticalLayout_2, 3, 1, 1, 1)
+        self.actionTeeest = QtWidgets.QAction(Form)
+        self.actionTeeest.setObjectName("actionTeeest")
+
+        self.retranslateUi(Form)
+        QtCore.QMetaObject.connectSlotsByName(Form)
+
+    def retranslateUi(self, Form):
+        _translate = QtCore.QCoreApplication.translate
+        Form.setWindowTitle(_translate("Form", "Welcome to Digidence"))
+        self.label.setText(_translate("Form", "Welcome"))
+        self.label_2.setText(_translate("Form", "Recently opened"))
+        self.search_field.setPlaceholderText(_translate("Form", "Search cases, investigators and evidence identifiers"))
+        self.new_case_button.setText(_translate("Form", "Start new case"))
+        self.open_case_button.setText(_translate("Form", "Open case from file..."))
+        self.join_case_button.setText(_translate("Form", "Join shared case..."))
+        self.actionTeeest.setText(_translate("Form", "Teeest"))
+
+
+UI_DIGEST = "a29fa9e51c9addaf175e5212bf53e5feacbcef56"  # Of welcome.ui, the form is only used while it matches